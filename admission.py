@@ -0,0 +1,176 @@
+"""
+Admission control for expensive routes
+
+Every expensive route belongs to a cost class (classify, upload, render).
+Three checks run before such a request is admitted:
+
+- Each user has a token bucket per class; a user whose bucket is empty gets
+  429 with Retry-After set to the time until the next token.
+- At most max_concurrent requests of a class run at once. Up to max_waiting
+  more wait up to wait_seconds for a slot.
+- A process-wide cap limits expensive requests, running or waiting. A waiting
+  request still holds a server thread, and the cap keeps threads free for
+  cheap routes such as /login and /dashboard.
+
+A request that finds the wait queue or the cap full, or that times out while
+waiting, gets 503 with Retry-After. Background jobs are admitted with
+background=True: they take the class's concurrency slots like requests do, but
+skip the token bucket (their submission already took a token) and the
+process-wide cap (they run on job worker threads, not server threads). All
+state is per worker process.
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+
+
+class AdmissionRejected(Exception):
+    """The request was not admitted; status is 429 or 503 and retry_after is in seconds"""
+
+    def __init__(self, message, status, retry_after, reason):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = max(1, math.ceil(retry_after))
+        self.reason = reason
+
+
+class TokenBuckets:
+    """Token buckets per key, refilled at rate tokens per second up to burst.
+
+    Only the most recently used maxsize keys are kept; a key that falls out
+    starts over with a full bucket.
+    """
+
+    def __init__(self, rate, burst, maxsize=10000):
+        self.rate = rate
+        self.burst = burst
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, now=None):
+        """Take a token; returns 0 on success, else the seconds until one is available"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            wait = 0 if tokens >= 1 else (1 - tokens) / self.rate
+            self._buckets[key] = (tokens - 1 if wait == 0 else tokens, now)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def refund(self, key):
+        """Give back a token taken for a request that was not admitted after all"""
+        with self._lock:
+            if key in self._buckets:
+                tokens, updated = self._buckets[key]
+                self._buckets[key] = (min(self.burst, tokens + 1), updated)
+
+
+class ConcurrencyLimiter:
+    """At most max_concurrent holders; up to max_waiting more wait up to wait_seconds for a slot"""
+
+    def __init__(self, max_concurrent, max_waiting, wait_seconds):
+        self.max_concurrent = max_concurrent
+        self.max_waiting = max_waiting
+        self.wait_seconds = wait_seconds
+        self.active = 0
+        self.waiting = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        """Take a slot; returns the seconds spent waiting or raises AdmissionRejected"""
+        with self._condition:
+            if self.active < self.max_concurrent:
+                self.active += 1
+                return 0.0
+            if self.waiting >= self.max_waiting:
+                raise AdmissionRejected('Server is busy; please retry shortly', 503, self.wait_seconds, 'queue_full')
+            started = time.perf_counter()
+            self.waiting += 1
+            try:
+                if not self._condition.wait_for(lambda: self.active < self.max_concurrent, self.wait_seconds):
+                    raise AdmissionRejected('Server is busy; please retry shortly', 503, self.wait_seconds, 'timeout')
+            finally:
+                self.waiting -= 1
+            self.active += 1
+            return time.perf_counter() - started
+
+    def release(self):
+        with self._condition:
+            self.active -= 1
+            self._condition.notify()
+
+
+class CostClass:
+    """Limits for one class of routes; 0 disables the concurrency limit or the rate limit"""
+
+    def __init__(self, max_concurrent, max_waiting, rate_per_minute, burst, wait_seconds):
+        self.limiter = ConcurrencyLimiter(max_concurrent, max_waiting, wait_seconds) if max_concurrent > 0 else None
+        self.buckets = TokenBuckets(rate_per_minute / 60, burst) if rate_per_minute > 0 else None
+
+
+class AdmissionController:
+    """Admits requests per cost class; admit() returns a release callable"""
+
+    def __init__(self, cost_classes, max_active):
+        self.cost_classes = cost_classes
+        self.max_active = max_active
+        self.active = 0
+        self._lock = threading.Lock()
+
+    def _reject(self, cost_class, error):
+        metrics.inc('admission_rejections', labels={'cost_class': cost_class, 'reason': error.reason})
+        return error
+
+    def admit(self, cost_class, user_id, background=False):
+        limits = self.cost_classes[cost_class]
+        counted = not background
+        if counted and limits.buckets is not None:
+            wait = limits.buckets.take(user_id)
+            if wait:
+                raise self._reject(cost_class, AdmissionRejected(
+                    'Too many requests; please slow down', 429, wait, 'rate_limited'))
+
+        with self._lock:
+            full = counted and self.max_active > 0 and self.active >= self.max_active
+            if counted and not full:
+                self.active += 1
+        if full:
+            if limits.buckets is not None:
+                limits.buckets.refund(user_id)
+            raise self._reject(cost_class, AdmissionRejected(
+                'Server is busy; please retry shortly', 503, 1, 'overloaded'))
+
+        waited = 0.0
+        if limits.limiter is not None:
+            try:
+                waited = limits.limiter.acquire()
+            except AdmissionRejected as error:
+                if counted:
+                    with self._lock:
+                        self.active -= 1
+                    if limits.buckets is not None:
+                        limits.buckets.refund(user_id)
+                    raise self._reject(cost_class, error)
+                raise
+        metrics.observe('admission_queue_wait_seconds', waited, {'cost_class': cost_class})
+
+        released = False
+
+        def release():
+            nonlocal released
+            if released:
+                return
+            released = True
+            if limits.limiter is not None:
+                limits.limiter.release()
+            if counted:
+                with self._lock:
+                    self.active -= 1
+        return release
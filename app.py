@@ -1,68 +1,235 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, session
+from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, session, g, Response, stream_with_context
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
 from pymongo import MongoClient
+from pymongo.errors import DuplicateKeyError, OperationFailure
+from bson import ObjectId
 from datetime import datetime, timedelta
 import os
+import hmac
+import hashlib
+import logging
+import random
+import time
 import jwt
+from functools import wraps
+from collections import Counter
 from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
 from dotenv import load_dotenv
-import PyPDF2
-from docx import Document
 import io
 import re
+import csv
 import json
-import pandas as pd
-from flask import send_file
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.graphics.shapes import Drawing
-from reportlab.graphics.charts.piecharts import Pie
-from reportlab.graphics.charts.legends import Legend
+import base64
+import shutil
+import threading
+from flask import send_file, send_from_directory, abort
+from config import Config
+from cache import TTLCache
+import metrics
+import question_bank
+from logs import get_logger, log_event
+from admission import AdmissionController, AdmissionRejected, CostClass
+from archive import ArchiveWorker, decompress_analysis
+from export import (COLUMNAR_FORMATS, ColumnarExportUnavailable, history_rows, resolve_columnar_format,
+                    write_history, write_report)
+from chunked_uploads import ChunkedUploadError, ChunkedUploadStore
+from jobs import JobError, JobFailed, JobQueue, JobWorker, JobsUnavailable
+from executors import ExecutorBusy, map_cpu, submit_io, set_inline
+from profiling import RequestProfiler, list_profiles, is_profile_name, summarize_profile
+from revisions import diff_questions, document_lineage, incremental_level_counts, item_hash, question_hash
+from zip_batch import ArchiveRejected, aggregate_level_counts, iter_members, open_archive
+from memory import (MemoryBudgetExceeded, check_budget, estimate_file_job_bytes, estimate_report_bytes,
+                    over_budget, run_cpu_measured, track_peak_memory)
 
 # Load environment variables
 load_dotenv()
 
+logger = get_logger('app')
+
+# The Flask app is built by create_app(); routes are declared on it below
 app = Flask(__name__)
-app.secret_key = os.getenv('SECRET_KEY', 'your-secret-key-here')
-
-# MongoDB configuration
-MONGO_URI = os.getenv('MONGO_URI', 'mongodb://localhost:27017/blooms_taxonomy')
-try:
-    client = MongoClient(MONGO_URI)
-    db = client.get_database()
-    users_collection = db.users
-    analyses_collection = db.analyses
-    print("MongoDB connected successfully")
-except Exception as e:
-    print(f"MongoDB connection error: {e}")
-    # Create in-memory collections for testing
-    users_collection = []
-    analyses_collection = []
+app.config.from_object(Config)
+
+# MongoDB configuration. The client is per worker process and is created by
+# init_worker(); until then every helper sees MongoDB as unavailable.
+MONGO_URI = Config.MONGO_URI
+client = None
+users_collection = []
+analyses_collection = []
+user_stats_collection = []
+archived_analyses_collection = []
+question_bank_collection = []
+archive_worker = None
+job_workers = []
+_worker_pid = None
+
+def init_db(mongo_uri=None):
+    """Create this process's MongoDB client and collection handles"""
+    global client, users_collection, analyses_collection, user_stats_collection, archived_analyses_collection
+    global question_bank_collection
+    try:
+        client = MongoClient(mongo_uri or MONGO_URI)
+        db = client.get_database()
+        users_collection = db.users
+        analyses_collection = db.analyses
+        user_stats_collection = db.user_stats
+        archived_analyses_collection = db.analyses_archive
+        question_bank_collection = db.question_bank
+        job_queue.collection = db.jobs
+        log_event(logger, 'mongodb_connected')
+    except Exception as e:
+        log_event(logger, 'mongodb_connection_failed', logging.ERROR, error=str(e))
+        # Create in-memory collections for testing
+        users_collection = []
+        analyses_collection = []
+        user_stats_collection = []
+        archived_analyses_collection = []
+        question_bank_collection = []
+        job_queue.collection = None
+
+def ensure_indexes():
+    """Create the indexes the history queries rely on"""
+    if not hasattr(analyses_collection, 'create_index'):
+        return
+    try:
+        # Serves the dashboard and keyset pagination: user_id filter, newest first
+        analyses_collection.create_index([('user_id', 1), ('created_at', -1), ('_id', -1)])
+        archived_analyses_collection.create_index([('user_id', 1), ('created_at', -1), ('_id', -1)])
+        # Finds the previous version of a re-uploaded document
+        analyses_collection.create_index(
+            [('user_id', 1), ('lineage', 1), ('created_at', -1)],
+            partialFilterExpression={'lineage': {'$exists': True}}
+        )
+        # Serves the archiver's scan for old analyses of the archived types
+        analyses_collection.create_index([('created_at', 1), ('analysis_type', 1)])
+        if Config.SINGLE_QUESTION_RETENTION_DAYS > 0:
+            ensure_ttl_index(Config.SINGLE_QUESTION_RETENTION_DAYS * 86400)
+        else:
+            drop_ttl_index()
+        job_queue.ensure_indexes()
+    except Exception as e:
+        log_event(logger, 'index_creation_failed', logging.ERROR, error=str(e))
+
+TTL_INDEX_NAME = 'single_question_ttl'
+
+def ensure_ttl_index(expire_after_seconds):
+    """Expire single-question analyses after the configured retention period"""
+    name = TTL_INDEX_NAME
+    try:
+        analyses_collection.create_index(
+            'created_at',
+            name=name,
+            expireAfterSeconds=expire_after_seconds,
+            # Equality only: MongoDB before 6.0 rejects $in in a partial filter
+            partialFilterExpression={'analysis_type': 'single_question'}
+        )
+    except OperationFailure:
+        # The index exists with another retention period: update it in place
+        analyses_collection.database.command(
+            'collMod',
+            analyses_collection.name,
+            index={'name': name, 'expireAfterSeconds': expire_after_seconds}
+        )
+
+def drop_ttl_index():
+    """Keep single-question analyses: remove the TTL index an earlier retention setting created"""
+    if TTL_INDEX_NAME in analyses_collection.index_information():
+        analyses_collection.drop_index(TTL_INDEX_NAME)
+        log_event(logger, 'ttl_index_dropped', index=TTL_INDEX_NAME)
+
+def start_background_services():
+    """Start the per-worker index builder, archiver and job worker threads"""
+    global archive_worker
+    
+    # Build indexes off the request path so startup never waits on MongoDB
+    threading.Thread(target=ensure_indexes, daemon=True).start()
+    
+    if Config.ARCHIVE_AFTER_DAYS > 0 and hasattr(analyses_collection, 'find'):
+        archive_worker = ArchiveWorker(
+            analyses_collection,
+            archived_analyses_collection,
+            Config.ARCHIVE_AFTER_DAYS,
+            Config.ARCHIVE_INTERVAL_SECONDS,
+            Config.ARCHIVE_BATCH_SIZE,
+            on_archived=forget_question_indexes
+        )
+        archive_worker.start()
+    
+    if job_queue.available:
+        for _ in range(Config.JOB_WORKER_THREADS):
+            worker = JobWorker(job_queue, JOB_HANDLERS, Config.JOB_POLL_INTERVAL_SECONDS)
+            worker.start()
+            job_workers.append(worker)
+
+def init_worker():
+    """Create per-worker resources (MongoDB client, background threads).
+    
+    Must run after fork: MongoClient and threads are not fork-safe. Calling it
+    again in the same process is a no-op.
+    """
+    global _worker_pid
+    if _worker_pid == os.getpid():
+        return
+    _worker_pid = os.getpid()
+    user_cache.clear()
+    init_db()
+    start_background_services()
 
 # JWT configuration
 JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'your-jwt-secret-key-here')
 JWT_ALGORITHM = 'HS256'
 JWT_EXPIRATION_HOURS = 24
 
+# Decoded bearer-token claims, each cached until its token expires
+token_cache = TTLCache(maxsize=Config.TOKEN_CACHE_MAX_SIZE, ttl=JWT_EXPIRATION_HOURS * 3600)
+
 # Flask-Login configuration
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
 
+# Per-worker cache of user records so authenticated requests skip the Mongo round trip
+user_cache = TTLCache(maxsize=Config.USER_CACHE_MAX_SIZE, ttl=Config.USER_CACHE_TTL_SECONDS)
+
 # Configure upload settings
-UPLOAD_FOLDER = 'uploads'
+UPLOAD_FOLDER = Config.UPLOAD_FOLDER
 ALLOWED_EXTENSIONS = {'txt', 'pdf', 'docx', 'doc'}
 REPORT_EXTENSIONS = {'xlsx', 'xls', 'csv'}
 
-if not os.path.exists(UPLOAD_FOLDER):
-    os.makedirs(UPLOAD_FOLDER)
+# Admission control for expensive routes, per worker process
+admission = AdmissionController(
+    {
+        cost_class: CostClass(
+            getattr(Config, f'ADMISSION_{cost_class.upper()}_CONCURRENCY'),
+            getattr(Config, f'ADMISSION_{cost_class.upper()}_QUEUE'),
+            getattr(Config, f'ADMISSION_{cost_class.upper()}_RATE_PER_MINUTE'),
+            getattr(Config, f'ADMISSION_{cost_class.upper()}_BURST'),
+            Config.ADMISSION_WAIT_SECONDS
+        )
+        for cost_class in ('classify', 'upload', 'render')
+    },
+    Config.ADMISSION_MAX_ACTIVE
+)
+
+# Part files of resumable chunked uploads
+chunked_uploads = ChunkedUploadStore(
+    os.path.join(UPLOAD_FOLDER, 'chunked'),
+    Config.CHUNKED_UPLOAD_MAX_CHUNK_BYTES,
+    Config.CHUNKED_UPLOAD_TTL_SECONDS
+)
 
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+# Background jobs; the collection is attached by init_db(). Job inputs and results
+# are files under UPLOAD_FOLDER/jobs, which every worker running jobs must share
+job_queue = JobQueue(
+    None,
+    os.path.join(UPLOAD_FOLDER, 'jobs'),
+    Config.JOB_MAX_RUNNING_PER_USER,
+    Config.JOB_MAX_ACTIVE_PER_USER,
+    Config.JOB_MAX_ATTEMPTS,
+    Config.JOB_LEASE_SECONDS,
+    Config.JOB_RESULT_TTL_SECONDS
+)
 
 # Enhanced Bloom's Taxonomy levels with comprehensive keywords and descriptions
 bloom_levels = {
@@ -110,15 +277,28 @@ class User(UserMixin):
 
 @login_manager.user_loader
 def load_user(user_id):
-    from bson import ObjectId
+    user_data = user_cache.get(user_id)
+    if user_data is not None:
+        metrics.inc('user_cache_hits')
+        return User(user_data)
+    
+    metrics.inc('user_cache_misses')
     try:
-        user_data = users_collection.find_one({'_id': ObjectId(user_id)})
+        user_data = users_collection.find_one(
+            {'_id': ObjectId(user_id)},
+            {'email': 1, 'name': 1, 'created_at': 1}
+        )
         if user_data:
+            user_cache.set(user_id, user_data)
             return User(user_data)
     except:
         pass
     return None
 
+def invalidate_cached_user(user_id):
+    """Drop a user from the per-worker cache after logout or a profile change"""
+    user_cache.pop(str(user_id))
+
 def create_jwt_token(user_id):
     """Create JWT token for user - Fixed for Python compatibility"""
     # Use timezone.utc for Python 3.9+ compatibility
@@ -138,16 +318,108 @@ def create_jwt_token(user_id):
 
 def verify_jwt_token(token):
     """Verify JWT token and return user_id"""
-    try:
-        payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
+    payload = token_cache.get(token)
+    if payload is not None:
+        metrics.inc('token_cache_hits')
         return payload['user_id']
+    
+    metrics.inc('token_cache_misses')
+    try:
+        # Tokens without an expiry are refused: the cache entry lives until exp
+        payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM],
+                             options={'require': ['exp', 'user_id']})
     except jwt.ExpiredSignatureError:
         return None
     except jwt.InvalidTokenError:
         return None
+    
+    token_cache.set(token, payload, ttl=payload['exp'] - time.time())
+    return payload['user_id']
 
-def save_analysis_to_db(user_id, analysis_type, content, results):
-    """Save analysis results to MongoDB"""
+def token_or_login_required(view):
+    """Accept an `Authorization: Bearer` JWT, falling back to the session login.
+    
+    Bearer requests are verified in memory only: no session is read or written
+    and the user is never reloaded from the database.
+    """
+    @wraps(view)
+    def wrapped(*args, **kwargs):
+        auth_header = request.headers.get('Authorization', '')
+        if auth_header.startswith('Bearer '):
+            user_id = verify_jwt_token(auth_header[len('Bearer '):].strip())
+            if not user_id:
+                return jsonify({'error': 'Invalid or expired token'}), 401
+            g.api_user_id = user_id
+            return view(*args, **kwargs)
+        return login_required(view)(*args, **kwargs)
+    return wrapped
+
+def is_admin_request():
+    """True for requests with the admin token or from a logged-in admin user"""
+    token = request.headers.get('X-Admin-Token', '')
+    if Config.ADMIN_TOKEN and hmac.compare_digest(token, Config.ADMIN_TOKEN):
+        return True
+    return bool(Config.ADMIN_EMAILS and current_user.is_authenticated
+                and current_user.email.lower() in Config.ADMIN_EMAILS)
+
+def admin_required(view):
+    @wraps(view)
+    def wrapped(*args, **kwargs):
+        if not is_admin_request():
+            return jsonify({'error': 'Admin access required'}), 403
+        return view(*args, **kwargs)
+    return wrapped
+
+def get_request_user_id():
+    """Return the id of the bearer-token user or the logged-in user"""
+    return g.get('api_user_id') or current_user.id
+
+def admission_controlled(cost_class):
+    """Admit the request through its cost class's rate and concurrency limits (after authentication)
+    
+    Responses generated while they are sent (NDJSON batches, streamed CSV) hold the
+    slot until the last chunk is out; file downloads release it once the file is ready.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            if not Config.ADMISSION_ENABLED:
+                return view(*args, **kwargs)
+            release = admission.admit(cost_class, get_request_user_id())
+            try:
+                response = app.make_response(view(*args, **kwargs))
+            except BaseException:
+                release()
+                raise
+            if response.is_streamed and not response.direct_passthrough:
+                response.response = ReleaseWhenSent(response.response, release)
+            else:
+                release()
+            return response
+        return wrapped
+    return decorator
+
+class ReleaseWhenSent:
+    """Response body that calls release once it is exhausted or closed, whichever comes first"""
+    
+    def __init__(self, chunks, release):
+        self.chunks = chunks
+        self.release = release
+    
+    def __iter__(self):
+        try:
+            yield from self.chunks
+        finally:
+            self.release()
+    
+    def close(self):
+        try:
+            if hasattr(self.chunks, 'close'):
+                self.chunks.close()
+        finally:
+            self.release()
+
+def build_analysis_document(user_id, analysis_type, content, results, lineage=None, analysis_id=None):
     analysis_data = {
         'user_id': user_id,
         'analysis_type': analysis_type,
@@ -155,14 +427,358 @@ def save_analysis_to_db(user_id, analysis_type, content, results):
         'results': results,
         'created_at': datetime.now()
     }
+    if lineage:
+        analysis_data['lineage'] = lineage
+    if analysis_id is not None:
+        analysis_data['_id'] = analysis_id
+    return analysis_data
+
+def finish_saved_analysis(analysis_data):
+    """Follow-up work for a stored analysis: user stats and the in-memory question indexes"""
+    try:
+        update_user_stats(analysis_data['user_id'], analysis_data['analysis_type'], analysis_data['results'],
+                          analysis_data['created_at'])
+        index_saved_analysis(analysis_data)
+    except Exception as e:
+        log_event(logger, 'analysis_follow_up_failed', logging.ERROR, error=str(e),
+                  analysis_id=analysis_data.get('_id'))
+    results = analysis_data['results']
+    log_event(
+        logger, 'analysis_saved',
+        analysis_id=analysis_data.get('_id'),
+        user_id=analysis_data['user_id'],
+        analysis_type=analysis_data['analysis_type'],
+        content=analysis_data['content'],
+        total_questions=results.get('total_questions') if isinstance(results, dict) else None
+    )
+
+def save_analysis_to_db(user_id, analysis_type, content, results, lineage=None):
+    """Save analysis results to MongoDB"""
+    analysis_data = build_analysis_document(user_id, analysis_type, content, results, lineage)
     try:
         if hasattr(analyses_collection, 'insert_one'):
-            analyses_collection.insert_one(analysis_data)
-            print(f"Analysis saved to database: {analysis_data}")
+            with metrics.timed('save_analysis_to_db'):
+                analyses_collection.insert_one(analysis_data)
+            finish_saved_analysis(analysis_data)
         else:
-            print("MongoDB not available, analysis not saved")
+            log_event(logger, 'analysis_not_saved', logging.WARNING, reason='mongodb_unavailable')
+    except Exception as e:
+        log_event(logger, 'analysis_save_failed', logging.ERROR, error=str(e), user_id=user_id)
+
+def save_analysis(user_id, analysis_type, content, results, lineage=None, analysis_id=None):
+    """Store an upload's analysis before its response goes out; returns fields for the response
+    
+    The insert runs on the request path, so the analysis is listed and found by the next
+    version's upload as soon as the client has its answer. Stats and indexing follow on
+    the I/O executor. The fields are {'analysis_id': ...}, or {'save_error': ...} when
+    the insert failed ({} without MongoDB). A background job passes a fixed analysis_id;
+    if an earlier attempt already stored it, nothing is stored again.
+    """
+    if not hasattr(analyses_collection, 'insert_one'):
+        log_event(logger, 'analysis_not_saved', logging.WARNING, reason='mongodb_unavailable')
+        return {}
+    analysis_data = build_analysis_document(user_id, analysis_type, content, results, lineage, analysis_id)
+    try:
+        with metrics.timed('save_analysis_to_db'):
+            analyses_collection.insert_one(analysis_data)
+    except DuplicateKeyError:
+        return {'analysis_id': str(analysis_id)}
+    except Exception as e:
+        log_event(logger, 'analysis_save_failed', logging.ERROR, error=str(e), user_id=user_id)
+        return {'save_error': 'The analysis could not be saved to your history'}
+    try:
+        submit_io(finish_saved_analysis, analysis_data)
+    except ExecutorBusy:
+        finish_saved_analysis(analysis_data)
+    return {'analysis_id': str(analysis_data['_id'])}
+
+def question_rows_projection(*fields):
+    """$project stage for reading analyses as question rows (see export.history_rows)
+    
+    A single-question analysis keeps its question in content, so content is kept
+    for those only; for file uploads it is the whole extracted text, which no
+    question row needs.
+    """
+    projection = dict.fromkeys(('analysis_type', 'created_at') + fields, 1)
+    projection['content'] = {'$cond': [{'$eq': ['$analysis_type', 'single_question']}, '$content', '$$REMOVE']}
+    return {'$project': projection}
+
+# Fields needed to index an analysis's questions
+QUESTION_INDEX_PROJECTION = question_rows_projection(
+    'user_id',
+    'lineage',
+    'results.level',
+    'results.questions.question_number',
+    'results.questions.question',
+    'results.questions.level'
+)
+
+QUESTION_INDEX_NAMES = ('near_duplicates', 'search')
+
+# Per-user question indexes keyed by (index name, user_id): least recently used ones are
+# dropped first, and each is rebuilt after its TTL so expired and archived analyses drop out
+_question_indexes = TTLCache(maxsize=Config.QUESTION_INDEX_MAX_USERS, ttl=Config.QUESTION_INDEX_TTL_SECONDS)
+_question_index_loading = set()
+_question_index_lock = threading.Lock()
+
+def new_question_index(name):
+    if name == 'near_duplicates':
+        from near_duplicates import NearDuplicateIndex
+        return NearDuplicateIndex()
+    from search_index import SearchIndex
+    return SearchIndex(bloom_levels.keys())
+
+def iter_user_analyses_since(user_id, watermark):
+    """The user's analyses saved at or after watermark (all of them when None), oldest first"""
+    if not hasattr(analyses_collection, 'aggregate'):
+        return []
+    query = {'user_id': user_id}
+    if watermark:
+        query['created_at'] = {'$gte': watermark}
+    return analyses_collection.aggregate([
+        {'$match': query},
+        {'$sort': {'created_at': 1}},
+        QUESTION_INDEX_PROJECTION
+    ])
+
+def load_question_index(name, user_id, index=None):
+    """Build a user's index from MongoDB, or catch an existing one up (runs on the I/O executor)"""
+    key = (name, user_id)
+    try:
+        built = index is None
+        if built:
+            index = new_question_index(name)
+        # Re-read a short overlap: analyses are stamped just before they are inserted, so one
+        # stamped earlier than the watermark can still appear; duplicates are skipped by id
+        since = index.watermark - timedelta(seconds=60) if index.watermark else None
+        for analysis in iter_user_analyses_since(user_id, since):
+            index.add_analysis(analysis, list(history_rows(analysis)))
+            if index.watermark is None or analysis['created_at'] > index.watermark:
+                index.watermark = analysis['created_at']
+        index.synced_at = time.monotonic()
+        if built:
+            _question_indexes.set(key, index)
+    except Exception as e:
+        log_event(logger, 'question_index_sync_failed', logging.ERROR, error=str(e), index=name)
+    finally:
+        with _question_index_lock:
+            _question_index_loading.discard(key)
+
+def get_question_index(name, user_id):
+    """This worker's index of the user's questions, or None while it is being built
+    
+    Built from MongoDB on first use on the I/O executor, then updated as this
+    worker saves analyses and caught up with analyses saved by other workers
+    at most every QUESTION_INDEX_SYNC_SECONDS, also in the background.
+    """
+    key = (name, user_id)
+    index = _question_indexes.get(key)
+    if index is not None and time.monotonic() - index.synced_at < Config.QUESTION_INDEX_SYNC_SECONDS:
+        return index
+    with _question_index_lock:
+        if key in _question_index_loading:
+            return index
+        _question_index_loading.add(key)
+    try:
+        submit_io(load_question_index, name, user_id, index)
+    except ExecutorBusy:
+        with _question_index_lock:
+            _question_index_loading.discard(key)
+    return index
+
+def index_saved_analysis(analysis):
+    """Add a just-saved analysis to the user's question indexes already built in this worker"""
+    for name in QUESTION_INDEX_NAMES:
+        index = _question_indexes.get((name, analysis.get('user_id')))
+        if index is None:
+            continue
+        try:
+            index.add_analysis(analysis, list(history_rows(analysis)))
+        except Exception as e:
+            log_event(logger, 'question_index_update_failed', logging.ERROR, error=str(e))
+
+def forget_question_indexes(analyses):
+    """Drop the indexes of users whose analyses were archived; they are rebuilt on next use"""
+    for user_id in {analysis.get('user_id') for analysis in analyses}:
+        for name in QUESTION_INDEX_NAMES:
+            _question_indexes.pop((name, user_id))
+
+def find_near_duplicates(questions, user_id, lineage=None):
+    """Near-duplicate clusters within these questions and matches in the user's history
+    
+    history_matches is left out while the user's index is still being built.
+    """
+    if not Config.NEAR_DUPLICATE_ENABLED:
+        return None
+    from near_duplicates import cluster, signatures
+    threshold = Config.NEAR_DUPLICATE_THRESHOLD
+    with metrics.timed('near_duplicates'):
+        matrix = signatures(questions)
+        clusters = [
+            {'question_numbers': [i + 1 for i in members], 'similarity': similarity}
+            for members, similarity in cluster(matrix, threshold)
+        ]
+        index = get_question_index('near_duplicates', user_id)
+        if index is None:
+            return {'clusters': clusters}
+        history_matches = []
+        for i, question in enumerate(questions):
+            matches = index.history_matches(matrix[i], user_id, threshold, Config.NEAR_DUPLICATE_MATCH_LIMIT, lineage)
+            if matches:
+                history_matches.append({'question_number': i + 1, 'question': question, 'matches': matches})
+    return {'clusters': clusters, 'history_matches': history_matches}
+
+def find_previous_analysis(user_id, lineage, exclude_id=None):
+    """Return the user's latest file analysis of this document lineage, or None
+    
+    exclude_id skips the analysis a retried job is about to store again.
+    """
+    if not hasattr(analyses_collection, 'find_one'):
+        return None
+    query = {'user_id': user_id, 'lineage': lineage}
+    if exclude_id is not None:
+        query['_id'] = {'$ne': exclude_id}
+    try:
+        return analyses_collection.find_one(
+            query,
+            {'results.questions': 1, 'results.level_counts': 1, 'results.classifier_version': 1, 'created_at': 1},
+            sort=[('created_at', -1)]
+        )
+    except Exception as e:
+        log_event(logger, 'previous_analysis_fetch_failed', logging.ERROR, error=str(e), user_id=user_id)
+        return None
+
+def user_stats_increments(analysis_type, results, created_at):
+    """The counters one analysis adds to its user's statistics"""
+    level_counts = results.get('level_counts')
+    if level_counts is None and results.get('level') in bloom_levels:
+        # Single questions store just their level
+        level_counts = {results['level']: 1}
+    level_counts = level_counts or {}
+    
+    total_questions = results.get('total_questions', sum(level_counts.values()))
+    multi_level_count = results.get('multi_level_count', 0)
+    month = created_at.strftime('%Y-%m')
+    
+    increments = {
+        'total_analyses': 1,
+        'total_questions': total_questions,
+        'multi_level_count': multi_level_count,
+        f'analysis_types.{analysis_type}': 1,
+        f'monthly.{month}.analyses': 1,
+        f'monthly.{month}.questions': total_questions,
+        f'monthly.{month}.multi_level': multi_level_count
+    }
+    for level, count in level_counts.items():
+        if count:
+            increments[f'level_counts.{level}'] = count
+    return increments
+
+def update_user_stats(user_id, analysis_type, results, created_at):
+    """Fold one analysis into the user's materialized statistics with a single $inc
+    
+    `since` records the first analysis counted this way; older history is added by backfill_user_stats.
+    """
+    if not hasattr(user_stats_collection, 'update_one') or not isinstance(results, dict):
+        return
+    
+    try:
+        user_stats_collection.update_one(
+            {'_id': user_id},
+            {
+                '$inc': user_stats_increments(analysis_type, results, created_at),
+                '$set': {'updated_at': created_at},
+                '$setOnInsert': {'since': created_at}
+            },
+            upsert=True
+        )
+    except Exception as e:
+        log_event(logger, 'user_stats_update_failed', logging.ERROR, error=str(e), user_id=user_id)
+
+def backfill_user_stats(user_id):
+    """Add the analyses saved before the user's statistics document existed, once
+    
+    Only history older than the document's `since` is counted, and the $inc is
+    conditional on `backfilled` being unset, so concurrent first reads count it once.
+    """
+    user_stats_collection.update_one({'_id': user_id}, {'$setOnInsert': {'since': datetime.now()}}, upsert=True)
+    stats = user_stats_collection.find_one({'_id': user_id})
+    if stats.get('backfilled'):
+        return stats
+    
+    totals = Counter()
+    if 'since' in stats:
+        query = {'user_id': user_id, 'created_at': {'$lt': stats['since']}}
+        projection = {
+            'analysis_type': 1, 'created_at': 1, 'results.level_counts': 1, 'results.level': 1,
+            'results.total_questions': 1, 'results.multi_level_count': 1
+        }
+        for collection in (analyses_collection, archived_analyses_collection):
+            if not hasattr(collection, 'find'):
+                continue
+            for analysis in collection.find(query, projection):
+                if isinstance(analysis.get('results'), dict):
+                    totals.update(user_stats_increments(analysis['analysis_type'], analysis['results'],
+                                                        analysis['created_at']))
+    
+    update = {'$set': {'backfilled': True}}
+    if totals:
+        update['$inc'] = dict(totals)
+    user_stats_collection.update_one({'_id': user_id, 'backfilled': {'$ne': True}}, update)
+    if totals:
+        log_event(logger, 'user_stats_backfilled', user_id=user_id, analyses=totals['total_analyses'])
+    return user_stats_collection.find_one({'_id': user_id})
+
+def get_user_stats(user_id):
+    """Read the user's materialized statistics (one document; history is scanned once, on the first read)"""
+    stats = None
+    try:
+        if hasattr(user_stats_collection, 'find_one'):
+            stats = user_stats_collection.find_one({'_id': user_id})
+            if stats is None or not stats.get('backfilled'):
+                stats = backfill_user_stats(user_id)
     except Exception as e:
-        print(f"Error saving analysis: {e}")
+        log_event(logger, 'user_stats_fetch_failed', logging.ERROR, error=str(e), user_id=user_id)
+    
+    stats = stats or {}
+    level_counts = {level: stats.get('level_counts', {}).get(level, 0) for level in bloom_levels.keys()}
+    total_questions = stats.get('total_questions', 0)
+    level_percentages = build_level_percentages(level_counts, total_questions)
+    
+    monthly = []
+    for month, bucket in sorted(stats.get('monthly', {}).items()):
+        questions = bucket.get('questions', 0)
+        multi_level = bucket.get('multi_level', 0)
+        monthly.append({
+            'month': month,
+            'analyses': bucket.get('analyses', 0),
+            'questions': questions,
+            'multi_level': multi_level,
+            'multi_level_rate': round(multi_level / questions * 100, 1) if questions > 0 else 0
+        })
+    
+    multi_level_count = stats.get('multi_level_count', 0)
+    return {
+        'total_analyses': stats.get('total_analyses', 0),
+        'total_questions': total_questions,
+        'level_counts': level_counts,
+        'level_percentages': level_percentages,
+        'multi_level_count': multi_level_count,
+        'multi_level_rate': round(multi_level_count / total_questions * 100, 1) if total_questions > 0 else 0,
+        'analysis_types': stats.get('analysis_types', {}),
+        'monthly': monthly
+    }
+
+def build_level_percentages(level_counts, total_questions):
+    """Turn per-level counts into the {'count', 'percentage'} mapping used in results"""
+    level_percentages = {}
+    for level, count in level_counts.items():
+        percentage = (count / total_questions * 100) if total_questions > 0 else 0
+        level_percentages[level] = {
+            'count': count,
+            'percentage': round(percentage, 1)
+        }
+    return level_percentages
 
 def allowed_file(filename):
     """Check if the uploaded file has an allowed extension"""
@@ -172,43 +788,59 @@ def allowed_report_file(filename):
     """Check if the uploaded file has an allowed extension for reports"""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in REPORT_EXTENSIONS
 
-def read_questions_from_file(file_path, file_extension):
-    """Read questions from Excel or CSV file"""
+def find_question_column(columns):
+    """Pick the question column (case insensitive), defaulting to the first column"""
+    for col in columns:
+        if str(col).lower().strip() in ['question', 'questions', 'q', 'query']:
+            return col
+    return columns[0]
+
+def read_questions_from_file(file_path, file_extension, chunksize=None):
+    """Read questions from Excel or CSV file
+    
+    Only the question column of a CSV file is parsed, and with chunksize it is
+    read that many rows at a time. Excel sheets are read whole.
+    """
+    import pandas as pd
+    
     questions = []
     
     try:
         if file_extension == 'csv':
-            df = pd.read_csv(file_path)
+            # Read the header first to pick the question column, then parse just that column
+            columns = list(pd.read_csv(file_path, nrows=0).columns)
+            if hasattr(file_path, 'seek'):
+                file_path.seek(0)
+            usecols = [find_question_column(columns)] if columns else None
+            frames = pd.read_csv(file_path, usecols=usecols, chunksize=chunksize)
+            if not chunksize:
+                frames = [frames]
         elif file_extension in ['xlsx', 'xls']:
-            df = pd.read_excel(file_path)
+            frames = [pd.read_excel(file_path)]
         else:
             return []
         
-        # Look for question column (case insensitive)
         question_col = None
-        for col in df.columns:
-            if col.lower().strip() in ['question', 'questions', 'q', 'query']:
-                question_col = col
-                break
-        
-        if question_col is None:
-            # If no specific column found, use the first column
-            question_col = df.columns[0]
-        
-        # Extract questions and clean them
-        for idx, row in df.iterrows():
-            question = str(row[question_col]).strip()
-            if question and question.lower() != 'nan' and len(question) > 5:
-                questions.append(question)
+        for df in frames:
+            if question_col is None:
+                question_col = find_question_column(list(df.columns))
+            
+            # Extract questions and clean them
+            for value in df[question_col]:
+                question = str(value).strip()
+                if question and question.lower() != 'nan' and len(question) > 5:
+                    questions.append(question)
         
         return questions
     
     except Exception as e:
-        print(f"Error reading file: {e}")
+        log_event(logger, 'file_read_failed', logging.ERROR, error=str(e), file_extension=file_extension)
         return []
 
 def create_report_file(questions_data, file_format='xlsx'):
     """Create Excel or CSV report with questions and Bloom's levels"""
+    import pandas as pd
+    
     try:
         # Prepare data for DataFrame
         report_data = []
@@ -236,15 +868,118 @@ def create_report_file(questions_data, file_format='xlsx'):
         return temp_file.name
     
     except Exception as e:
-        print(f"Error creating report file: {e}")
+        log_event(logger, 'report_creation_failed', logging.ERROR, error=str(e), file_format=file_format)
         return None
 
+def create_columnar_report(questions_data, file_format='parquet'):
+    """Create a Parquet (or Arrow IPC) report; returns (path, format actually written)"""
+    import tempfile
+    actual_format = resolve_columnar_format(file_format)
+    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.' + COLUMNAR_FORMATS[actual_format][0])
+    temp_file.close()
+    write_report(
+        questions_data,
+        temp_file.name,
+        actual_format,
+        list(bloom_levels.keys()),
+        [level['description'] for level in bloom_levels.values()]
+    )
+    return temp_file.name, actual_format
+
+_report_styles = None
+
+def get_report_styles():
+    """Build the PDF report's paragraph styles and colors once and reuse them"""
+    global _report_styles
+    if _report_styles is not None:
+        return _report_styles
+    
+    from reportlab.lib.colors import HexColor
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    
+    styles = getSampleStyleSheet()
+    
+    # Define colors
+    primary_color = HexColor('#2E86AB')
+    secondary_color = HexColor('#A23B72')
+    dark_gray = HexColor('#333333')
+    
+    # Title with modern styling
+    title_style = ParagraphStyle(
+        'ModernTitle',
+        parent=styles['Heading1'],
+        fontSize=28,
+        spaceAfter=10,
+        spaceBefore=0,
+        alignment=1,
+        textColor=primary_color,
+        fontName='Helvetica-Bold'
+    )
+    
+    subtitle_style = ParagraphStyle(
+        'Subtitle',
+        parent=styles['Normal'],
+        fontSize=14,
+        spaceAfter=40,
+        alignment=1,
+        textColor=dark_gray,
+        fontName='Helvetica'
+    )
+    
+    # Section header style
+    section_style = ParagraphStyle(
+        'SectionHeader',
+        parent=styles['Heading2'],
+        fontSize=18,
+        spaceAfter=20,
+        spaceBefore=10,
+        textColor=secondary_color,
+        fontName='Helvetica-Bold'
+    )
+    
+    # Define level colors for the questions table
+    level_colors = {
+        'L1-Remember': HexColor('#FF6B6B'),
+        'L2-Understand': HexColor('#4ECDC4'),
+        'L3-Apply': HexColor('#45B7D1'),
+        'L4-Analyze': HexColor('#96CEB4'),
+        'L5-Evaluate': HexColor('#FFEAA7'),
+        'L6-Create': HexColor('#DDA0DD')
+    }
+    
+    _report_styles = {
+        'styles': styles,
+        'title': title_style,
+        'subtitle': subtitle_style,
+        'section': section_style,
+        'secondary_color': secondary_color,
+        'dark_gray': dark_gray,
+        'level_colors': level_colors
+    }
+    return _report_styles
+
+def stream_csv_report(questions_data):
+    """Yield the CSV report row by row instead of building it in memory"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(['Question', 'Blooms_Level', 'Description'])
+    for item in questions_data:
+        writer.writerow([item['question'], item['level'], item['description']])
+        if buffer.tell() > 64 * 1024:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
 def create_pdf_report(questions_data, filename="blooms_report"):
     """Create an attractive PDF report with questions and Bloom's levels"""
     try:
         import tempfile
+        from reportlab.lib import colors
         from reportlab.lib.colors import HexColor
-        from reportlab.platypus import PageBreak
+        from reportlab.lib.pagesizes import A4
+        from reportlab.lib.units import inch
+        from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
         
         temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
         
@@ -257,61 +992,16 @@ def create_pdf_report(questions_data, filename="blooms_report"):
             topMargin=50,
             bottomMargin=50
         )
-        styles = getSampleStyleSheet()
+        report_styles = get_report_styles()
+        styles = report_styles['styles']
+        secondary_color = report_styles['secondary_color']
+        level_colors = report_styles['level_colors']
         story = []
         
-        # Define colors
-        primary_color = HexColor('#2E86AB')
-        secondary_color = HexColor('#A23B72')
-        accent_color = HexColor('#F18F01')
-        light_gray = HexColor('#F5F5F5')
-        dark_gray = HexColor('#333333')
-        
-        # Title with modern styling
-        title_style = ParagraphStyle(
-            'ModernTitle',
-            parent=styles['Heading1'],
-            fontSize=28,
-            spaceAfter=10,
-            spaceBefore=0,
-            alignment=1,
-            textColor=primary_color,
-            fontName='Helvetica-Bold'
-        )
-        
-        subtitle_style = ParagraphStyle(
-            'Subtitle',
-            parent=styles['Normal'],
-            fontSize=14,
-            spaceAfter=40,
-            alignment=1,
-            textColor=dark_gray,
-            fontName='Helvetica'
-        )
-        
-        story.append(Paragraph("📊 Bloom's Taxonomy Analysis Report", title_style))
-        story.append(Paragraph("Educational Assessment & Cognitive Level Classification", subtitle_style))
-        
-        # Define level colors for the questions table
-        level_colors = {
-            'L1-Remember': HexColor('#FF6B6B'),
-            'L2-Understand': HexColor('#4ECDC4'),
-            'L3-Apply': HexColor('#45B7D1'),
-            'L4-Analyze': HexColor('#96CEB4'),
-            'L5-Evaluate': HexColor('#FFEAA7'),
-            'L6-Create': HexColor('#DDA0DD')
-        }
+        story.append(Paragraph("📊 Bloom's Taxonomy Analysis Report", report_styles['title']))
+        story.append(Paragraph("Educational Assessment & Cognitive Level Classification", report_styles['subtitle']))
         
-        # Section header style
-        section_style = ParagraphStyle(
-            'SectionHeader',
-            parent=styles['Heading2'],
-            fontSize=18,
-            spaceAfter=20,
-            spaceBefore=10,
-            textColor=secondary_color,
-            fontName='Helvetica-Bold'
-        )
+        section_style = report_styles['section']
         
         # Detailed questions section
         story.append(Paragraph("📝 Detailed Question Analysis", section_style))
@@ -380,55 +1070,52 @@ def create_pdf_report(questions_data, filename="blooms_report"):
         # Enhanced footer
         story.append(Spacer(1, 40))
         
-        footer_info_style = ParagraphStyle(
-            'FooterInfo',
-            parent=styles['Normal'],
-            fontSize=10,
-            alignment=1,
-            textColor=dark_gray,
-            spaceAfter=5
-        )
-        
-        footer_style = ParagraphStyle(
-            'Footer',
-            parent=styles['Normal'],
-            fontSize=9,
-            alignment=1,
-            textColor=colors.grey
-        )
-        
         # Build PDF
         doc.build(story)
         return temp_file.name
         
     except Exception as e:
-        print(f"Error creating PDF report: {e}")
+        log_event(logger, 'pdf_report_failed', logging.ERROR, error=str(e))
         return None
 
 def extract_text_from_file(file_path, file_extension):
-    """Extract text from different file types"""
-    text = ""
+    """Extract text from different file types
+    
+    file_path may also be a binary file object, e.g. an archive member read into memory.
+    """
+    # Collect pages/paragraphs and join once instead of re-copying the text per page
+    parts = []
     
     try:
         if file_extension == 'txt':
-            with open(file_path, 'r', encoding='utf-8') as file:
-                text = file.read()
+            if hasattr(file_path, 'read'):
+                parts.append(file_path.read().decode('utf-8'))
+            else:
+                with open(file_path, 'r', encoding='utf-8') as file:
+                    parts.append(file.read())
         
         elif file_extension == 'pdf':
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
+            import PyPDF2
+            if hasattr(file_path, 'read'):
+                pdf_reader = PyPDF2.PdfReader(file_path)
                 for page in pdf_reader.pages:
-                    text += page.extract_text() + "\n"
+                    parts.append(page.extract_text() + "\n")
+            else:
+                with open(file_path, 'rb') as file:
+                    pdf_reader = PyPDF2.PdfReader(file)
+                    for page in pdf_reader.pages:
+                        parts.append(page.extract_text() + "\n")
         
         elif file_extension in ['docx', 'doc']:
+            from docx import Document
             doc = Document(file_path)
             for paragraph in doc.paragraphs:
-                text += paragraph.text + "\n"
+                parts.append(paragraph.text + "\n")
         
-        return text.strip()
+        return "".join(parts).strip()
     
     except Exception as e:
-        print(f"Error extracting text from file: {e}")
+        log_event(logger, 'text_extraction_failed', logging.ERROR, error=str(e), file_extension=file_extension)
         return ""
 
 def extract_questions_from_text(text):
@@ -467,8 +1154,65 @@ def extract_questions_from_text(text):
     
     return cleaned_questions
 
-def classify_question(question, return_multiple=False):
-    """Classify a question into Bloom's Taxonomy levels with multi-level detection"""
+# High-priority keywords that strongly indicate specific levels
+strong_indicators = {
+    "L1-Remember": ["what is", "define", "list", "name", "identify", "recall", "state", "who", "when", "where", "cite", "enumerate", "specify", "mention"],
+    "L2-Understand": ["explain", "describe", "interpret", "summarize", "paraphrase", "discuss", "outline", "clarify", "comprehend", "convert", "translate", "illustrate"],
+    "L3-Apply": ["apply", "use", "implement", "solve", "calculate", "demonstrate", "show", "illustrate", "practice", "employ", "utilize", "execute", "perform"],
+    "L4-Analyze": ["analyze", "examine", "compare", "contrast", "differentiate", "investigate", "break down", "categorize", "dissect", "deconstruct", "scrutinize"],
+    "L5-Evaluate": ["evaluate", "assess", "judge", "critique", "rate", "justify", "argue", "defend", "support", "appraise", "validate", "criticize"],
+    "L6-Create": ["create", "design", "develop", "build", "construct", "produce", "make", "compose", "generate", "invent", "formulate", "devise"]
+}
+
+_lexicon = None
+
+def get_lexicon():
+    """Return the keyword table flattened and lower-cased once: (keyword, level, weight) tuples"""
+    global _lexicon
+    if _lexicon is None:
+        lexicon = []
+        for level, keywords in strong_indicators.items():
+            lexicon.extend((keyword, level, 4) for keyword in keywords)
+        for level, data in bloom_levels.items():
+            lexicon.extend((keyword.lower(), level, 1) for keyword in data["keywords"])
+        _lexicon = tuple(lexicon)
+    return _lexicon
+
+_lexicon_version = None
+
+def get_lexicon_version():
+    """Short fingerprint of the classifier; stored classifications are only reused for the same version"""
+    global _lexicon_version
+    if _lexicon_version is None:
+        model = get_linear_model()
+        if model is not None and Config.CLASSIFIER_ENGINE == 'cascade':
+            lexicon = hashlib.sha1(repr(get_lexicon()).encode('utf-8')).hexdigest()[:8]
+            _lexicon_version = f'cascade-{lexicon}-{Config.CASCADE_MARGIN:g}-{model.fingerprint}'
+        elif model is not None:
+            _lexicon_version = 'linear-' + model.fingerprint
+        else:
+            _lexicon_version = hashlib.sha1(repr(get_lexicon()).encode('utf-8')).hexdigest()[:12]
+    return _lexicon_version
+
+_linear_model = None
+_linear_model_loaded = False
+
+def get_linear_model():
+    """The memory-mapped linear model when CLASSIFIER_ENGINE is 'linear' or 'cascade', else None"""
+    global _linear_model, _linear_model_loaded
+    if not _linear_model_loaded:
+        _linear_model_loaded = True
+        if Config.CLASSIFIER_ENGINE in ('linear', 'cascade'):
+            try:
+                from linear_model import LinearModel
+                _linear_model = LinearModel.load(Config.CLASSIFIER_MODEL_PATH)
+            except (OSError, ValueError, KeyError) as e:
+                log_event(logger, 'linear_model_load_failed', logging.ERROR, error=str(e),
+                          path=Config.CLASSIFIER_MODEL_PATH)
+    return _linear_model
+
+def score_question(question):
+    """Keyword score of a question for every Bloom's level"""
     question_lower = question.lower().strip()
     
     # Enhanced keyword matching with weighted scoring
@@ -481,27 +1225,73 @@ def classify_question(question, return_multiple=False):
         "L6-Create": 0
     }
     
-    # High-priority keywords that strongly indicate specific levels
-    strong_indicators = {
-        "L1-Remember": ["what is", "define", "list", "name", "identify", "recall", "state", "who", "when", "where", "cite", "enumerate", "specify", "mention"],
-        "L2-Understand": ["explain", "describe", "interpret", "summarize", "paraphrase", "discuss", "outline", "clarify", "comprehend", "convert", "translate", "illustrate"],
-        "L3-Apply": ["apply", "use", "implement", "solve", "calculate", "demonstrate", "show", "illustrate", "practice", "employ", "utilize", "execute", "perform"],
-        "L4-Analyze": ["analyze", "examine", "compare", "contrast", "differentiate", "investigate", "break down", "categorize", "dissect", "deconstruct", "scrutinize"],
-        "L5-Evaluate": ["evaluate", "assess", "judge", "critique", "rate", "justify", "argue", "defend", "support", "appraise", "validate", "criticize"],
-        "L6-Create": ["create", "design", "develop", "build", "construct", "produce", "make", "compose", "generate", "invent", "formulate", "devise"]
-    }
+    # Strong indicators add 4 points, regular bloom_levels keywords add 1
+    for keyword, level, weight in get_lexicon():
+        if keyword in question_lower:
+            level_scores[level] += weight
+    return level_scores
+
+def is_ambiguous(scores):
+    """Whether the keyword scores are too close to trust: no hit, a narrow lead or a multi-level question"""
+    top, runner_up = (sorted(scores.values(), reverse=True) + [0, 0])[:2]
+    return top <= 0 or top - runner_up < Config.CASCADE_MARGIN or runner_up >= top * 0.6
+
+def score_questions(questions, stats=None):
+    """Score vectors for a batch of questions from the configured classifier engine
+    
+    In cascade mode the keyword scores are kept for clear-cut questions and
+    only the ambiguous ones are scored by the model, in one batch. Per-tier
+    counts and timings are added to stats when given (for work done in a CPU
+    worker process, recorded by the caller with record_classifier_stats) and
+    recorded here otherwise.
+    """
+    model = get_linear_model()
+    if model is None:
+        return [score_question(question) for question in questions]
+    if Config.CLASSIFIER_ENGINE != 'cascade':
+        return model.score_batch(questions)
     
-    # Check for strong indicators first (higher weight)
-    for level, keywords in strong_indicators.items():
-        for keyword in keywords:
-            if keyword in question_lower:
-                level_scores[level] += 4  # Higher weight for strong indicators
+    timer = metrics.StageTimer()
+    with timer('cascade_rules'):
+        scores = [score_question(question) for question in questions]
+        ambiguous = [i for i, question_scores in enumerate(scores) if is_ambiguous(question_scores)]
+    changed = 0
+    if ambiguous:
+        with timer('cascade_model'):
+            model_scores = model.score_batch([questions[i] for i in ambiguous])
+        for i, question_scores in zip(ambiguous, model_scores):
+            if max(question_scores, key=question_scores.get) != classify_question(questions[i], scores=scores[i]):
+                changed += 1
+            scores[i] = question_scores
+    
+    collected = {} if stats is None else stats
+    collected['rules'] = collected.get('rules', 0) + len(questions) - len(ambiguous)
+    collected['model'] = collected.get('model', 0) + len(ambiguous)
+    collected['changed'] = collected.get('changed', 0) + changed
+    timings = collected.setdefault('timings', {})
+    for stage, seconds in timer.timings.items():
+        timings[stage] = timings.get(stage, 0.0) + seconds
+    if stats is None:
+        record_classifier_stats(collected)
+    return scores
+
+def record_classifier_stats(stats):
+    """Record cascade tier counts and latencies; the timings are removed so they are not stored"""
+    if not stats:
+        return
+    metrics.record_stages(stats.pop('timings', {}))
+    for tier in ('rules', 'model'):
+        metrics.inc('cascade_questions', stats.get(tier, 0), {'tier': tier})
+    metrics.inc('cascade_changed', stats.get('changed', 0))
+
+def classify_question(question, return_multiple=False, scores=None):
+    """Classify a question into Bloom's Taxonomy levels with multi-level detection
     
-    # Check regular keywords from bloom_levels
-    for level, data in bloom_levels.items():
-        for keyword in data["keywords"]:
-            if keyword.lower() in question_lower:
-                level_scores[level] += 1
+    scores, when given, is the question's score vector from score_questions
+    (e.g. from the question bank) and is used instead of scoring again.
+    """
+    question_lower = question.lower().strip()
+    level_scores = dict(scores) if scores is not None else score_questions([question])[0]
     
     # Multi-level detection: questions that span multiple levels
     total_score = sum(level_scores.values())
@@ -550,56 +1340,187 @@ def classify_question(question, return_multiple=False):
     
     return best_level
 
-def analyze_question_paper(questions):
-    """Analyze a complete question paper and provide statistics with multi-level detection"""
-    results = []
+def classify_questions(questions, bank_scores=None, new_entries=None, stats=None):
+    """Classify a batch of questions in one call, returning one level per question
+    
+    bank_scores maps question hashes to stored score vectors that are used
+    instead of scoring again; questions scored here are added to new_entries.
+    stats works as in score_questions.
+    """
+    if bank_scores is None and new_entries is None:
+        return [classify_question(question, scores=scores)
+                for question, scores in zip(questions, score_questions(questions, stats))]
+    
+    bank_scores = bank_scores or {}
+    new_entries = {} if new_entries is None else new_entries
+    hashes = [question_hash(question) for question in questions]
+    # Score every question missing from the bank in one batch
+    missing = {}
+    for question, hash_ in zip(questions, hashes):
+        if hash_ not in bank_scores and hash_ not in new_entries:
+            missing.setdefault(hash_, question)
+    for (hash_, question), scores in zip(missing.items(), score_questions(list(missing.values()), stats)):
+        new_entries[hash_] = {'scores': scores, 'level': classify_question(question, scores=scores)}
+    
+    levels = []
+    for question, hash_ in zip(questions, hashes):
+        scores = bank_scores.get(hash_)
+        if scores is None:
+            levels.append(new_entries[hash_]['level'])
+        else:
+            levels.append(classify_question(question, scores=scores))
+    return levels
+
+def extract_paper_questions(file_path, file_extension):
+    """Extract the text and questions of a saved file.
+    
+    Returns (text, questions, stage timings); the timings are recorded by the
+    caller because this may run in a CPU worker process.
+    """
+    timer = metrics.StageTimer()
+    with timer('extract_text_from_file'):
+        text = extract_text_from_file(file_path, file_extension)
+    if not text:
+        return text, [], timer.timings
+    with timer('extract_questions_from_text'):
+        questions = extract_questions_from_text(text)
+    return text, questions, timer.timings
+
+def extract_and_analyze_file(file_path, file_extension, previous=None):
+    """Run the whole question-paper pipeline for a saved file.
+    
+    Returns (text, questions, analysis, stage timings) like
+    extract_paper_questions. previous is passed on to analyze_question_paper
+    for incremental analysis.
+    """
+    text, questions, timings = extract_paper_questions(file_path, file_extension)
+    if not questions:
+        return text, questions, None, timings
+    timer = metrics.StageTimer()
+    timer.timings = timings
+    with timer('classification'):
+        analysis = analyze_question_paper(questions, previous)
+    return text, questions, analysis, timer.timings
+
+def classify_report_questions(questions, bank_scores=None, new_entries=None):
+    """Classify questions read from an Excel/CSV file into report rows and statistics"""
+    classified_questions = []
     level_counts = {level: 0 for level in bloom_levels.keys()}
-    multi_level_questions = []
+    stats = {}
+    levels = classify_questions(questions, bank_scores, new_entries, stats)
+    
+    for i, (question, level) in enumerate(zip(questions, levels), 1):
+        level_counts[level] += 1
+        
+        classified_questions.append({
+            'question_number': i,
+            'question': question,
+            'level': level,
+            'description': bloom_levels[level]['description'],
+            'color': bloom_levels[level]['color']
+        })
+    
     total_questions = len(questions)
+    analysis = {
+        'total_questions': total_questions,
+        'level_counts': level_counts,
+        'level_percentages': build_level_percentages(level_counts, total_questions),
+        'questions': classified_questions
+    }
+    if stats:
+        analysis['classifier'] = stats
+    return analysis
+
+def analyze_question(question, question_number, scores=None):
+    """Classify one question of a paper into its result row, with multi-level detection"""
+    if scores is None:
+        scores = score_questions([question])[0]
+    
+    # Try multi-level classification first
+    multi_levels = classify_question(question, return_multiple=True, scores=scores)
     
-    for i, question in enumerate(questions, 1):
-        # Try multi-level classification first
-        multi_levels = classify_question(question, return_multiple=True)
+    if len(multi_levels) > 1:
+        # Multi-level question
+        primary_level = multi_levels[0]['level']
         
-        if len(multi_levels) > 1:
-            # Multi-level question
-            primary_level = multi_levels[0]['level']
-            level_counts[primary_level] += 1
-            
-            # Create display string for multiple levels
-            level_display = " + ".join([ml['level'].split('-')[1] for ml in multi_levels])
-            
-            results.append({
-                'question_number': i,
-                'question': question,
-                'level': primary_level,
-                'level_display': level_display,
-                'description': bloom_levels[primary_level]['description'],
-                'color': bloom_levels[primary_level]['color'],
-                'is_multi_level': True,
-                'all_levels': multi_levels
-            })
-            
-            multi_level_questions.append({
-                'question_number': i,
-                'question': question,
-                'levels': multi_levels
-            })
-        else:
-            # Single level question (traditional)
-            level = classify_question(question)
-            level_counts[level] += 1
-            
-            results.append({
-                'question_number': i,
-                'question': question,
-                'level': level,
-                'level_display': level.split('-')[1],
-                'description': bloom_levels[level]['description'],
-                'color': bloom_levels[level]['color'],
-                'is_multi_level': False,
-                'all_levels': [multi_levels[0]] if multi_levels else []
-            })
+        # Create display string for multiple levels
+        level_display = " + ".join([ml['level'].split('-')[1] for ml in multi_levels])
+        
+        return {
+            'question_number': question_number,
+            'question': question,
+            'level': primary_level,
+            'level_display': level_display,
+            'description': bloom_levels[primary_level]['description'],
+            'color': bloom_levels[primary_level]['color'],
+            'is_multi_level': True,
+            'all_levels': multi_levels
+        }
+    
+    # Single level question (traditional)
+    level = classify_question(question, scores=scores)
+    return {
+        'question_number': question_number,
+        'question': question,
+        'level': level,
+        'level_display': level.split('-')[1],
+        'description': bloom_levels[level]['description'],
+        'color': bloom_levels[level]['color'],
+        'is_multi_level': False,
+        'all_levels': [multi_levels[0]] if multi_levels else []
+    }
+
+def analyze_question_paper(questions, previous=None, bank_scores=None, new_entries=None):
+    """Analyze a complete question paper and provide statistics with multi-level detection
+    
+    previous is the results of an earlier version of the same document: its
+    unchanged questions (by hash) are reused, only new or edited questions are
+    classified, and the level counts are updated from the earlier counts.
+    bank_scores and new_entries work as in classify_questions. An earlier version
+    classified by another lexicon or model is ignored.
+    """
+    previous = reusable_results(previous)
+    previous_items = (previous.get('questions') or []) if previous else []
+    known = {}
+    for item in previous_items:
+        known.setdefault(item_hash(item), item)
+    
+    hashes = [question_hash(question) for question in questions]
+    # Score the questions that are neither in the earlier version nor in the bank in one batch
+    missing = {}
+    for question, hash_ in zip(questions, hashes):
+        if hash_ not in known and not (bank_scores and hash_ in bank_scores):
+            missing.setdefault(hash_, question)
+    stats = {}
+    fresh_scores = dict(zip(missing, score_questions(list(missing.values()), stats)))
+    
+    results = []
+    classified = len(fresh_scores)
+    served_from_bank = 0
+    for i, (question, hash_) in enumerate(zip(questions, hashes), 1):
+        earlier = known.get(hash_)
+        if earlier is None:
+            if hash_ in fresh_scores:
+                scores = fresh_scores[hash_]
+                earlier = known[hash_] = analyze_question(question, i, scores)
+                if new_entries is not None:
+                    new_entries[hash_] = {'scores': scores, 'level': earlier['level']}
+            else:
+                served_from_bank += 1
+                earlier = known[hash_] = analyze_question(question, i, bank_scores[hash_])
+        results.append(dict(earlier, question_number=i, question=question, question_hash=hash_))
+    
+    level_counts = incremental_level_counts(previous, previous_items, results) if previous_items else None
+    if level_counts is None:
+        level_counts = {level: 0 for level in bloom_levels.keys()}
+        for item in results:
+            level_counts[item['level']] += 1
+    
+    multi_level_questions = [
+        {'question_number': item['question_number'], 'question': item['question'], 'levels': item['all_levels']}
+        for item in results if item['is_multi_level']
+    ]
+    total_questions = len(questions)
     
     # Calculate percentages
     level_percentages = {}
@@ -610,14 +1531,162 @@ def analyze_question_paper(questions):
             'percentage': round(percentage, 1)
         }
     
-    return {
+    analysis = {
         'total_questions': total_questions,
         'level_counts': level_counts,
         'level_percentages': level_percentages,
         'questions': results,
         'multi_level_questions': multi_level_questions,
-        'multi_level_count': len(multi_level_questions)
+        'multi_level_count': len(multi_level_questions),
+        'classifier_version': get_lexicon_version()
     }
+    if stats:
+        analysis['classifier'] = stats
+    if previous_items:
+        analysis['revision'] = dict(
+            diff_questions(previous_items, results),
+            reused=total_questions - classified - served_from_bank,
+            classified=classified
+        )
+    if bank_scores is not None:
+        analysis['question_bank'] = question_bank_summary(served_from_bank, total_questions)
+    return analysis
+
+def question_bank_summary(served, total):
+    """Share of a request's questions whose classification came from the question bank"""
+    return {'served': served, 'total': total, 'share': round(served / total, 3) if total else 0.0}
+
+def analyze_paper_with_bank(questions, previous=None, bank_scores=None):
+    """analyze_question_paper for the CPU executor; also returns the new question bank entries"""
+    new_entries = {}
+    analysis = analyze_question_paper(questions, previous, bank_scores, new_entries)
+    return analysis, new_entries
+
+def classify_report_with_bank(questions, bank_scores=None):
+    """classify_report_questions for the CPU executor; also returns the new question bank entries"""
+    new_entries = {}
+    analysis = classify_report_questions(questions, bank_scores, new_entries)
+    if bank_scores is not None:
+        served = sum(1 for question in questions if question_hash(question) in bank_scores)
+        analysis['question_bank'] = question_bank_summary(served, len(questions))
+    return analysis, new_entries
+
+def lookup_question_bank(questions, exclude=()):
+    """Stored score vectors for these questions, fetched with one $in query (None when the bank is off)"""
+    if not Config.QUESTION_BANK_ENABLED:
+        return None
+    hashes = {question_hash(question) for question in questions}.difference(exclude)
+    try:
+        with metrics.timed('question_bank_lookup'):
+            return question_bank.lookup_scores(question_bank_collection, hashes, get_lexicon_version())
+    except Exception as e:
+        log_event(logger, 'question_bank_lookup_failed', logging.ERROR, error=str(e))
+        return {}
+
+def store_question_bank_entries(new_entries):
+    try:
+        question_bank.store_scores(question_bank_collection, new_entries, get_lexicon_version())
+    except Exception as e:
+        log_event(logger, 'question_bank_store_failed', logging.ERROR, error=str(e))
+
+def finish_question_bank(summary, new_entries):
+    """Count bank hits and add newly classified questions to the bank in the background"""
+    if summary:
+        metrics.inc('question_bank_hits', summary['served'])
+        metrics.inc('question_bank_misses', summary['total'] - summary['served'])
+    if new_entries and Config.QUESTION_BANK_ENABLED:
+        try:
+            submit_io(store_question_bank_entries, new_entries)
+        except ExecutorBusy:
+            pass  # The bank is only a cache; these questions are stored next time
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.before_request
+def start_profiling():
+    """Profile this request when an admin asks for it or it is sampled"""
+    requested = request.headers.get('X-Profile') == '1' and is_admin_request()
+    sampled = Config.PROFILE_SAMPLE_RATE > 0 and random.random() < Config.PROFILE_SAMPLE_RATE
+    if requested or sampled:
+        profiler = RequestProfiler.start()
+        if profiler is None:
+            # Another request is being profiled; this one runs normally
+            metrics.inc('profiles_skipped')
+            return
+        # cProfile only sees this thread, so run the CPU stages here too
+        set_inline(True)
+        g.profiler = profiler
+
+@app.teardown_request
+def finish_profiling(exc):
+    profiler = g.pop('profiler', None)
+    if profiler is None:
+        return
+    set_inline(False)
+    duration = profiler.stop()
+    try:
+        profiler.save(
+            Config.PROFILE_DIR,
+            request.url_rule.rule if request.url_rule else request.path,
+            request.content_length,
+            duration,
+            Config.PROFILE_MAX_FILES
+        )
+    except OSError as e:
+        log_event(logger, 'profile_save_failed', logging.ERROR, error=str(e))
+
+@app.after_request
+def record_request_metrics(response):
+    """Count requests and record latency per route (the URL rule, not the raw path)"""
+    started = g.pop('request_started', None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.observe('http_request_duration_seconds', time.perf_counter() - started,
+                        {'route': route, 'method': request.method})
+        metrics.inc('http_requests', labels={'route': route, 'method': request.method, 'status': response.status_code})
+    return response
+
+@app.errorhandler(MemoryBudgetExceeded)
+def handle_memory_budget_exceeded(error):
+    """The job would not fit the per-request memory budget"""
+    route = request.url_rule.rule if request.url_rule else request.path
+    metrics.inc('memory_budget_rejections', labels={'route': route})
+    return jsonify({'error': str(error)}), 413
+
+@app.errorhandler(ColumnarExportUnavailable)
+def handle_columnar_export_unavailable(error):
+    return jsonify({'error': str(error)}), 501
+
+@app.errorhandler(ChunkedUploadError)
+def handle_chunked_upload_error(error):
+    """Chunked upload errors carry their status and, where useful, the offset to resume from"""
+    return jsonify(dict(error.details, error=str(error))), error.status
+
+@app.errorhandler(ArchiveRejected)
+def handle_archive_rejected(error):
+    return jsonify({'error': str(error)}), error.status
+
+@app.errorhandler(JobError)
+def handle_job_error(error):
+    return jsonify({'error': str(error)}), error.status
+
+@app.errorhandler(AdmissionRejected)
+def handle_admission_rejected(error):
+    """Rate limited (429) or over the route's concurrency limits (503)"""
+    response = jsonify({'error': str(error)})
+    response.status_code = error.status
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+@app.errorhandler(ExecutorBusy)
+def handle_executor_busy(error):
+    """The CPU or I/O executor queue is full: ask the client to retry"""
+    response = jsonify({'error': str(error)})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(int(Config.EXECUTOR_SUBMIT_TIMEOUT))
+    return response
 
 @app.route('/')
 def index():
@@ -682,6 +1751,7 @@ def register():
 @app.route('/logout')
 @login_required
 def logout():
+    invalidate_cached_user(current_user.id)
     logout_user()
     return redirect(url_for('login'))
 
@@ -692,38 +1762,71 @@ def dashboard():
     try:
         if hasattr(analyses_collection, 'find'):
             recent_analyses = list(analyses_collection.find(
-                {'user_id': current_user.id}
-            ).sort('created_at', -1).limit(5))
+                {'user_id': current_user.id},
+                {'results.questions': 0, 'results.multi_level_questions': 0}
+            ).sort([('created_at', -1), ('_id', -1)]).limit(5))
         else:
             recent_analyses = []
     except Exception as e:
-        print(f"Error fetching analyses: {e}")
+        log_event(logger, 'analyses_fetch_failed', logging.ERROR, error=str(e), user_id=current_user.id)
         recent_analyses = []
     
-    return render_template('dashboard.html', recent_analyses=recent_analyses)
+    stats = get_user_stats(current_user.id)
+    return render_template('dashboard.html', recent_analyses=recent_analyses, stats=stats)
 
-@app.route('/classifier')
+@app.route('/profile', methods=['GET', 'POST'])
+@login_required
+def profile():
+    if request.method == 'POST':
+        data = request.get_json()
+        name = (data.get('name') or '').strip()
+        
+        if not name:
+            return jsonify({'success': False, 'message': 'Please provide a name'})
+        
+        try:
+            users_collection.update_one(
+                {'_id': ObjectId(current_user.id)},
+                {'$set': {'name': name}}
+            )
+        except Exception as e:
+            log_event(logger, 'profile_update_failed', logging.ERROR, error=str(e), user_id=current_user.id)
+            return jsonify({'success': False, 'message': 'Could not update profile'})
+        
+        invalidate_cached_user(current_user.id)
+        return jsonify({'success': True, 'name': name})
+    
+    stats = get_user_stats(current_user.id)
+    return render_template(
+        'profile.html',
+        total_analyses=stats['total_analyses'],
+        level_distribution=stats['level_counts']
+    )
+
+@app.route('/classifier')
 @login_required
 def classifier():
     return render_template('classifier.html')
 
 @app.route('/classify', methods=['POST'])
-@login_required
+@token_or_login_required
+@admission_controlled('classify')
 def classify():
     data = request.get_json()
     question = data.get('question', '').strip()
     
-    print(f"Received question: {question}")
+    log_event(logger, 'question_received', question=question)
     
     if not question:
         return jsonify({'error': 'Please provide a question'})
     
-    level = classify_question(question)
+    with metrics.timed('classification'):
+        level = classify_question(question)
     level_data = bloom_levels[level]
     
     # Save to database
     save_analysis_to_db(
-        current_user.id,
+        get_request_user_id(),
         'single_question',
         question,
         {'level': level}
@@ -737,8 +1840,381 @@ def classify():
         'question': question
     })
 
+def parse_batch_questions(req):
+    """Read questions from a JSON array or an NDJSON request body.
+    
+    Each item may be a plain string or an object with a "question" field;
+    a JSON object with a "questions" list is accepted too.
+    """
+    body = req.get_data(as_text=True)
+    
+    if req.mimetype in ('application/x-ndjson', 'application/jsonlines', 'text/plain'):
+        items = [json.loads(line) for line in body.splitlines() if line.strip()]
+    else:
+        items = json.loads(body) if body.strip() else []
+        if isinstance(items, dict):
+            items = items.get('questions', [])
+    
+    if not isinstance(items, list):
+        raise ValueError('Expected a JSON array of questions')
+    
+    questions = []
+    for item in items:
+        question = item.get('question', '') if isinstance(item, dict) else item
+        if not isinstance(question, str):
+            raise ValueError('Each question must be a string')
+        questions.append(question.strip())
+    return questions
+
+@app.route('/api/classify/batch', methods=['POST'])
+@token_or_login_required
+@admission_controlled('classify')
+def classify_batch():
+    """Classify many questions at once and stream the results back as NDJSON"""
+    try:
+        questions = parse_batch_questions(request)
+    except ValueError as e:
+        return jsonify({'error': f'Invalid request body: {e}'}), 400
+    
+    if not questions:
+        return jsonify({'error': 'Please provide at least one question'}), 400
+    if len(questions) > Config.BATCH_MAX_QUESTIONS:
+        return jsonify({'error': f'A batch may contain at most {Config.BATCH_MAX_QUESTIONS} questions'}), 413
+    
+    # Empty entries keep their position in the stream but are not classified
+    to_classify = [question for question in questions if question]
+    bank_scores = lookup_question_bank(to_classify)
+    user_id = get_request_user_id()
+    
+    def generate():
+        """Classify chunk by chunk, writing each chunk's results before starting the next"""
+        new_entries = {}
+        level_counts = {level: 0 for level in bloom_levels.keys()}
+        classified_questions = []
+        step = max(Config.BATCH_STREAM_CHUNK, 1)
+        for start in range(0, len(questions), step):
+            chunk = questions[start:start + step]
+            with metrics.timed('classification'):
+                levels = iter(classify_questions([question for question in chunk if question], bank_scores,
+                                                 new_entries))
+            lines = []
+            for i, question in enumerate(chunk, start + 1):
+                if not question:
+                    lines.append(json.dumps({'question_number': i, 'error': 'Please provide a question'}))
+                    continue
+                level = next(levels)
+                level_counts[level] += 1
+                classified_questions.append({'question_number': i, 'question': question, 'level': level})
+                level_data = bloom_levels[level]
+                lines.append(json.dumps({
+                    'question_number': i,
+                    'success': True,
+                    'level': level,
+                    'description': level_data['description'],
+                    'color': level_data['color'],
+                    'question': question
+                }))
+            yield '\n'.join(lines) + '\n'
+        
+        if bank_scores is not None:
+            served = sum(1 for question in to_classify if question_hash(question) in bank_scores)
+            finish_question_bank(question_bank_summary(served, len(to_classify)), new_entries)
+        
+        # Persist the whole batch as a single analysis once every result is out
+        total_questions = len(to_classify)
+        save_analysis_to_db(
+            user_id,
+            'batch_classify',
+            f'Batch of {total_questions} questions',
+            {
+                'total_questions': total_questions,
+                'level_counts': level_counts,
+                'level_percentages': build_level_percentages(level_counts, total_questions),
+                'questions': classified_questions
+            }
+        )
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+def no_progress(stage, percent=None):
+    pass
+
+def paper_classification_inputs(questions, previous):
+    """The previous version's results and the question bank scores a paper is classified with
+    
+    Questions of the previous version are reused; the rest are looked up in the
+    question bank in one query, and only questions missing from both are classified.
+    """
+    previous_results = reusable_results(previous.get('results') if previous else None)
+    previous_hashes = [item_hash(item) for item in (previous_results or {}).get('questions') or []]
+    return previous_results, lookup_question_bank(questions, exclude=previous_hashes)
+
+def reusable_results(previous_results):
+    """The previous version's results if they were classified by the current lexicon or model, else None"""
+    if previous_results and previous_results.get('classifier_version') == get_lexicon_version():
+        return previous_results
+    return None
+
+def link_revision(analysis, previous, lineage):
+    if 'revision' in analysis:
+        analysis['revision']['lineage'] = lineage
+        analysis['revision']['previous_analysis_id'] = str(previous['_id'])
+        metrics.inc('questions_reused', analysis['revision']['reused'])
+
+def analyze_paper_file(file_path, filename, file_extension, user_id, lineage, route, keep_file=False,
+                       progress=no_progress, job_id=None):
+    """Run the question-paper pipeline on a saved file and return the response payload
+    
+    The file is removed once its text has been extracted, unless keep_file is set.
+    progress(stage, percent) is called as the pipeline moves on, and job_id fixes the
+    id of the saved analysis (background jobs).
+    """
+    analysis_id = job_analysis_id(job_id)
+    previous = find_previous_analysis(user_id, lineage, analysis_id)
+    metrics.observe('bytes_per_upload', os.path.getsize(file_path), {'route': route}, metrics.BYTES_BUCKETS)
+    
+    # Extract text and find questions on the CPU executor
+    progress('extracting', 10)
+    try:
+        text, questions, timings = run_cpu_measured(extract_paper_questions, file_path, file_extension)
+        metrics.record_stages(timings)
+    finally:
+        # Clean up uploaded file
+        if not keep_file:
+            try:
+                os.remove(file_path)
+            except:
+                pass
+    
+    if not text:
+        return {'error': 'Could not extract text from the uploaded file'}
+    
+    if not questions:
+        return {'error': 'No questions found in the uploaded file'}
+    
+    metrics.observe('questions_per_upload', len(questions), {'route': route}, metrics.COUNT_BUCKETS)
+    
+    previous_results, bank_scores = paper_classification_inputs(questions, previous)
+    progress('classifying', 40)
+    with metrics.timed('classification'):
+        analysis, new_entries = run_cpu_measured(analyze_paper_with_bank, questions, previous_results, bank_scores)
+    record_classifier_stats(analysis.get('classifier'))
+    finish_question_bank(analysis.get('question_bank'), new_entries)
+    
+    near_duplicates = find_near_duplicates(questions, user_id, lineage)
+    if near_duplicates is not None:
+        analysis['near_duplicates'] = near_duplicates
+    
+    link_revision(analysis, previous, lineage)
+    
+    # Save to database
+    progress('saving', 90)
+    saved = save_analysis(
+        user_id,
+        'file_upload',
+        text,
+        analysis,
+        lineage,
+        analysis_id
+    )
+    
+    return dict(saved, success=True, filename=filename, analysis=analysis)
+
+def analyze_report_file(file_path, filename, file_extension, user_id, chunksize, route, keep_file=False,
+                        progress=no_progress, job_id=None):
+    """Classify the question list in a saved Excel/CSV file and return the response payload
+    
+    The file is removed once its questions have been read, unless keep_file is set.
+    """
+    metrics.observe('bytes_per_upload', os.path.getsize(file_path), {'route': route}, metrics.BYTES_BUCKETS)
+    
+    # Extract questions from file on the CPU executor
+    progress('reading', 10)
+    try:
+        with metrics.timed('read_questions_from_file'):
+            questions = run_cpu_measured(read_questions_from_file, file_path, file_extension, chunksize)
+    finally:
+        # Clean up uploaded file
+        if not keep_file:
+            try:
+                os.remove(file_path)
+            except:
+                pass
+    
+    if not questions:
+        return {'error': 'No questions found in the uploaded file. Please ensure your file has a "Question" column or questions in the first column.'}
+    
+    metrics.observe('questions_per_upload', len(questions), {'route': route}, metrics.COUNT_BUCKETS)
+    
+    # Classify each question
+    bank_scores = lookup_question_bank(questions)
+    progress('classifying', 40)
+    with metrics.timed('classification'):
+        analysis_result, new_entries = run_cpu_measured(classify_report_with_bank, questions, bank_scores)
+    record_classifier_stats(analysis_result.get('classifier'))
+    finish_question_bank(analysis_result.get('question_bank'), new_entries)
+    
+    near_duplicates = find_near_duplicates(questions, user_id)
+    if near_duplicates is not None:
+        analysis_result['near_duplicates'] = near_duplicates
+    
+    # Save to database
+    progress('saving', 90)
+    saved = save_analysis(
+        user_id,
+        'report_upload',
+        f'Excel/CSV file: {filename}',
+        analysis_result,
+        analysis_id=job_analysis_id(job_id)
+    )
+    
+    return dict(saved, success=True, filename=filename, analysis=analysis_result)
+
+def remember_report(payload):
+    """Keep a classified question list in the session for /download_report (bearer-token clients stay stateless)"""
+    if 'analysis' in payload and not g.get('api_user_id'):
+        session['report_data'] = payload['analysis']['questions']
+        session['report_filename'] = payload['filename']
+
+def extract_archive_member(name, file_bytes, file_extension):
+    """Find the questions of one archive member held in memory (runs in a CPU worker)
+    
+    Returns (name, file extension, questions, extracted text or None, stage timings).
+    """
+    timer = metrics.StageTimer()
+    source = io.BytesIO(file_bytes)
+    text = None
+    if file_extension in REPORT_EXTENSIONS:
+        with timer('read_questions_from_file'):
+            questions = read_questions_from_file(source, file_extension)
+    else:
+        with timer('extract_text_from_file'):
+            text = extract_text_from_file(source, file_extension)
+        with timer('extract_questions_from_text'):
+            questions = extract_questions_from_text(text) if text else []
+    return name, file_extension, questions or [], text, timer.timings
+
+def classify_archive_member(file_extension, questions, previous_results, bank_scores):
+    """Classify an archive member's questions like /upload or /upload_report would (runs in a CPU worker)"""
+    if file_extension in REPORT_EXTENSIONS:
+        return classify_report_with_bank(questions, bank_scores)
+    return analyze_paper_with_bank(questions, previous_results, bank_scores)
+
+def analyze_archive_file(source, filename, user_id, route, progress=no_progress, job_id=None):
+    """Analyze every paper and question list in a ZIP archive and return the combined report payload
+    
+    Members are read from the archive into memory one at a time and their questions
+    extracted in parallel on the CPU executor; they are then classified in parallel
+    through the question bank (and, for papers, against their previous version).
+    Nothing is saved until every member has been analyzed, so a request that fails
+    partway can be retried without storing any member twice.
+    """
+    skipped = []
+    archive = open_archive(source, Config.ZIP_MAX_MEMBERS, Config.ZIP_MAX_TOTAL_BYTES)
+    member_count = sum(1 for info in archive.infolist() if not info.is_dir())
+    
+    def jobs():
+        members = iter_members(
+            archive,
+            ALLOWED_EXTENSIONS | REPORT_EXTENSIONS,
+            Config.ZIP_MAX_MEMBER_BYTES,
+            Config.ZIP_MAX_TOTAL_BYTES,
+            skipped
+        )
+        for name, file_extension, data in members:
+            if over_budget(estimate_file_job_bytes(len(data), file_extension)):
+                skipped.append({'filename': name, 'reason': 'too large to process within the memory budget'})
+                continue
+            yield name, data, file_extension
+    
+    # (name, file extension, questions, text, fixed analysis id for jobs) in archive order
+    extracted = []
+    with metrics.timed('archive_analysis'):
+        try:
+            for name, file_extension, questions, text, timings in map_cpu(extract_archive_member, jobs()):
+                metrics.record_stages(timings)
+                extracted.append((name, file_extension, questions, text, job_analysis_id(job_id, len(extracted))))
+                progress('extracting', min(49, 50 * (len(extracted) + len(skipped)) // max(member_count, 1)))
+        finally:
+            archive.close()
+        
+        # Previous versions and question bank scores are looked up here; only classification is parallel
+        found = [member for member in extracted if member[2]]
+        contexts = []
+        arguments = []
+        for name, file_extension, questions, text, analysis_id in found:
+            if file_extension in REPORT_EXTENSIONS:
+                contexts.append((None, None))
+                arguments.append((file_extension, questions, None, lookup_question_bank(questions)))
+            else:
+                lineage = document_lineage(os.path.basename(name))
+                previous = find_previous_analysis(user_id, lineage, analysis_id)
+                contexts.append((previous, lineage))
+                arguments.append((file_extension, questions) + paper_classification_inputs(questions, previous))
+        classified = []
+        with metrics.timed('classification'):
+            for result in map_cpu(classify_archive_member, arguments):
+                classified.append(result)
+                progress('classifying', 50 + 40 * len(classified) // max(len(found), 1))
+    
+    progress('saving', 90)
+    results = iter(zip(contexts, classified))
+    papers = []
+    for name, file_extension, questions, text, analysis_id in extracted:
+        if not questions:
+            papers.append({'filename': name, 'error': 'No questions found'})
+            continue
+        (previous, lineage), (analysis, new_entries) = next(results)
+        record_classifier_stats(analysis.get('classifier'))
+        finish_question_bank(analysis.get('question_bank'), new_entries)
+        metrics.observe('questions_per_upload', analysis['total_questions'], {'route': route}, metrics.COUNT_BUCKETS)
+        if file_extension in REPORT_EXTENSIONS:
+            saved = save_analysis(user_id, 'report_upload', f'Excel/CSV file: {name}', analysis,
+                                  analysis_id=analysis_id)
+        else:
+            link_revision(analysis, previous, lineage)
+            saved = save_analysis(user_id, 'file_upload', text, analysis, lineage, analysis_id)
+        papers.append({
+            **saved,
+            'filename': name,
+            'total_questions': analysis['total_questions'],
+            'level_counts': analysis['level_counts'],
+            'level_percentages': analysis['level_percentages'],
+            'questions': [
+                {'question_number': item['question_number'], 'question': item['question'], 'level': item['level']}
+                for item in analysis['questions']
+            ]
+        })
+    
+    level_counts = aggregate_level_counts(papers, bloom_levels.keys())
+    total_questions = sum(paper.get('total_questions', 0) for paper in papers)
+    return {
+        'success': True,
+        'filename': filename,
+        'papers': papers,
+        'skipped': skipped,
+        'aggregate': {
+            'total_papers': len(found),
+            'total_questions': total_questions,
+            'level_counts': level_counts,
+            'level_percentages': build_level_percentages(level_counts, total_questions)
+        }
+    }
+
+def report_chunksize(size_bytes, file_extension):
+    """Rows per chunk for CSV files too large to read at once (None to read whole files);
+    other oversized files are refused"""
+    estimated_bytes = estimate_file_job_bytes(size_bytes, file_extension)
+    if not over_budget(estimated_bytes):
+        return None
+    if file_extension != 'csv':
+        raise MemoryBudgetExceeded(estimated_bytes, Config.MEMORY_BUDGET_BYTES)
+    return Config.CSV_CHUNK_ROWS
+
 @app.route('/upload', methods=['POST'])
-@login_required
+@token_or_login_required
+@admission_controlled('upload')
+@track_peak_memory
 def upload_file():
     """Handle file upload and analyze question paper"""
     if 'file' not in request.files:
@@ -750,49 +2226,27 @@ def upload_file():
     
     if file and allowed_file(file.filename):
         filename = secure_filename(file.filename)
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(file_path)
-        
-        # Extract text from file
         file_extension = filename.rsplit('.', 1)[1].lower()
-        text = extract_text_from_file(file_path, file_extension)
         
-        if not text:
-            return jsonify({'error': 'Could not extract text from the uploaded file'})
-        
-        # Extract questions from text
-        questions = extract_questions_from_text(text)
-        
-        if not questions:
-            return jsonify({'error': 'No questions found in the uploaded file'})
+        # Refuse files whose processing would not fit the per-request memory budget
+        check_budget(estimate_file_job_bytes(request.content_length or 0, file_extension))
         
-        # Analyze the question paper
-        analysis = analyze_question_paper(questions)
+        # Earlier versions of the same document ("paper_v2.pdf" -> "paper") are analyzed incrementally
+        lineage = request.form.get('lineage', '').strip().lower() or document_lineage(filename)
+        if wants_async():
+            return submit_file_job('paper', file.save, filename, file_extension=file_extension, lineage=lineage)
         
-        # Save to database
-        save_analysis_to_db(
-            current_user.id,
-            'file_upload',
-            text,
-            analysis
-        )
-        
-        # Clean up uploaded file
-        try:
-            os.remove(file_path)
-        except:
-            pass
-        
-        return jsonify({
-            'success': True,
-            'filename': filename,
-            'analysis': analysis
-        })
+        file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+        with metrics.timed('file_save'):
+            file.save(file_path)
+        return jsonify(analyze_paper_file(file_path, filename, file_extension, get_request_user_id(), lineage, '/upload'))
     
     return jsonify({'error': 'Invalid file type. Please upload .txt, .pdf, .docx, or .doc files'})
 
 @app.route('/upload_report', methods=['POST'])
-@login_required
+@token_or_login_required
+@admission_controlled('upload')
+@track_peak_memory
 def upload_report_file():
     """Handle Excel/CSV file upload for report generation"""
     if 'file' not in request.files:
@@ -804,79 +2258,194 @@ def upload_report_file():
     
     if file and allowed_report_file(file.filename):
         filename = secure_filename(file.filename)
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(file_path)
-        
-        # Extract questions from file
         file_extension = filename.rsplit('.', 1)[1].lower()
-        questions = read_questions_from_file(file_path, file_extension)
-        
-        if not questions:
-            return jsonify({'error': 'No questions found in the uploaded file. Please ensure your file has a "Question" column or questions in the first column.'})
-        
-        # Classify each question
-        classified_questions = []
-        level_counts = {level: 0 for level in bloom_levels.keys()}
         
-        for i, question in enumerate(questions, 1):
-            level = classify_question(question)
-            level_counts[level] += 1
-            
-            classified_questions.append({
-                'question_number': i,
-                'question': question,
-                'level': level,
-                'description': bloom_levels[level]['description'],
-                'color': bloom_levels[level]['color']
-            })
-        
-        # Calculate statistics
-        total_questions = len(questions)
-        level_percentages = {}
-        for level, count in level_counts.items():
-            percentage = (count / total_questions * 100) if total_questions > 0 else 0
-            level_percentages[level] = {
-                'count': count,
-                'percentage': round(percentage, 1)
-            }
-        
-        analysis_result = {
-            'total_questions': total_questions,
-            'level_counts': level_counts,
-            'level_percentages': level_percentages,
-            'questions': classified_questions
-        }
+        # Oversized CSV files are read in streaming mode; other oversized files are refused
+        chunksize = report_chunksize(request.content_length or 0, file_extension)
+        if wants_async():
+            return submit_file_job('report', file.save, filename, file_extension=file_extension, chunksize=chunksize)
         
-        # Save to database
-        save_analysis_to_db(
-            current_user.id,
-            'report_upload',
-            f'Excel/CSV file: {filename}',
-            analysis_result
-        )
-        
-        # Store in session for download
-        session['report_data'] = classified_questions
-        session['report_filename'] = filename
-        
-        # Clean up uploaded file
-        try:
-            os.remove(file_path)
-        except:
-            pass
-        
-        return jsonify({
-            'success': True,
-            'filename': filename,
-            'analysis': analysis_result
-        })
+        file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+        with metrics.timed('file_save'):
+            file.save(file_path)
+        payload = analyze_report_file(file_path, filename, file_extension, get_request_user_id(), chunksize,
+                                      '/upload_report')
+        remember_report(payload)
+        return jsonify(payload)
     
     return jsonify({'error': 'Invalid file type. Please upload .xlsx, .xls, or .csv files'})
 
+@app.route('/upload_zip', methods=['POST'])
+@token_or_login_required
+@admission_controlled('upload')
+@track_peak_memory
+def upload_zip_file():
+    """Analyze a ZIP of question papers (pdf/docx/txt) and question lists (csv/xlsx) in one request"""
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file uploaded'})
+    
+    file = request.files['file']
+    if file.filename == '':
+        return jsonify({'error': 'No file selected'})
+    if not file.filename.lower().endswith('.zip'):
+        return jsonify({'error': 'Invalid file type. Please upload a .zip file'})
+    
+    if wants_async():
+        return submit_file_job('archive', file.save, secure_filename(file.filename))
+    
+    # Werkzeug already spooled the upload; members are read from it without extracting to disk
+    payload = analyze_archive_file(file.stream, secure_filename(file.filename), get_request_user_id(), '/upload_zip')
+    return jsonify(payload)
+
+@app.route('/api/uploads', methods=['POST'])
+@token_or_login_required
+def create_chunked_upload():
+    """Start a resumable upload of a question paper (kind "paper"), question list ("report") or ZIP of them ("archive")"""
+    data = request.get_json(silent=True) or {}
+    kind = data.get('kind', 'paper')
+    filename = secure_filename(str(data.get('filename', '')))
+    allowed = {
+        'paper': allowed_file,
+        'report': allowed_report_file,
+        'archive': lambda name: name.lower().endswith('.zip')
+    }.get(kind)
+    if allowed is None:
+        return jsonify({'error': 'kind must be "paper", "report" or "archive"'}), 400
+    if not filename or not allowed(filename):
+        return jsonify({'error': 'Invalid file type'}), 400
+    try:
+        size = int(data.get('size'))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'size must be the file size in bytes'}), 400
+    if size <= 0:
+        return jsonify({'error': 'size must be the file size in bytes'}), 400
+    if size > Config.CHUNKED_UPLOAD_MAX_BYTES:
+        return jsonify({'error': f'Files may be at most {Config.CHUNKED_UPLOAD_MAX_BYTES} bytes'}), 413
+    if kind == 'archive' and size > Config.ZIP_MAX_BYTES:
+        return jsonify({'error': f'Archives may be at most {Config.ZIP_MAX_BYTES} bytes'}), 413
+    
+    # Refuse files whose processing would not fit the memory budget before any bytes are sent
+    file_extension = filename.rsplit('.', 1)[1].lower()
+    fields = {'kind': kind}
+    if kind == 'paper':
+        check_budget(estimate_file_job_bytes(size, file_extension))
+        fields['lineage'] = str(data.get('lineage') or '').strip().lower() or document_lineage(filename)
+    elif kind == 'report':
+        fields['chunksize'] = report_chunksize(size, file_extension)
+    
+    upload = chunked_uploads.create(get_request_user_id(), filename, size, **fields)
+    return jsonify({
+        'upload_id': upload['id'],
+        'offset': 0,
+        'size': size,
+        'chunk_size': Config.CHUNKED_UPLOAD_CHUNK_BYTES
+    }), 201
+
+@app.route('/api/uploads/<upload_id>', methods=['PUT'])
+@token_or_login_required
+def put_upload_chunk(upload_id):
+    """Append the request body at ?offset=; X-Chunk-SHA256 carries the chunk's SHA-256"""
+    try:
+        offset = int(request.args.get('offset', ''))
+    except ValueError:
+        return jsonify({'error': 'offset must be an integer'}), 400
+    with metrics.timed('upload_chunk'):
+        offset = chunked_uploads.write_chunk(
+            upload_id,
+            get_request_user_id(),
+            offset,
+            request.get_data(cache=False),
+            request.headers.get('X-Chunk-SHA256')
+        )
+    return jsonify({'upload_id': upload_id, 'offset': offset})
+
+@app.route('/api/uploads/<upload_id>', methods=['GET'])
+@token_or_login_required
+def get_chunked_upload(upload_id):
+    """Where to resume: the number of bytes received so far"""
+    upload = chunked_uploads.status(upload_id, get_request_user_id())
+    return jsonify({
+        'upload_id': upload_id,
+        'filename': upload['filename'],
+        'kind': upload['kind'],
+        'size': upload['size'],
+        'offset': upload['offset']
+    })
+
+@app.route('/api/uploads/<upload_id>', methods=['DELETE'])
+@token_or_login_required
+def abort_chunked_upload(upload_id):
+    chunked_uploads.status(upload_id, get_request_user_id())
+    chunked_uploads.remove(upload_id)
+    return jsonify({'success': True})
+
+@app.route('/api/uploads/<upload_id>/finalize', methods=['POST'])
+@token_or_login_required
+@admission_controlled('upload')
+@track_peak_memory
+def finalize_chunked_upload(upload_id):
+    """Check the assembled file (optionally against {"sha256": ...}) and analyze it like /upload or /upload_report"""
+    data = request.get_json(silent=True) or {}
+    user_id = get_request_user_id()
+    route = '/api/uploads/finalize'
+    # The upload survives a failed finalize (503, memory budget, dropped connection) so it can be retried
+    with chunked_uploads.finalizing(upload_id, user_id, data.get('sha256')) as (upload, path, sha256):
+        filename = upload['filename']
+        file_extension = filename.rsplit('.', 1)[1].lower()
+        if wants_async():
+            params = {'file_extension': file_extension, 'sha256': sha256}
+            if upload['kind'] == 'paper':
+                params['lineage'] = upload['lineage']
+            elif upload['kind'] == 'report':
+                params['chunksize'] = upload.get('chunksize')
+            return submit_file_job(upload['kind'], lambda destination: link_or_copy(path, destination), filename,
+                                   **params)
+        if upload['kind'] == 'archive':
+            payload = analyze_archive_file(path, filename, user_id, route)
+        elif upload['kind'] == 'report':
+            payload = analyze_report_file(path, filename, file_extension, user_id, upload.get('chunksize'), route,
+                                          keep_file=True)
+            remember_report(payload)
+        else:
+            payload = analyze_paper_file(path, filename, file_extension, user_id, upload['lineage'], route,
+                                         keep_file=True)
+    payload['sha256'] = sha256
+    return jsonify(payload)
+
+def link_or_copy(source, destination):
+    """Hard-link a file where the filesystem allows it, copy it otherwise"""
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copyfile(source, destination)
+
+def render_report_file(questions_data, file_format, base_filename):
+    """Render a report on the CPU executor; returns (temporary file path or None, download name, MIME type)"""
+    download_filename = f"{base_filename}_blooms_report.{file_format}"
+    with metrics.timed('report_render'):
+        if file_format in COLUMNAR_FORMATS:
+            report_file_path, file_format = run_cpu_measured(create_columnar_report, questions_data, file_format)
+            download_filename = f"{base_filename}_blooms_report.{COLUMNAR_FORMATS[file_format][0]}"
+        else:
+            report_file_path = run_cpu_measured(create_report_file, questions_data, file_format)
+    
+    # Set appropriate MIME type
+    if file_format == 'xlsx':
+        mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    elif file_format == 'pdf':
+        mimetype = 'application/pdf'
+    elif file_format in COLUMNAR_FORMATS:
+        mimetype = COLUMNAR_FORMATS[file_format][1]
+    else:  # csv
+        mimetype = 'text/csv'
+    return report_file_path, download_filename, mimetype
+
 @app.route('/download_report/<format>')
 @login_required
+@admission_controlled('render')
+@track_peak_memory
 def download_report(format):
-    """Generate and download report in Excel, CSV, or PDF format"""
+    """Generate and download report in Excel, CSV, PDF, Parquet or Arrow format"""
     if 'report_data' not in session:
         return jsonify({'error': 'No report data available. Please upload a file first.'})
     
@@ -886,23 +2455,30 @@ def download_report(format):
     # Remove extension from original filename
     base_filename = original_filename.rsplit('.', 1)[0]
     
-    # Create report file
-    report_file_path = create_report_file(questions_data, format)
+    # Reports too large for the memory budget are streamed as CSV or refused
+    download_filename = f"{base_filename}_blooms_report.{format}"
+    estimated_bytes = estimate_report_bytes(len(questions_data), format)
+    if over_budget(estimated_bytes):
+        if format != 'csv':
+            raise MemoryBudgetExceeded(
+                estimated_bytes,
+                Config.MEMORY_BUDGET_BYTES,
+                f'This report is too large to render as {format}; please download it as CSV'
+            )
+        response = Response(stream_csv_report(questions_data), mimetype='text/csv')
+        response.headers['Content-Disposition'] = f'attachment; filename="{download_filename}"'
+        return response
     
+    if wants_async():
+        def save(path):
+            with open(path, 'w', encoding='utf-8') as file:
+                json.dump(questions_data, file)
+        return submit_file_job('report_render', save, 'questions.json', format=format, base_filename=base_filename)
+    
+    report_file_path, download_filename, mimetype = render_report_file(questions_data, format, base_filename)
     if not report_file_path:
         return jsonify({'error': 'Failed to generate report file'})
     
-    # Set download filename
-    download_filename = f"{base_filename}_blooms_report.{format}"
-    
-    # Set appropriate MIME type
-    if format == 'xlsx':
-        mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    elif format == 'pdf':
-        mimetype = 'application/pdf'
-    else:  # csv
-        mimetype = 'text/csv'
-    
     try:
         return send_file(
             report_file_path,
@@ -919,9 +2495,506 @@ def download_report(format):
         except:
             pass
 
+def wants_async():
+    """?async=1 queues the work as a background job and answers 202 with its status URL"""
+    return request.args.get('async', '').lower() in ('1', 'true')
+
+def summarize_job(job):
+    summary = {
+        'job_id': str(job['_id']),
+        'kind': job['kind'],
+        'status': job['status'],
+        'progress': job.get('progress'),
+        'attempts': job.get('attempts', 0),
+        'created_at': job['created_at'].isoformat(),
+        'status_url': url_for('get_job', job_id=str(job['_id']))
+    }
+    for key in ('started_at', 'finished_at'):
+        if job.get(key):
+            summary[key] = job[key].isoformat()
+    if job.get('error'):
+        summary['error'] = job['error']
+    if job.get('cancel_requested'):
+        summary['cancel_requested'] = True
+    if job['status'] == 'succeeded':
+        summary['result_url'] = url_for('get_job_result', job_id=str(job['_id']))
+    return summary
+
+def submit_file_job(kind, save, filename, **params):
+    """Queue a background job whose input save(path) writes into the job's directory; answers 202"""
+    if not job_queue.available:
+        raise JobsUnavailable('Background jobs are unavailable')
+    job_id = job_queue.new_job_id()
+    try:
+        with metrics.timed('file_save'):
+            save(os.path.join(job_queue.job_dir(job_id), filename))
+        job = job_queue.submit(get_request_user_id(), kind, dict(params, filename=filename), job_id)
+    except Exception:
+        shutil.rmtree(job_queue.job_dir(job_id), ignore_errors=True)
+        raise
+    response = jsonify(summarize_job(job))
+    response.status_code = 202
+    response.headers['Location'] = url_for('get_job', job_id=str(job_id))
+    return response
+
+def job_analysis_id(job_id, index=0):
+    """The id of the index-th analysis a job saves (None outside jobs)
+    
+    Every attempt of a job derives the same ids, so a retry after a failure that
+    followed the save finds the analyses already stored instead of adding copies.
+    """
+    if job_id is None:
+        return None
+    return ObjectId(hashlib.sha256(f'{job_id}:{index}'.encode()).digest()[:12])
+
+def save_job_result(job, payload):
+    """Write a job's JSON result next to its input; analyses can outgrow a MongoDB document"""
+    path = os.path.join(job_queue.job_dir(job['_id']), 'result.json')
+    with open(path + '.tmp', 'w', encoding='utf-8') as file:
+        json.dump(payload, file)
+    os.replace(path + '.tmp', path)
+    return {'file': 'result.json', 'mimetype': 'application/json'}
+
+def saved_job_result(job):
+    """The result an earlier attempt of this job already wrote, or None"""
+    if os.path.exists(os.path.join(job_queue.job_dir(job['_id']), 'result.json')):
+        return {'file': 'result.json', 'mimetype': 'application/json'}
+    return None
+
+def finish_file_job(job, input_path, payload):
+    """Drop the job's input once its result is written; inputs of failed jobs are kept for retries"""
+    if 'error' in payload:
+        raise JobFailed(payload['error'])
+    if 'sha256' in job['params']:
+        payload['sha256'] = job['params']['sha256']
+    result = save_job_result(job, payload)
+    os.remove(input_path)
+    return result
+
+def run_paper_job(job, progress):
+    params = job['params']
+    path = os.path.join(job_queue.job_dir(job['_id']), params['filename'])
+    result = saved_job_result(job)
+    if result:
+        return result
+    payload = analyze_paper_file(path, params['filename'], params['file_extension'], job['user_id'],
+                                 params['lineage'], '/api/jobs', keep_file=True, progress=progress,
+                                 job_id=job['_id'])
+    return finish_file_job(job, path, payload)
+
+def run_report_job(job, progress):
+    params = job['params']
+    path = os.path.join(job_queue.job_dir(job['_id']), params['filename'])
+    result = saved_job_result(job)
+    if result:
+        return result
+    payload = analyze_report_file(path, params['filename'], params['file_extension'], job['user_id'],
+                                  params.get('chunksize'), '/api/jobs', keep_file=True, progress=progress,
+                                  job_id=job['_id'])
+    return finish_file_job(job, path, payload)
+
+def run_archive_job(job, progress):
+    params = job['params']
+    path = os.path.join(job_queue.job_dir(job['_id']), params['filename'])
+    result = saved_job_result(job)
+    if result:
+        return result
+    try:
+        payload = analyze_archive_file(path, params['filename'], job['user_id'], '/api/jobs', progress,
+                                       job['_id'])
+    except ArchiveRejected as e:
+        raise JobFailed(str(e))
+    return finish_file_job(job, path, payload)
+
+def run_report_render_job(job, progress):
+    params = job['params']
+    directory = job_queue.job_dir(job['_id'])
+    with open(os.path.join(directory, params['filename']), encoding='utf-8') as file:
+        questions_data = json.load(file)
+    progress('rendering', 10)
+    report_file_path, download_filename, mimetype = render_report_file(
+        questions_data, params['format'], params['base_filename'])
+    if not report_file_path:
+        raise JobFailed('Failed to generate report file')
+    shutil.move(report_file_path, os.path.join(directory, 'report'))
+    return {'file': 'report', 'mimetype': mimetype, 'download_name': download_filename}
+
+def admitted_job(cost_class, handler):
+    """Run a job handler in a concurrency slot of the cost class its route uses
+    
+    Jobs and requests share the slots, so queued jobs cannot push a worker past
+    the CPU the limits were sized for. A job waits for a slot for as long as it
+    takes; progress() keeps it cancellable meanwhile.
+    """
+    @wraps(handler)
+    def run(job, progress):
+        if not Config.ADMISSION_ENABLED:
+            return handler(job, progress)
+        while True:
+            try:
+                release = admission.admit(cost_class, job['user_id'], background=True)
+                break
+            except AdmissionRejected as e:
+                progress('waiting', 0)
+                time.sleep(e.retry_after)
+        try:
+            return handler(job, progress)
+        finally:
+            release()
+    return run
+
+JOB_HANDLERS = {
+    'paper': admitted_job('upload', run_paper_job),
+    'report': admitted_job('upload', run_report_job),
+    'archive': admitted_job('upload', run_archive_job),
+    'report_render': admitted_job('render', run_report_render_job)
+}
+
+@app.route('/api/jobs')
+@token_or_login_required
+def list_jobs():
+    """The user's most recent background jobs, newest first"""
+    return jsonify({'jobs': [summarize_job(job) for job in job_queue.list(get_request_user_id(), 50)]})
+
+@app.route('/api/jobs/<job_id>')
+@token_or_login_required
+def get_job(job_id):
+    """Status and progress of a background job"""
+    return jsonify(summarize_job(job_queue.get(job_id, get_request_user_id())))
+
+@app.route('/api/jobs/<job_id>/result')
+@token_or_login_required
+def get_job_result(job_id):
+    """The finished job's result: the analysis as JSON, or the rendered report file"""
+    job = job_queue.get(job_id, get_request_user_id())
+    if job['status'] != 'succeeded':
+        return jsonify({'error': f"Job is {job['status']}", 'status': job['status']}), 409
+    result = job['result']
+    path = os.path.join(job_queue.job_dir(job['_id']), result['file'])
+    if not os.path.exists(path):
+        return jsonify({'error': 'Job result has expired'}), 410
+    if job['kind'] == 'report':
+        with open(path, encoding='utf-8') as file:
+            payload = json.load(file)
+        remember_report(payload)
+        return jsonify(payload)
+    if 'download_name' in result:
+        return send_file(path, as_attachment=True, download_name=result['download_name'],
+                         mimetype=result['mimetype'])
+    return send_file(path, mimetype=result['mimetype'])
+
+@app.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+@token_or_login_required
+def cancel_job(job_id):
+    """Cancel a queued job, or ask a running one to stop at its next progress update"""
+    return jsonify(summarize_job(job_queue.cancel(job_id, get_request_user_id())))
+
+@app.route('/api/jobs/<job_id>/retry', methods=['POST'])
+@token_or_login_required
+def retry_job(job_id):
+    """Queue a failed or cancelled job again"""
+    return jsonify(summarize_job(job_queue.retry(job_id, get_request_user_id()))), 202
+
+@app.route('/api/stats')
+@token_or_login_required
+def get_stats():
+    """Per-user Bloom's level statistics from the materialized aggregate"""
+    return jsonify(get_user_stats(get_request_user_id()))
+
+# Fields returned for each analysis when browsing history; full results are fetched by id
+ANALYSIS_SUMMARY_PROJECTION = {
+    'analysis_type': 1,
+    'created_at': 1,
+    'results.total_questions': 1,
+    'results.level_counts': 1,
+    'results.level': 1
+}
+
+def encode_analysis_cursor(analysis):
+    """Encode the (created_at, _id) keyset position of an analysis"""
+    position = {'created_at': analysis['created_at'].isoformat(), 'id': str(analysis['_id'])}
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+def decode_analysis_cursor(cursor):
+    """Decode a cursor into (created_at, ObjectId); raises ValueError if malformed"""
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(position['created_at']), ObjectId(position['id'])
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+def summarize_analysis(analysis):
+    """Compact JSON summary of an analysis from its summary projection"""
+    results = analysis.get('results') or {}
+    level_counts = results.get('level_counts')
+    if level_counts is None and results.get('level'):
+        level_counts = {results['level']: 1}
+    level_counts = level_counts or {}
+    return {
+        'id': str(analysis['_id']),
+        'analysis_type': analysis.get('analysis_type'),
+        'created_at': analysis['created_at'].isoformat() if analysis.get('created_at') else None,
+        'total_questions': results.get('total_questions', sum(level_counts.values())),
+        'level_counts': level_counts
+    }
+
+@app.route('/api/analyses')
+@token_or_login_required
+def list_analyses():
+    """Browse the user's analysis history newest first using keyset pagination"""
+    try:
+        limit = int(request.args.get('limit', Config.ANALYSES_PAGE_SIZE))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    limit = max(1, min(limit, Config.ANALYSES_MAX_PAGE_SIZE))
+    
+    # ?archived=1 browses analyses already moved to the cold collection
+    archived = request.args.get('archived', '').lower() in ('1', 'true')
+    collection = archived_analyses_collection if archived else analyses_collection
+    
+    query = {'user_id': get_request_user_id()}
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            created_at, last_id = decode_analysis_cursor(cursor)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        query['$or'] = [
+            {'created_at': {'$lt': created_at}},
+            {'created_at': created_at, '_id': {'$lt': last_id}}
+        ]
+    
+    if not hasattr(collection, 'find'):
+        return jsonify({'analyses': [], 'next_cursor': None})
+    
+    try:
+        # Fetch one extra document to know whether another page exists
+        page = list(collection.find(query, ANALYSIS_SUMMARY_PROJECTION)
+                    .sort([('created_at', -1), ('_id', -1)])
+                    .limit(limit + 1))
+    except Exception as e:
+        log_event(logger, 'analyses_fetch_failed', logging.ERROR, error=str(e), user_id=query['user_id'])
+        return jsonify({'error': 'Could not fetch analyses'}), 500
+    
+    has_more = len(page) > limit
+    page = page[:limit]
+    return jsonify({
+        'analyses': [summarize_analysis(analysis) for analysis in page],
+        'next_cursor': encode_analysis_cursor(page[-1]) if has_more else None
+    })
+
+@app.route('/api/questions/search')
+@token_or_login_required
+def search_questions():
+    """Search the user's stored questions by terms, an exact phrase and Bloom levels, newest first"""
+    from search_index import tokenize
+    try:
+        limit = int(request.args.get('limit', Config.SEARCH_PAGE_SIZE))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    limit = max(1, min(limit, Config.SEARCH_MAX_PAGE_SIZE))
+    
+    # Levels may be repeated (?level=a&level=b) or comma separated
+    levels = [level.strip() for value in request.args.getlist('level') for level in value.split(',') if level.strip()]
+    unknown = [level for level in levels if level not in bloom_levels]
+    if unknown:
+        return jsonify({'error': f"Unknown level: {', '.join(unknown)}"}), 400
+    
+    cursor = request.args.get('cursor')
+    if cursor:
+        # "<sort key>-<row id>" of the last question on the previous page
+        try:
+            key, row = cursor.split('-')
+            cursor = (int(key), int(row))
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+    
+    user_id = get_request_user_id()
+    index = get_question_index('search', user_id)
+    if index is None:
+        response = jsonify({'error': 'Your questions are still being indexed; please retry shortly'})
+        response.status_code = 503
+        response.headers['Retry-After'] = '1'
+        return response
+    with metrics.timed('question_search'):
+        hits, next_cursor = index.search(
+            user_id,
+            terms=tokenize(request.args.get('q', '')),
+            phrase=request.args.get('phrase'),
+            levels=levels,
+            limit=limit,
+            cursor=cursor or None
+        )
+    return jsonify({
+        'questions': hits,
+        'next_cursor': f'{next_cursor[0]}-{next_cursor[1]}' if next_cursor is not None else None
+    })
+
+def iter_user_history(user_id, include_archived=True):
+    """Yield a user's analyses oldest first, archived ones restored from the cold collection"""
+    sort = [('created_at', 1), ('_id', 1)]
+    if include_archived and hasattr(archived_analyses_collection, 'find'):
+        for archived in archived_analyses_collection.find({'user_id': user_id}, {'payload': 1}).sort(sort):
+            yield decompress_analysis(archived)
+    if hasattr(analyses_collection, 'aggregate'):
+        yield from analyses_collection.aggregate([
+            {'$match': {'user_id': user_id}},
+            {'$sort': dict(sort)},
+            question_rows_projection('results')
+        ])
+
+@app.route('/api/analyses/export')
+@token_or_login_required
+@admission_controlled('render')
+def export_analyses():
+    """Export the user's whole history, one row per question, as Parquet or Arrow"""
+    import tempfile
+    requested_format = request.args.get('format', 'parquet')
+    if requested_format not in COLUMNAR_FORMATS:
+        return jsonify({'error': f"format must be one of: {', '.join(COLUMNAR_FORMATS)}"}), 400
+    include_archived = request.args.get('archived', '1').lower() not in ('0', 'false')
+    
+    file_format = resolve_columnar_format(requested_format)
+    extension, mimetype = COLUMNAR_FORMATS[file_format]
+    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.' + extension)
+    temp_file.close()
+    try:
+        with metrics.timed('history_export'):
+            write_history(
+                iter_user_history(get_request_user_id(), include_archived),
+                temp_file.name,
+                file_format,
+                list(bloom_levels.keys())
+            )
+        return send_file(
+            temp_file.name,
+            as_attachment=True,
+            download_name=f'blooms_history.{extension}',
+            mimetype=mimetype
+        )
+    except Exception as e:
+        log_event(logger, 'history_export_failed', logging.ERROR, error=str(e))
+        return jsonify({'error': 'Could not export analyses'}), 500
+    finally:
+        try:
+            os.remove(temp_file.name)
+        except OSError:
+            pass
+
+@app.route('/api/analyses/<analysis_id>')
+@token_or_login_required
+def get_analysis(analysis_id):
+    """Return one analysis including its full results, restoring it from the archive if needed"""
+    try:
+        object_id = ObjectId(analysis_id)
+    except Exception:
+        return jsonify({'error': 'Invalid analysis id'}), 400
+    
+    query = {'_id': object_id, 'user_id': get_request_user_id()}
+    analysis = None
+    is_archived = False
+    try:
+        if hasattr(analyses_collection, 'find_one'):
+            analysis = analyses_collection.find_one(query)
+        if not analysis and hasattr(archived_analyses_collection, 'find_one'):
+            archived = archived_analyses_collection.find_one(query)
+            if archived:
+                analysis = decompress_analysis(archived)
+                is_archived = True
+    except Exception as e:
+        log_event(logger, 'analysis_fetch_failed', logging.ERROR, error=str(e), analysis_id=analysis_id)
+        return jsonify({'error': 'Could not fetch analysis'}), 500
+    
+    if not analysis:
+        return jsonify({'error': 'Analysis not found'}), 404
+    
+    summary = summarize_analysis(analysis)
+    summary['content'] = analysis.get('content')
+    summary['results'] = analysis.get('results')
+    summary['archived'] = is_archived
+    return jsonify(summary)
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus scrape endpoint for this worker's metrics"""
+    if not Config.METRICS_TOKEN and Config.METRICS_REQUIRE_TOKEN:
+        return jsonify({'error': 'Set METRICS_TOKEN to enable /metrics'}), 403
+    if Config.METRICS_TOKEN:
+        expected = f'Bearer {Config.METRICS_TOKEN}'
+        if not hmac.compare_digest(request.headers.get('Authorization', ''), expected):
+            return jsonify({'error': 'Unauthorized'}), 401
+    return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/admin/profiles')
+@admin_required
+def admin_list_profiles():
+    """List stored request profiles, newest first"""
+    return jsonify({'profiles': list_profiles(Config.PROFILE_DIR)})
+
+@app.route('/admin/profiles/<name>')
+@admin_required
+def admin_get_profile(name):
+    """Download a profile, or ?top=N for the N most expensive calls as text"""
+    if not is_profile_name(name) or not os.path.exists(os.path.join(Config.PROFILE_DIR, name)):
+        abort(404)
+    if request.args.get('top'):
+        try:
+            top = int(request.args['top'])
+        except ValueError:
+            return jsonify({'error': 'top must be an integer'}), 400
+        summary = summarize_profile(os.path.join(Config.PROFILE_DIR, name), top=top)
+        return Response(summary, mimetype='text/plain')
+    return send_from_directory(os.path.abspath(Config.PROFILE_DIR), name, as_attachment=True)
+
 @app.route('/api/levels')
 def get_levels():
     return jsonify(bloom_levels)
 
+def import_heavy_libraries():
+    """Import the libraries that request handlers otherwise load on first use"""
+    import pandas
+    import PyPDF2
+    import docx
+    import reportlab.platypus
+
+def warmup():
+    """Load immutable heavy state before the first request is accepted.
+    
+    In a pre-fork master this runs once and the result is shared copy-on-write
+    with every worker.
+    """
+    import_heavy_libraries()
+    get_lexicon()
+    get_report_styles()
+    # Exercise the classification path once so nothing is built lazily on a request
+    analyze_question_paper(["What is Bloom's Taxonomy?"])
+
+_configured = False
+
+def create_app(defer_worker_init=False):
+    """Configure the application from Config and return it.
+    
+    Every module reads Config directly, so settings come from the environment
+    (the WSGI/ASGI entry points set production defaults before importing it).
+    With defer_worker_init the MongoDB client and background threads are not
+    created here: a pre-fork server creates them in each worker after fork
+    (see gunicorn.conf.py), and as a fallback they are created on a worker's
+    first request.
+    """
+    global _configured
+    app.config.from_object(Config)
+    Config.init_app(app)
+    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+    warmup()
+    
+    if not _configured:
+        _configured = True
+        if defer_worker_init:
+            app.before_request(init_worker)
+    
+    if not defer_worker_init:
+        init_worker()
+    return app
+
 if __name__ == '__main__':
-    app.run(debug=True)
+    create_app().run(host=Config.HOST, port=Config.PORT, debug=Config.DEBUG)
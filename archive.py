@@ -0,0 +1,104 @@
+"""
+Cold archival of old analyses for the Bloom's Taxonomy Classifier
+
+Old file and report analyses are moved out of the hot analyses collection
+into a cold collection where the full document is kept as one zlib-compressed
+BSON blob next to a small summary, so history listings still work without
+decompressing anything.
+"""
+
+import logging
+import threading
+import zlib
+from datetime import datetime, timedelta
+
+import bson
+from bson.binary import Binary
+
+from logs import get_logger, log_event
+
+logger = get_logger('archive')
+
+# Analysis types that are deleted by the TTL index instead of being archived
+TTL_ANALYSIS_TYPES = ('single_question',)
+
+
+def compress_analysis(analysis):
+    """Build the cold-collection document for a hot analysis"""
+    results = analysis.get('results') or {}
+    summary = {}
+    for key in ('total_questions', 'level_counts', 'level'):
+        if key in results:
+            summary[key] = results[key]
+    return {
+        '_id': analysis['_id'],
+        'user_id': analysis.get('user_id'),
+        'analysis_type': analysis.get('analysis_type'),
+        'created_at': analysis.get('created_at'),
+        'archived_at': datetime.now(),
+        'results': summary,
+        'payload': Binary(zlib.compress(bson.encode(analysis), 6))
+    }
+
+
+def decompress_analysis(archived):
+    """Restore the original analysis document from its cold-collection entry"""
+    return bson.decode(zlib.decompress(archived['payload']))
+
+
+def archive_old_analyses(hot_collection, cold_collection, older_than_days, batch_size=500, on_archived=None):
+    """Move analyses older than the cutoff into the cold collection.
+
+    Safe to run concurrently from several workers: documents are upserted by
+    _id before being deleted from the hot collection. on_archived, if given,
+    is called with each batch once it has left the hot collection.
+    """
+    cutoff = datetime.now() - timedelta(days=older_than_days)
+    query = {
+        'analysis_type': {'$nin': list(TTL_ANALYSIS_TYPES)},
+        'created_at': {'$lt': cutoff}
+    }
+    archived = 0
+    while True:
+        batch = list(hot_collection.find(query).limit(batch_size))
+        if not batch:
+            return archived
+        for analysis in batch:
+            cold_collection.replace_one({'_id': analysis['_id']}, compress_analysis(analysis), upsert=True)
+        hot_collection.delete_many({'_id': {'$in': [analysis['_id'] for analysis in batch]}})
+        archived += len(batch)
+        if on_archived is not None:
+            on_archived(batch)
+
+
+class ArchiveWorker(threading.Thread):
+    """Daemon thread that periodically runs archive_old_analyses"""
+
+    def __init__(self, hot_collection, cold_collection, older_than_days, interval_seconds, batch_size=500,
+                 on_archived=None):
+        super().__init__(name='analysis-archiver', daemon=True)
+        self.hot_collection = hot_collection
+        self.cold_collection = cold_collection
+        self.older_than_days = older_than_days
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self.on_archived = on_archived
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval_seconds):
+            try:
+                archived = archive_old_analyses(
+                    self.hot_collection,
+                    self.cold_collection,
+                    self.older_than_days,
+                    self.batch_size,
+                    self.on_archived
+                )
+                if archived:
+                    log_event(logger, 'analyses_archived', count=archived)
+            except Exception as e:
+                log_event(logger, 'archive_failed', logging.ERROR, error=str(e))
+
+    def stop(self):
+        self._stop_event.set()
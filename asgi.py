@@ -0,0 +1,31 @@
+"""
+ASGI entry point for the Bloom's Taxonomy Classifier
+
+Run with:
+    uvicorn asgi:application --workers 4
+
+The event loop accepts connections and streams request and response bodies
+without tying up a thread, so slow clients cost nothing while they upload.
+Flask handlers run on a bounded thread pool (ASGI_HANDLER_THREADS), and the
+CPU-heavy stages they call are dispatched to the process pool in executors.py,
+so lightweight requests keep flowing while large papers are being analyzed.
+"""
+
+import os
+
+from a2wsgi import WSGIMiddleware
+from dotenv import load_dotenv
+
+# Production defaults, set before config.py reads the environment; the
+# environment and .env still win
+load_dotenv()
+os.environ.setdefault('FLASK_DEBUG', 'false')
+os.environ.setdefault('METRICS_REQUIRE_TOKEN', 'true')
+
+from app import create_app
+from config import Config
+
+application = WSGIMiddleware(
+    create_app(defer_worker_init=True),
+    workers=Config.ASGI_HANDLER_THREADS
+)
@@ -0,0 +1,224 @@
+"""
+Resumable chunked uploads for large question papers and question lists
+
+An upload is created with its file name and total size, then its bytes are
+sent as chunks PUT at the current offset, each with its SHA-256, and appended
+to a part file on disk. A client that loses its connection asks for the offset
+and continues from there. The whole file's SHA-256 is updated as chunks
+arrive; a worker process that did not see the earlier chunks catches up by
+hashing the part file once. Finalizing checks the size and digest and hands
+back the assembled file's path. It holds a lock on the upload so a retried
+finalize cannot process the file twice, and the upload is deleted only once
+processing succeeded; a finalize that fails can simply be retried.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: uploads are serialized per process only
+    fcntl = None
+
+STATE_FILE = 'state.json'
+PART_FILE = 'data.part'
+LOCK_FILE = 'finalize.lock'
+
+
+class ChunkedUploadError(Exception):
+    """Base class for chunked upload errors; status is the HTTP status to answer with"""
+    status = 400
+
+    def __init__(self, message, **details):
+        super().__init__(message)
+        self.details = details
+
+
+class UploadNotFound(ChunkedUploadError):
+    status = 404
+
+
+class OffsetMismatch(ChunkedUploadError):
+    """The chunk does not start where the received bytes end"""
+    status = 409
+
+
+class ChunkChecksumMismatch(ChunkedUploadError):
+    status = 422
+
+
+class UploadIncomplete(ChunkedUploadError):
+    status = 409
+
+
+class UploadFinalizing(ChunkedUploadError):
+    """Another request is already finalizing the upload"""
+    status = 409
+
+
+def _valid_id(upload_id):
+    try:
+        return uuid.UUID(upload_id).hex == upload_id
+    except (ValueError, TypeError, AttributeError):
+        return False
+
+
+class ChunkedUploadStore:
+    """Upload state and part files under root, one directory per upload"""
+
+    def __init__(self, root, max_chunk_bytes, ttl_seconds):
+        self.root = root
+        self.max_chunk_bytes = max_chunk_bytes
+        self.ttl_seconds = ttl_seconds
+        # upload id -> (bytes hashed, running sha256) for uploads whose chunks reached this process
+        self._hashers = {}
+        # Uploads being finalized by this process (for platforms without fcntl)
+        self._finalizing = set()
+        self._lock = threading.Lock()
+
+    def _dir(self, upload_id):
+        return os.path.join(self.root, upload_id)
+
+    def create(self, user_id, filename, size, **fields):
+        """Start an upload; returns its state"""
+        self.sweep()
+        upload_id = uuid.uuid4().hex
+        os.makedirs(self._dir(upload_id))
+        state = dict(fields, id=upload_id, user_id=user_id, filename=filename, size=size, created_at=time.time())
+        with open(os.path.join(self._dir(upload_id), STATE_FILE), 'w', encoding='utf-8') as file:
+            json.dump(state, file)
+        open(os.path.join(self._dir(upload_id), PART_FILE), 'wb').close()
+        return dict(state, offset=0)
+
+    def status(self, upload_id, user_id):
+        """The upload's state with the number of bytes received so far as offset"""
+        if not _valid_id(upload_id):
+            raise UploadNotFound('Upload not found')
+        try:
+            with open(os.path.join(self._dir(upload_id), STATE_FILE), encoding='utf-8') as file:
+                state = json.load(file)
+            offset = os.path.getsize(os.path.join(self._dir(upload_id), PART_FILE))
+        except (OSError, ValueError):
+            raise UploadNotFound('Upload not found')
+        if state['user_id'] != user_id:
+            raise UploadNotFound('Upload not found')
+        return dict(state, offset=offset)
+
+    def _update_hash(self, upload_id, path, offset, chunk):
+        """Fold a chunk written at offset into the upload's running SHA-256"""
+        with self._lock:
+            hashed, digest = self._hashers.get(upload_id, (0, None))
+            if digest is None or hashed != offset:
+                hashed, digest = 0, hashlib.sha256()
+                with open(path, 'rb') as file:
+                    while hashed < offset:
+                        block = file.read(min(1024 * 1024, offset - hashed))
+                        if not block:
+                            break
+                        digest.update(block)
+                        hashed += len(block)
+            digest.update(chunk)
+            self._hashers[upload_id] = (hashed + len(chunk), digest)
+
+    def write_chunk(self, upload_id, user_id, offset, chunk, checksum):
+        """Append a chunk that starts at offset and has the given hex SHA-256; returns the new offset"""
+        state = self.status(upload_id, user_id)
+        if len(chunk) > self.max_chunk_bytes:
+            raise ChunkedUploadError(f'Chunks may be at most {self.max_chunk_bytes} bytes')
+        if not checksum:
+            raise ChunkedUploadError('X-Chunk-SHA256 header is required')
+        if hashlib.sha256(chunk).hexdigest() != checksum.strip().lower():
+            raise ChunkChecksumMismatch('Chunk checksum does not match; resend the chunk', offset=state['offset'])
+
+        path = os.path.join(self._dir(upload_id), PART_FILE)
+        with open(path, 'ab') as file:
+            if fcntl:
+                fcntl.flock(file, fcntl.LOCK_EX)
+            received = os.fstat(file.fileno()).st_size
+            if offset != received:
+                raise OffsetMismatch(f'Expected a chunk at offset {received}', offset=received)
+            if received + len(chunk) > state['size']:
+                raise ChunkedUploadError('Chunk goes past the declared upload size', offset=received)
+            file.write(chunk)
+            file.flush()
+            self._update_hash(upload_id, path, offset, chunk)
+        return offset + len(chunk)
+
+    def finalize(self, upload_id, user_id, expected_sha256=None):
+        """Check the upload is complete; returns (state, path of the assembled file, sha256)"""
+        state = self.status(upload_id, user_id)
+        if state['offset'] != state['size']:
+            raise UploadIncomplete(f"Received {state['offset']} of {state['size']} bytes", offset=state['offset'])
+        path = os.path.join(self._dir(upload_id), PART_FILE)
+        with self._lock:
+            hashed, digest = self._hashers.pop(upload_id, (0, None))
+        if digest is None or hashed != state['size']:
+            digest = hashlib.sha256()
+            with open(path, 'rb') as file:
+                for block in iter(lambda: file.read(1024 * 1024), b''):
+                    digest.update(block)
+        sha256 = digest.hexdigest()
+        if expected_sha256 and expected_sha256.strip().lower() != sha256:
+            raise ChunkChecksumMismatch('File checksum does not match the uploaded bytes', sha256=sha256)
+        return state, path, sha256
+
+    @contextmanager
+    def finalizing(self, upload_id, user_id, expected_sha256=None):
+        """Finalize under the upload's lock; yields (state, path, sha256).
+        
+        The upload is removed when the block completes and kept for a retry when it raises.
+        """
+        self.status(upload_id, user_id)
+        try:
+            lock = open(os.path.join(self._dir(upload_id), LOCK_FILE), 'a')
+        except OSError:
+            raise UploadNotFound('Upload not found')
+        with lock:
+            with self._lock:
+                busy = upload_id in self._finalizing
+                if not busy:
+                    self._finalizing.add(upload_id)
+            if not busy and fcntl:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    busy = True
+                    with self._lock:
+                        self._finalizing.discard(upload_id)
+            if busy:
+                raise UploadFinalizing('This upload is already being finalized')
+            try:
+                yield self.finalize(upload_id, user_id, expected_sha256)
+                # Removed while still locked, so a concurrent retry finds nothing left to process
+                self.remove(upload_id)
+            finally:
+                with self._lock:
+                    self._finalizing.discard(upload_id)
+
+    def remove(self, upload_id):
+        with self._lock:
+            self._hashers.pop(upload_id, None)
+        shutil.rmtree(self._dir(upload_id), ignore_errors=True)
+
+    def sweep(self):
+        """Delete uploads untouched for longer than ttl_seconds"""
+        cutoff = time.time() - self.ttl_seconds
+        try:
+            names = os.listdir(self.root)
+        except FileNotFoundError:
+            return
+        for name in names:
+            if not _valid_id(name):
+                continue
+            try:
+                touched = max(os.path.getmtime(os.path.join(self.root, name, f)) for f in (STATE_FILE, PART_FILE))
+            except (OSError, ValueError):
+                continue
+            if touched < cutoff:
+                self.remove(name)
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Offline bulk classification of question papers
+
+Walks directories, files and glob patterns for pdf/docx/doc/txt papers and
+csv/xlsx/xls question lists, classifies them in a process pool and writes one
+row per question to CSV or JSONL. Finished files are recorded by SHA-256 in a
+manifest next to the output, so an interrupted run continues where it stopped.
+
+    python cli.py papers/ "archive/**/*.pdf" -o results.jsonl --workers 8
+"""
+
+import argparse
+import csv
+import glob
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from config import Config
+
+PAPER_EXTENSIONS = {'txt', 'pdf', 'docx', 'doc'}
+LIST_EXTENSIONS = {'xlsx', 'xls', 'csv'}
+OUTPUT_FIELDS = ['file', 'sha256', 'question_number', 'question', 'level', 'level_display', 'is_multi_level']
+
+# Hashes already in the manifest, set once per worker by _init_worker
+_finished_hashes = frozenset()
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """Hash a file without reading it into memory at once"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def file_extension(path):
+    return path.rsplit('.', 1)[-1].lower() if '.' in os.path.basename(path) else ''
+
+
+def collect_files(patterns):
+    """Expand directories (recursively), files and glob patterns into a sorted list"""
+    extensions = PAPER_EXTENSIONS | LIST_EXTENSIONS
+    found = set()
+    for pattern in patterns:
+        matches = glob.glob(pattern, recursive=True) if glob.has_magic(pattern) else [pattern]
+        for match in matches:
+            if os.path.isdir(match):
+                for root, _, names in os.walk(match):
+                    found.update(os.path.join(root, name) for name in names)
+            elif os.path.isfile(match):
+                found.add(match)
+    return sorted(path for path in found if file_extension(path) in extensions)
+
+
+def load_manifest(path):
+    """Return the hashes of files finished by earlier runs"""
+    if not os.path.exists(path):
+        return set()
+    with open(path, encoding='utf-8') as manifest:
+        return {line.split('\t', 1)[0] for line in manifest if line.strip()}
+
+
+def _init_worker(finished_hashes):
+    global _finished_hashes
+    _finished_hashes = frozenset(finished_hashes)
+
+
+def process_file(path):
+    """Classify one file; returns (path, sha256, rows, status, error)"""
+    from app import classify_report_questions, extract_and_analyze_file, read_questions_from_file
+
+    try:
+        sha256 = file_sha256(path)
+    except OSError as e:
+        return path, None, [], 'failed', str(e)
+    if sha256 in _finished_hashes:
+        return path, sha256, [], 'skipped', None
+
+    extension = file_extension(path)
+    try:
+        if extension in LIST_EXTENSIONS:
+            questions = read_questions_from_file(path, extension)
+            analysis = classify_report_questions(questions) if questions else None
+        else:
+            text, _, analysis, _ = extract_and_analyze_file(path, extension)
+            if not text:
+                return path, sha256, [], 'failed', 'Could not extract text from the file'
+    except Exception as e:
+        return path, sha256, [], 'failed', str(e)
+    # Not recorded as finished, so a later run with a better extractor tries again
+    if not analysis or not analysis.get('questions'):
+        return path, sha256, [], 'failed', 'No questions found in the file'
+
+    rows = []
+    for item in analysis['questions']:
+        rows.append({
+            'file': path,
+            'sha256': sha256,
+            'question_number': item['question_number'],
+            'question': item['question'],
+            'level': item['level'],
+            'level_display': item.get('level_display', item['level'].split('-')[-1]),
+            'is_multi_level': item.get('is_multi_level', False)
+        })
+    return path, sha256, rows, 'done', None
+
+
+class ResultWriter:
+    """Append result rows as CSV or JSONL and record finished files in the manifest"""
+
+    def __init__(self, output_path, manifest_path, output_format):
+        self.output_format = output_format
+        is_new = not os.path.exists(output_path) or os.path.getsize(output_path) == 0
+        self.output = open(output_path, 'a', encoding='utf-8', newline='')
+        self.manifest = open(manifest_path, 'a', encoding='utf-8')
+        if output_format == 'csv':
+            self.csv_writer = csv.DictWriter(self.output, fieldnames=OUTPUT_FIELDS)
+            if is_new:
+                self.csv_writer.writeheader()
+
+    def write(self, path, sha256, rows):
+        if self.output_format == 'csv':
+            self.csv_writer.writerows(rows)
+        else:
+            self.output.writelines(json.dumps(row, ensure_ascii=False) + '\n' for row in rows)
+        # Rows reach the disk before the file is marked finished
+        self.output.flush()
+        self.manifest.write(f'{sha256}\t{path}\n')
+        self.manifest.flush()
+
+    def close(self):
+        self.output.close()
+        self.manifest.close()
+
+
+def _run_inline(paths, finished_hashes):
+    _init_worker(finished_hashes)
+    for path in paths:
+        yield process_file(path)
+
+
+def _run_pool(paths, finished_hashes, workers):
+    """Yield results as they finish, keeping at most a few tasks per worker in flight"""
+    context = multiprocessing.get_context(Config.CPU_EXECUTOR_START_METHOD)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_worker, initargs=(finished_hashes,)) as executor:
+        pending = set()
+        remaining = iter(paths)
+        while True:
+            for path in remaining:
+                pending.add(executor.submit(process_file, path))
+                if len(pending) >= workers * 4:
+                    break
+            if not pending:
+                return
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+
+def run(patterns, output_path, output_format=None, manifest_path=None, workers=None, progress=None):
+    """Classify every matching file not yet in the manifest and return a summary"""
+    output_format = output_format or ('csv' if output_path.lower().endswith('.csv') else 'jsonl')
+    manifest_path = manifest_path or output_path + '.manifest'
+    workers = (os.cpu_count() or 1) if workers is None else workers
+
+    paths = collect_files(patterns)
+    finished_hashes = load_manifest(manifest_path)
+    summary = {
+        'files_found': len(paths),
+        'files_processed': 0,
+        'files_skipped': 0,
+        'files_failed': 0,
+        'total_questions': 0,
+        'level_counts': {},
+        'failures': []
+    }
+    started = time.perf_counter()
+
+    results = _run_inline(paths, finished_hashes) if workers <= 0 else _run_pool(paths, finished_hashes, workers)
+    writer = ResultWriter(output_path, manifest_path, output_format)
+    try:
+        for path, sha256, rows, status, error in results:
+            if status == 'skipped' or (status == 'done' and sha256 in finished_hashes):
+                summary['files_skipped'] += 1
+                continue
+            if status == 'failed':
+                summary['files_failed'] += 1
+                summary['failures'].append({'file': path, 'error': error})
+                continue
+            writer.write(path, sha256, rows)
+            # The same content under another name in this run is only written once
+            finished_hashes.add(sha256)
+            summary['files_processed'] += 1
+            summary['total_questions'] += len(rows)
+            for row in rows:
+                summary['level_counts'][row['level']] = summary['level_counts'].get(row['level'], 0) + 1
+            if progress:
+                progress(summary)
+    finally:
+        writer.close()
+
+    summary['elapsed_seconds'] = round(time.perf_counter() - started, 2)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Classify question papers offline with Bloom's Taxonomy")
+    parser.add_argument('paths', nargs='+', help='Files, directories or glob patterns (quote globs)')
+    parser.add_argument('-o', '--output', required=True, help='Result file (.csv or .jsonl)')
+    parser.add_argument('--format', choices=['csv', 'jsonl'], help='Output format (default: from the output extension)')
+    parser.add_argument('--manifest', help='Manifest of finished files (default: <output>.manifest)')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: CPU count, 0 runs inline)')
+    parser.add_argument('--summary', help='Also write the run summary to this JSON file')
+    args = parser.parse_args(argv)
+
+    def progress(summary):
+        if summary['files_processed'] % 100 == 0:
+            print(f"{summary['files_processed']} files, {summary['total_questions']} questions", file=sys.stderr)
+
+    summary = run(args.paths, args.output, args.format, args.manifest, args.workers, progress)
+    text = json.dumps(summary, indent=2)
+    print(text)
+    if args.summary:
+        with open(args.summary, 'w', encoding='utf-8') as file:
+            file.write(text + '\n')
+    return 1 if summary['files_failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
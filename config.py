@@ -14,6 +14,7 @@ class Config:
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'your-jwt-secret-key-here')
     JWT_ALGORITHM = 'HS256'
     JWT_EXPIRATION_HOURS = 24
+    TOKEN_CACHE_MAX_SIZE = int(os.getenv('TOKEN_CACHE_MAX_SIZE', 50000))
     
     # MongoDB configuration
     MONGO_URI = os.getenv('MONGO_URI', 'mongodb://localhost:27017/blooms_taxonomy')
@@ -28,6 +29,178 @@ class Config:
     HOST = os.getenv('FLASK_HOST', '127.0.0.1')
     PORT = int(os.getenv('FLASK_PORT', 5000))
     
+    # Executors for CPU-heavy stages and background I/O
+    # CPU_EXECUTOR_KIND: 'process' (default), 'thread' or 'inline' (run in the request thread)
+    CPU_EXECUTOR_KIND = os.getenv('CPU_EXECUTOR_KIND', 'process')
+    CPU_EXECUTOR_WORKERS = int(os.getenv('CPU_EXECUTOR_WORKERS', 0))  # 0 = one per CPU
+    CPU_EXECUTOR_START_METHOD = os.getenv('CPU_EXECUTOR_START_METHOD', 'forkserver')
+    CPU_EXECUTOR_PRELOAD = ['app']  # modules imported once by the forkserver
+    IO_EXECUTOR_WORKERS = int(os.getenv('IO_EXECUTOR_WORKERS', 8))
+    EXECUTOR_QUEUE_FACTOR = int(os.getenv('EXECUTOR_QUEUE_FACTOR', 4))  # pending tasks per worker
+    EXECUTOR_SUBMIT_TIMEOUT = float(os.getenv('EXECUTOR_SUBMIT_TIMEOUT', 10))
+    
+    # ASGI serving mode (asgi.py): threads running request handlers
+    ASGI_HANDLER_THREADS = int(os.getenv('ASGI_HANDLER_THREADS', 32))
+    
+    # Batch classification
+    BATCH_MAX_QUESTIONS = int(os.getenv('BATCH_MAX_QUESTIONS', 5000))
+    # Questions classified per step; each step's results are sent before the next starts
+    BATCH_STREAM_CHUNK = int(os.getenv('BATCH_STREAM_CHUNK', 200))
+    
+    # Analysis history pagination
+    ANALYSES_PAGE_SIZE = int(os.getenv('ANALYSES_PAGE_SIZE', 20))
+    ANALYSES_MAX_PAGE_SIZE = int(os.getenv('ANALYSES_MAX_PAGE_SIZE', 100))
+    
+    # Retention: single-question analyses expire via a TTL index, older
+    # file/report analyses are moved to the compressed archive collection
+    SINGLE_QUESTION_RETENTION_DAYS = int(os.getenv('SINGLE_QUESTION_RETENTION_DAYS', 30))
+    ARCHIVE_AFTER_DAYS = int(os.getenv('ARCHIVE_AFTER_DAYS', 180))
+    ARCHIVE_INTERVAL_SECONDS = int(os.getenv('ARCHIVE_INTERVAL_SECONDS', 3600))
+    ARCHIVE_BATCH_SIZE = int(os.getenv('ARCHIVE_BATCH_SIZE', 500))
+    
+    # Metrics: when set, /metrics requires `Authorization: Bearer <METRICS_TOKEN>`.
+    # Without a token /metrics is open, unless METRICS_REQUIRE_TOKEN is set (the
+    # WSGI/ASGI entry points default it to true), in which case it is disabled
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+    METRICS_REQUIRE_TOKEN = os.getenv('METRICS_REQUIRE_TOKEN', 'False').lower() == 'true'
+    
+    # Administration: requests carrying `X-Admin-Token: <ADMIN_TOKEN>`, or
+    # logged in with one of ADMIN_EMAILS, may use the admin endpoints
+    ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')
+    ADMIN_EMAILS = {email.strip().lower() for email in os.getenv('ADMIN_EMAILS', '').split(',') if email.strip()}
+    
+    # Request profiling: admins send `X-Profile: 1`, or a fraction of requests is sampled
+    PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', 0.0))
+    PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+    PROFILE_MAX_FILES = int(os.getenv('PROFILE_MAX_FILES', 200))
+    
+    # Memory: peak tracking on the upload/report routes and a per-request budget
+    # checked against size-based estimates before a job starts (0 = no budget).
+    # tracemalloc slows every thread of the process while a tracked request runs,
+    # so tracking is off by default and, when on, covers a sampled fraction of requests
+    MEMORY_TRACKING = os.getenv('MEMORY_TRACKING', 'False').lower() == 'true'
+    MEMORY_TRACKING_SAMPLE_RATE = float(os.getenv('MEMORY_TRACKING_SAMPLE_RATE', 0.1))
+    MEMORY_BUDGET_BYTES = int(os.getenv('MEMORY_BUDGET_BYTES', 512 * 1024 * 1024))
+    # Peak memory per byte of uploaded file, by extension, measured with tracemalloc on
+    # text-dense files (image-heavy PDFs peak near 1x). With the default budget every
+    # kind fits MAX_CONTENT_LENGTH, and chunked uploads take PDFs up to ~42MB
+    MEMORY_EXPANSION_FACTORS = {'pdf': 12, 'docx': 8, 'doc': 8, 'xlsx': 6, 'xls': 6, 'csv': 2, 'txt': 5, 'default': 12}
+    # Peak memory per question when rendering a report, by format
+    REPORT_BYTES_PER_QUESTION = {
+        'pdf': 24 * 1024, 'xlsx': 8 * 1024, 'csv': 2 * 1024, 'parquet': 1024, 'arrow': 1024, 'default': 24 * 1024
+    }
+    # Rows per chunk when an oversized CSV is read in streaming mode
+    CSV_CHUNK_ROWS = int(os.getenv('CSV_CHUNK_ROWS', 10000))
+    
+    # Classifier engine: 'rules' (keyword scores), 'linear' (learned model trained with
+    # linear_model.py) or 'cascade' (rules, with the model only for ambiguous questions).
+    # Falls back to rules when the weights file cannot be loaded
+    CLASSIFIER_ENGINE = os.getenv('CLASSIFIER_ENGINE', 'rules').lower()
+    CLASSIFIER_MODEL_PATH = os.getenv('CLASSIFIER_MODEL_PATH', 'models/linear_classifier.npy')
+    # Cascade: a rule result is kept when its top score leads the runner-up by at least this
+    # many points (a strong indicator is worth 4) and the question is not multi-level
+    CASCADE_MARGIN = float(os.getenv('CASCADE_MARGIN', 3))
+    
+    # Resumable chunked uploads (/api/uploads): largest file, suggested and largest chunk
+    # (chunks are request bodies, so keep them below MAX_CONTENT_LENGTH), and how long
+    # an upload may sit untouched before its part file is deleted
+    CHUNKED_UPLOAD_MAX_BYTES = int(os.getenv('CHUNKED_UPLOAD_MAX_BYTES', 256 * 1024 * 1024))
+    CHUNKED_UPLOAD_CHUNK_BYTES = int(os.getenv('CHUNKED_UPLOAD_CHUNK_BYTES', 4 * 1024 * 1024))
+    CHUNKED_UPLOAD_MAX_CHUNK_BYTES = int(os.getenv('CHUNKED_UPLOAD_MAX_CHUNK_BYTES', 8 * 1024 * 1024))
+    CHUNKED_UPLOAD_TTL_SECONDS = int(os.getenv('CHUNKED_UPLOAD_TTL_SECONDS', 24 * 3600))
+    
+    # ZIP batch uploads (/upload_zip, or chunked uploads of kind "archive"): archive size,
+    # number of files, and uncompressed size per file and in total
+    ZIP_MAX_BYTES = int(os.getenv('ZIP_MAX_BYTES', 256 * 1024 * 1024))
+    ZIP_MAX_MEMBERS = int(os.getenv('ZIP_MAX_MEMBERS', 200))
+    ZIP_MAX_MEMBER_BYTES = int(os.getenv('ZIP_MAX_MEMBER_BYTES', 32 * 1024 * 1024))
+    ZIP_MAX_TOTAL_BYTES = int(os.getenv('ZIP_MAX_TOTAL_BYTES', 512 * 1024 * 1024))
+    
+    # Admission control for expensive routes, per cost class: classify (/classify, batch),
+    # upload (uploads and finalize) and render (report downloads, history export).
+    # Per worker process: requests running at once, requests waiting for a slot (up to
+    # ADMISSION_WAIT_SECONDS), and a per-user token bucket (requests per minute, burst).
+    # 0 turns a concurrency or rate limit off. Background jobs take the same concurrency
+    # slots as the matching routes. ADMISSION_MAX_ACTIVE caps expensive requests running
+    # or waiting across all classes; it defaults to the sum of the class limits, so a full
+    # class answers for itself, and must stay below GUNICORN_THREADS (default 16) so cheap
+    # routes such as /login always find a free thread
+    ADMISSION_ENABLED = os.getenv('ADMISSION_ENABLED', 'True').lower() == 'true'
+    ADMISSION_WAIT_SECONDS = float(os.getenv('ADMISSION_WAIT_SECONDS', 10))
+    ADMISSION_CLASSIFY_CONCURRENCY = int(os.getenv('ADMISSION_CLASSIFY_CONCURRENCY', 2))
+    ADMISSION_CLASSIFY_QUEUE = int(os.getenv('ADMISSION_CLASSIFY_QUEUE', 4))
+    ADMISSION_CLASSIFY_RATE_PER_MINUTE = float(os.getenv('ADMISSION_CLASSIFY_RATE_PER_MINUTE', 120))
+    ADMISSION_CLASSIFY_BURST = float(os.getenv('ADMISSION_CLASSIFY_BURST', 60))
+    ADMISSION_UPLOAD_CONCURRENCY = int(os.getenv('ADMISSION_UPLOAD_CONCURRENCY', 2))
+    ADMISSION_UPLOAD_QUEUE = int(os.getenv('ADMISSION_UPLOAD_QUEUE', 2))
+    ADMISSION_UPLOAD_RATE_PER_MINUTE = float(os.getenv('ADMISSION_UPLOAD_RATE_PER_MINUTE', 30))
+    ADMISSION_UPLOAD_BURST = float(os.getenv('ADMISSION_UPLOAD_BURST', 20))
+    ADMISSION_RENDER_CONCURRENCY = int(os.getenv('ADMISSION_RENDER_CONCURRENCY', 1))
+    ADMISSION_RENDER_QUEUE = int(os.getenv('ADMISSION_RENDER_QUEUE', 2))
+    ADMISSION_RENDER_RATE_PER_MINUTE = float(os.getenv('ADMISSION_RENDER_RATE_PER_MINUTE', 20))
+    ADMISSION_RENDER_BURST = float(os.getenv('ADMISSION_RENDER_BURST', 10))
+    ADMISSION_MAX_ACTIVE = int(os.getenv('ADMISSION_MAX_ACTIVE', (
+        ADMISSION_CLASSIFY_CONCURRENCY + ADMISSION_CLASSIFY_QUEUE +
+        ADMISSION_UPLOAD_CONCURRENCY + ADMISSION_UPLOAD_QUEUE +
+        ADMISSION_RENDER_CONCURRENCY + ADMISSION_RENDER_QUEUE
+    )))
+    
+    # Background jobs (?async=1 on the upload, report and finalize routes; progress at
+    # /api/jobs/<id>): job worker threads per process (0 leaves jobs to other processes),
+    # jobs running at once and jobs queued or running per user, attempts before a job
+    # stays failed, how long a job may go without reporting progress before another
+    # worker takes it over, and how long finished jobs and their results are kept
+    JOB_WORKER_THREADS = int(os.getenv('JOB_WORKER_THREADS', 2))
+    JOB_MAX_RUNNING_PER_USER = int(os.getenv('JOB_MAX_RUNNING_PER_USER', 2))
+    JOB_MAX_ACTIVE_PER_USER = int(os.getenv('JOB_MAX_ACTIVE_PER_USER', 20))
+    JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', 3))
+    JOB_LEASE_SECONDS = int(os.getenv('JOB_LEASE_SECONDS', 600))
+    JOB_POLL_INTERVAL_SECONDS = float(os.getenv('JOB_POLL_INTERVAL_SECONDS', 1))
+    JOB_RESULT_TTL_SECONDS = int(os.getenv('JOB_RESULT_TTL_SECONDS', 24 * 3600))
+    
+    # Question bank: classifications shared across users, keyed by normalized question hash
+    QUESTION_BANK_ENABLED = os.getenv('QUESTION_BANK_ENABLED', 'True').lower() == 'true'
+    
+    # In-memory question indexes are kept per user: each worker holds at most QUESTION_INDEX_MAX_USERS
+    # users' indexes, re-synced from MongoDB at most every QUESTION_INDEX_SYNC_SECONDS and rebuilt
+    # after QUESTION_INDEX_TTL_SECONDS so analyses removed by TTL or archiving drop out
+    QUESTION_INDEX_MAX_USERS = int(os.getenv('QUESTION_INDEX_MAX_USERS', 1000))
+    QUESTION_INDEX_SYNC_SECONDS = float(os.getenv('QUESTION_INDEX_SYNC_SECONDS', 30))
+    QUESTION_INDEX_TTL_SECONDS = float(os.getenv('QUESTION_INDEX_TTL_SECONDS', 3600))
+    # Near-duplicate detection: MinHash estimated Jaccard similarity of character shingles
+    NEAR_DUPLICATE_ENABLED = os.getenv('NEAR_DUPLICATE_ENABLED', 'True').lower() == 'true'
+    NEAR_DUPLICATE_THRESHOLD = float(os.getenv('NEAR_DUPLICATE_THRESHOLD', 0.5))
+    NEAR_DUPLICATE_MATCH_LIMIT = int(os.getenv('NEAR_DUPLICATE_MATCH_LIMIT', 3))
+    
+    # Question search (/api/questions/search) page sizes
+    SEARCH_PAGE_SIZE = int(os.getenv('SEARCH_PAGE_SIZE', 20))
+    SEARCH_MAX_PAGE_SIZE = int(os.getenv('SEARCH_MAX_PAGE_SIZE', 100))
+    
+    # Columnar (Parquet / Arrow IPC) export; needs the optional pyarrow package
+    EXPORT_COMPRESSION = os.getenv('EXPORT_COMPRESSION', 'zstd')
+    EXPORT_BATCH_ROWS = int(os.getenv('EXPORT_BATCH_ROWS', 50000))
+    
+    # Logging: JSON lines written by a background thread from a bounded queue.
+    # LOG_SAMPLE_RATES keeps a fraction of chatty events, e.g.
+    # "question_received=0.01,analysis_saved=0.1"; warnings and errors are always kept
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+    LOG_SAMPLE_RATES = {
+        event.strip(): float(rate)
+        for event, rate in (
+            pair.split('=', 1)
+            for pair in os.getenv('LOG_SAMPLE_RATES', 'question_received=0.01').split(',')
+            if '=' in pair
+        )
+    }
+    LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+    # Longer string fields are cut, and lists/dicts keep only their first items
+    LOG_MAX_FIELD_CHARS = int(os.getenv('LOG_MAX_FIELD_CHARS', 500))
+    LOG_MAX_ITEMS = int(os.getenv('LOG_MAX_ITEMS', 20))
+    
+    # User cache configuration (Flask-Login user_loader)
+    USER_CACHE_TTL_SECONDS = int(os.getenv('USER_CACHE_TTL_SECONDS', 300))
+    USER_CACHE_MAX_SIZE = int(os.getenv('USER_CACHE_MAX_SIZE', 10000))
+    
     @staticmethod
     def init_app(app):
         """Initialize application with configuration"""
@@ -0,0 +1,38 @@
+"""
+Shared pytest fixtures
+
+App globals are swapped with monkeypatch, so they are restored after each
+test even when it fails.
+"""
+
+import pytest
+
+import app as blooms_app
+
+USER_ID = '64b7f0c2a1b2c3d4e5f60718'
+
+
+@pytest.fixture
+def no_db(monkeypatch):
+    """MongoDB unavailable: the app's analysis collections are empty lists"""
+    for name in ('analyses_collection', 'user_stats_collection', 'archived_analyses_collection'):
+        monkeypatch.setattr(blooms_app, name, [])
+
+
+@pytest.fixture
+def mongo_db(monkeypatch):
+    """A fresh mongomock database behind the app's analysis collections"""
+    mongomock = pytest.importorskip('mongomock')
+    db = mongomock.MongoClient().db
+    monkeypatch.setattr(blooms_app, 'analyses_collection', db.analyses)
+    monkeypatch.setattr(blooms_app, 'user_stats_collection', db.user_stats)
+    monkeypatch.setattr(blooms_app, 'archived_analyses_collection', db.analyses_archive)
+    return db
+
+
+@pytest.fixture
+def cached_user():
+    """USER_ID in the per-worker user cache, so session requests skip the users collection"""
+    blooms_app.user_cache.set(USER_ID, {'_id': USER_ID, 'email': 'test@example.com', 'name': 'Test'})
+    yield USER_ID
+    blooms_app.user_cache.pop(USER_ID)
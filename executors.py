@@ -0,0 +1,163 @@
+"""
+Bounded executors for the CPU-heavy and blocking I/O stages of request handling
+
+CPU stages (text extraction, classification, PDF rendering) run in a process
+pool so they do not hold the GIL of the worker serving lightweight requests.
+Blocking I/O such as large MongoDB writes runs in a thread pool so the request
+can return without waiting for it. Both pools refuse new work once too much is
+queued instead of growing without limit.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from config import Config
+
+
+class ExecutorBusy(Exception):
+    """Raised when an executor already has its maximum of pending tasks"""
+
+
+class BoundedExecutor:
+    """Wrap an executor with a cap on running plus queued tasks"""
+
+    def __init__(self, executor, max_pending, submit_timeout):
+        self.executor = executor
+        self.submit_timeout = submit_timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+    def submit(self, fn, *args, **kwargs):
+        if not self._slots.acquire(timeout=self.submit_timeout):
+            raise ExecutorBusy('Too many tasks are already queued, please retry shortly')
+        try:
+            future = self.executor.submit(fn, *args, **kwargs)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
+
+
+_lock = threading.Lock()
+_executors = {}
+_owner_pid = None
+_local = threading.local()
+
+
+def set_inline(enabled):
+    """Run CPU stages submitted from the current thread inline (e.g. while profiling it)"""
+    _local.inline = enabled
+
+
+def _run_inline():
+    return Config.CPU_EXECUTOR_KIND == 'inline' or getattr(_local, 'inline', False)
+
+
+def _build(kind):
+    if kind == 'io':
+        workers = Config.IO_EXECUTOR_WORKERS
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='io')
+    else:
+        workers = Config.CPU_EXECUTOR_WORKERS or os.cpu_count() or 1
+        if Config.CPU_EXECUTOR_KIND == 'process':
+            context = multiprocessing.get_context(Config.CPU_EXECUTOR_START_METHOD)
+            if Config.CPU_EXECUTOR_START_METHOD == 'forkserver':
+                context.set_forkserver_preload(Config.CPU_EXECUTOR_PRELOAD)
+            executor = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+        else:
+            executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='cpu')
+    max_pending = workers * Config.EXECUTOR_QUEUE_FACTOR
+    return BoundedExecutor(executor, max_pending, Config.EXECUTOR_SUBMIT_TIMEOUT)
+
+
+def get_executor(kind):
+    """Return the 'cpu' or 'io' executor for this process, creating it lazily.
+
+    Pools are never inherited across fork: a forked server worker builds its own.
+    """
+    global _owner_pid
+    with _lock:
+        if _owner_pid != os.getpid():
+            _executors.clear()
+            _owner_pid = os.getpid()
+        if kind not in _executors:
+            _executors[kind] = _build(kind)
+        return _executors[kind]
+
+
+def _discard_broken(kind, executor):
+    """Forget a pool whose worker process died so the next call builds a new one"""
+    with _lock:
+        if _executors.get(kind) is executor:
+            del _executors[kind]
+    executor.shutdown(wait=False)
+    return ExecutorBusy('A worker process stopped unexpectedly, please retry shortly')
+
+
+def run_cpu(fn, *args, **kwargs):
+    """Run a CPU-heavy function in the CPU executor and wait for its result"""
+    if _run_inline():
+        return fn(*args, **kwargs)
+    executor = get_executor('cpu')
+    try:
+        return executor.submit(fn, *args, **kwargs).result()
+    except BrokenProcessPool:
+        raise _discard_broken('cpu', executor)
+
+
+def map_cpu(fn, argument_tuples, max_in_flight=None):
+    """Run fn over argument tuples in the CPU executor and yield the results in order.
+
+    At most max_in_flight calls (default: one per CPU worker) are submitted at a
+    time and the arguments are consumed lazily, so a generator of large inputs
+    is never held in memory at once.
+    """
+    if _run_inline():
+        for args in argument_tuples:
+            yield fn(*args)
+        return
+    executor = get_executor('cpu')
+    max_in_flight = max_in_flight or Config.CPU_EXECUTOR_WORKERS or os.cpu_count() or 1
+    pending = deque()
+    try:
+        for args in argument_tuples:
+            if len(pending) >= max_in_flight:
+                yield pending.popleft().result()
+            pending.append(executor.submit(fn, *args))
+        while pending:
+            yield pending.popleft().result()
+    except BrokenProcessPool:
+        raise _discard_broken('cpu', executor)
+
+
+async def run_cpu_async(fn, *args, **kwargs):
+    """Awaitable variant of run_cpu for asyncio callers"""
+    if _run_inline():
+        return fn(*args, **kwargs)
+    executor = get_executor('cpu')
+    try:
+        return await asyncio.wrap_future(executor.submit(fn, *args, **kwargs))
+    except BrokenProcessPool:
+        raise _discard_broken('cpu', executor)
+
+
+def submit_io(fn, *args, **kwargs):
+    """Run blocking I/O in the background; returns a Future"""
+    return get_executor('io').submit(fn, *args, **kwargs)
+
+
+def shutdown(wait=True):
+    """Stop all executors owned by this process"""
+    with _lock:
+        if _owner_pid == os.getpid():
+            for executor in _executors.values():
+                executor.shutdown(wait=wait)
+        _executors.clear()
@@ -0,0 +1,159 @@
+"""
+Columnar (Parquet / Arrow IPC) export of classification results
+
+Analyses are flattened to one row per question. Level columns are dictionary
+encoded against the fixed list of Bloom's levels, so every batch shares one
+dictionary and a whole history can be written batch by batch. pyarrow is only
+imported when an export is requested, so it adds nothing to startup.
+"""
+
+from datetime import datetime
+
+from config import Config
+
+# Export format -> (file extension, MIME type)
+COLUMNAR_FORMATS = {
+    'parquet': ('parquet', 'application/vnd.apache.parquet'),
+    'arrow': ('arrow', 'application/vnd.apache.arrow.file')
+}
+
+
+class ColumnarExportUnavailable(Exception):
+    """Raised when pyarrow is not installed"""
+
+
+def resolve_columnar_format(requested):
+    """Return the format that will actually be written.
+
+    Parquet falls back to Arrow IPC when pyarrow was built without Parquet.
+    """
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise ColumnarExportUnavailable('Columnar export needs pyarrow (pip install pyarrow)')
+    if requested == 'parquet':
+        try:
+            import pyarrow.parquet  # noqa: F401
+            return 'parquet'
+        except ImportError:
+            pass
+    return 'arrow'
+
+
+def report_schema():
+    import pyarrow as pa
+    return pa.schema([
+        ('question_number', pa.int32()),
+        ('question', pa.string()),
+        ('level', pa.dictionary(pa.int8(), pa.string())),
+        ('description', pa.dictionary(pa.int8(), pa.string()))
+    ])
+
+
+def history_schema():
+    import pyarrow as pa
+    return pa.schema([
+        ('analysis_id', pa.string()),
+        ('analysis_type', pa.string()),
+        ('created_at', pa.timestamp('ms')),
+        ('question_number', pa.int32()),
+        ('question', pa.string()),
+        ('level', pa.dictionary(pa.int8(), pa.string())),
+        ('is_multi_level', pa.bool_())
+    ])
+
+
+def _dictionary_array(values, dictionary):
+    """Encode values against a fixed dictionary; unknown values become null"""
+    import pyarrow as pa
+    index = {value: i for i, value in enumerate(dictionary)}
+    indices = pa.array([index.get(value) for value in values], type=pa.int8())
+    return pa.DictionaryArray.from_arrays(indices, pa.array(dictionary, type=pa.string()))
+
+
+class ColumnarWriter:
+    """Write record batches of one schema to a Parquet or Arrow IPC file"""
+
+    def __init__(self, path, schema, file_format):
+        import pyarrow as pa
+        self.schema = schema
+        if file_format == 'parquet':
+            import pyarrow.parquet as pq
+            self._writer = pq.ParquetWriter(path, schema, compression=Config.EXPORT_COMPRESSION)
+        else:
+            options = pa.ipc.IpcWriteOptions(compression=Config.EXPORT_COMPRESSION)
+            self._writer = pa.ipc.new_file(path, schema, options=options)
+
+    def write(self, columns):
+        import pyarrow as pa
+        self._writer.write_table(pa.Table.from_arrays(columns, schema=self.schema))
+
+    def close(self):
+        self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_report(questions_data, path, file_format, level_names, descriptions):
+    """Write one uploaded report's classified questions"""
+    import pyarrow as pa
+    with ColumnarWriter(path, report_schema(), file_format) as writer:
+        writer.write([
+            pa.array([item.get('question_number', i) for i, item in enumerate(questions_data, 1)], type=pa.int32()),
+            pa.array([item['question'] for item in questions_data], type=pa.string()),
+            _dictionary_array([item['level'] for item in questions_data], level_names),
+            _dictionary_array([item['description'] for item in questions_data], descriptions)
+        ])
+    return len(questions_data)
+
+
+def history_rows(analysis):
+    """Flatten one analysis document into (question_number, question, level, is_multi_level) rows"""
+    results = analysis.get('results') or {}
+    if analysis.get('analysis_type') == 'single_question':
+        if results.get('level'):
+            yield 1, analysis.get('content', ''), results['level'], False
+        return
+    for i, item in enumerate(results.get('questions') or [], 1):
+        if 'level' in item:
+            yield item.get('question_number', i), item.get('question', ''), item['level'], bool(item.get('is_multi_level'))
+
+
+def write_history(analyses, path, file_format, level_names, batch_rows=None):
+    """Write a user's analyses one batch at a time; returns the number of rows"""
+    import pyarrow as pa
+    batch_rows = batch_rows or Config.EXPORT_BATCH_ROWS
+    total = 0
+    columns = [[] for _ in range(7)]
+
+    def flush(writer):
+        writer.write([
+            pa.array(columns[0], type=pa.string()),
+            pa.array(columns[1], type=pa.string()),
+            pa.array(columns[2], type=pa.timestamp('ms')),
+            pa.array(columns[3], type=pa.int32()),
+            pa.array(columns[4], type=pa.string()),
+            _dictionary_array(columns[5], level_names),
+            pa.array(columns[6], type=pa.bool_())
+        ])
+        for column in columns:
+            column.clear()
+
+    with ColumnarWriter(path, history_schema(), file_format) as writer:
+        for analysis in analyses:
+            created_at = analysis.get('created_at')
+            if not isinstance(created_at, datetime):
+                created_at = None
+            for row in history_rows(analysis):
+                for column, value in zip(columns, (str(analysis.get('_id')), analysis.get('analysis_type'), created_at) + row):
+                    column.append(value)
+                total += 1
+                if len(columns[0]) >= batch_rows:
+                    flush(writer)
+        if columns[0] or total == 0:
+            flush(writer)
+    return total
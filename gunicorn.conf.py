@@ -0,0 +1,21 @@
+"""
+Gunicorn configuration for the Bloom's Taxonomy Classifier
+"""
+
+import multiprocessing
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:' + os.getenv('PORT', '8000'))
+workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+# Expensive routes may hold up to ADMISSION_MAX_ACTIVE threads; the rest serve cheap routes
+threads = int(os.getenv('GUNICORN_THREADS', 16))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+
+# Build the app and run warmup in the master, before any worker accepts a request
+preload_app = True
+
+
+def post_fork(server, worker):
+    """Create the worker's own MongoDB client and background threads"""
+    from app import init_worker
+    init_worker()
@@ -0,0 +1,384 @@
+"""
+Background jobs for long-running analyses and report renders
+
+A job is a document in the jobs collection: queued -> running -> succeeded,
+failed or cancelled. Worker threads in every web process claim queued jobs
+oldest first. A job's input and result files live in its own directory under
+the queue's root.
+
+A user can run at most max_running_per_user jobs at once, across all
+processes. A running job holds one of the user's numbered slots, stored as a
+unique sparse slot_key, and releases it when it finishes. While a handler
+runs, a timer thread renews the job's lease every third of lease_seconds; a
+job whose lease expires (the process died) goes back to the queue. Failed
+jobs are retried automatically until they reach max_attempts; after that a
+user can retry them by hand. Cancelling a running job sets a flag, and the
+worker stops at the job's next progress report.
+"""
+
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+import metrics
+from logs import get_logger, log_event
+
+logger = get_logger('jobs')
+
+ACTIVE_STATUSES = ('queued', 'running')
+FINISHED_STATUSES = ('succeeded', 'failed', 'cancelled')
+
+
+class JobError(Exception):
+    """Base class for job API errors; status is the HTTP status to answer with"""
+    status = 400
+
+
+class JobNotFound(JobError):
+    status = 404
+
+
+class JobConflict(JobError):
+    """The job is not in a state that allows the requested change"""
+    status = 409
+
+
+class JobLimitExceeded(JobError):
+    status = 429
+
+
+class JobsUnavailable(JobError):
+    status = 503
+
+
+class JobCancelled(Exception):
+    """Raised inside a handler when its job was cancelled or its lease was lost"""
+
+
+class JobFailed(Exception):
+    """Raised by a handler for failures that retrying will not fix"""
+
+
+def _object_id(job_id):
+    try:
+        return ObjectId(job_id)
+    except (InvalidId, TypeError):
+        raise JobNotFound('Job not found')
+
+
+class JobQueue:
+    """Job documents in collection, and their files under root, one directory per job"""
+
+    def __init__(self, collection, root, max_running_per_user, max_active_per_user, max_attempts,
+                 lease_seconds, result_ttl_seconds):
+        self.collection = collection
+        self.root = root
+        self.max_running_per_user = max_running_per_user
+        self.max_active_per_user = max_active_per_user
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self.result_ttl_seconds = result_ttl_seconds
+
+    @property
+    def available(self):
+        """Jobs need MongoDB: the in-memory fallback collections cannot be shared between workers"""
+        return hasattr(self.collection, 'find_one_and_update')
+
+    def ensure_indexes(self):
+        if not self.available:
+            return
+        self.collection.create_index('slot_key', unique=True, sparse=True)
+        self.collection.create_index([('status', 1), ('created_at', 1)])
+        self.collection.create_index([('user_id', 1), ('created_at', -1)])
+        # Finished jobs are deleted once their results expire
+        self.collection.create_index('expires_at', expireAfterSeconds=0)
+
+    def job_dir(self, job_id):
+        return os.path.join(self.root, str(job_id))
+
+    def new_job_id(self):
+        """An id for a job whose input files are written before it is submitted"""
+        job_id = ObjectId()
+        os.makedirs(self.job_dir(job_id), exist_ok=True)
+        return job_id
+
+    def submit(self, user_id, kind, params, job_id=None):
+        """Queue a job; refused with JobLimitExceeded when the user already has too many"""
+        if not self.available:
+            raise JobsUnavailable('Background jobs are unavailable')
+        active = self.collection.count_documents({'user_id': user_id, 'status': {'$in': list(ACTIVE_STATUSES)}})
+        if active >= self.max_active_per_user:
+            raise JobLimitExceeded(f'At most {self.max_active_per_user} jobs may be queued or running at once')
+        now = datetime.now()
+        job = {
+            '_id': job_id or ObjectId(),
+            'user_id': user_id,
+            'kind': kind,
+            'params': params,
+            'status': 'queued',
+            'attempts': 0,
+            'progress': {'stage': 'queued', 'percent': 0},
+            'created_at': now,
+            'queued_at': now,
+            'updated_at': now
+        }
+        self.collection.insert_one(job)
+        return job
+
+    def get(self, job_id, user_id):
+        job = self.collection.find_one({'_id': _object_id(job_id), 'user_id': user_id}) if self.available else None
+        if job is None:
+            raise JobNotFound('Job not found')
+        return job
+
+    def list(self, user_id, limit):
+        if not self.available:
+            return []
+        return list(self.collection.find({'user_id': user_id}, {'params': 0}).sort('created_at', -1).limit(limit))
+
+    def claim(self, worker_id, scan=50):
+        """Start the oldest queued job whose owner has a free slot; returns it or None"""
+        full = set()
+        for candidate in self.collection.find({'status': 'queued'}, {'user_id': 1}).sort('created_at', 1).limit(scan):
+            user_id = candidate['user_id']
+            if user_id in full:
+                continue
+            for slot in range(self.max_running_per_user):
+                now = datetime.now()
+                try:
+                    job = self.collection.find_one_and_update(
+                        {'_id': candidate['_id'], 'status': 'queued'},
+                        {
+                            '$set': {
+                                'status': 'running',
+                                'slot_key': f'{user_id}:{slot}',
+                                'worker': worker_id,
+                                'started_at': now,
+                                'heartbeat_at': now,
+                                'updated_at': now,
+                                'progress': {'stage': 'started', 'percent': 0}
+                            },
+                            '$inc': {'attempts': 1}
+                        },
+                        return_document=ReturnDocument.AFTER
+                    )
+                except DuplicateKeyError:
+                    continue  # Slot taken; try the next one
+                if job is not None:
+                    return job
+                break  # Claimed by another worker meanwhile
+            else:
+                full.add(user_id)
+        return None
+
+    def _owned(self, job):
+        return {'_id': job['_id'], 'status': 'running', 'worker': job['worker']}
+
+    def progress(self, job, stage, percent=None):
+        """Record progress and renew the lease; raises JobCancelled if the job should stop"""
+        now = datetime.now()
+        current = self.collection.find_one_and_update(
+            self._owned(job),
+            {'$set': {'progress': {'stage': stage, 'percent': percent}, 'heartbeat_at': now, 'updated_at': now}},
+            return_document=ReturnDocument.AFTER
+        )
+        if current is None or current.get('cancel_requested'):
+            raise JobCancelled()
+
+    def heartbeat(self, job):
+        """Renew the lease of a running job; returns False once this worker no longer owns it"""
+        now = datetime.now()
+        return self.collection.update_one(
+            self._owned(job), {'$set': {'heartbeat_at': now, 'updated_at': now}}
+        ).matched_count == 1
+
+    def _finish(self, job, status, **fields):
+        now = datetime.now()
+        fields.update(status=status, finished_at=now, updated_at=now,
+                      expires_at=now + timedelta(seconds=self.result_ttl_seconds))
+        return self.collection.update_one(
+            self._owned(job),
+            {'$set': fields, '$unset': {'slot_key': '', 'cancel_requested': ''}}
+        ).modified_count == 1
+
+    def succeed(self, job, result):
+        return self._finish(job, 'succeeded', result=result, progress={'stage': 'done', 'percent': 100})
+
+    def cancelled(self, job):
+        return self._finish(job, 'cancelled')
+
+    def fail(self, job, error, retry=True):
+        """Mark a job failed, or queue it again while it has attempts left"""
+        if retry and job['attempts'] < self.max_attempts:
+            now = datetime.now()
+            return self.collection.update_one(
+                self._owned(job),
+                {
+                    '$set': {'status': 'queued', 'error': error, 'queued_at': now, 'updated_at': now,
+                             'progress': {'stage': 'queued', 'percent': 0}},
+                    '$unset': {'slot_key': '', 'worker': ''}
+                }
+            ).modified_count == 1
+        return self._finish(job, 'failed', error=error)
+
+    def cancel(self, job_id, user_id):
+        """Cancel a queued job now, or ask a running one to stop; returns the updated job"""
+        job = self.get(job_id, user_id)
+        now = datetime.now()
+        cancelled = self.collection.find_one_and_update(
+            {'_id': job['_id'], 'status': 'queued'},
+            {'$set': {'status': 'cancelled', 'finished_at': now, 'updated_at': now,
+                      'expires_at': now + timedelta(seconds=self.result_ttl_seconds)}},
+            return_document=ReturnDocument.AFTER
+        )
+        if cancelled is not None:
+            return cancelled
+        running = self.collection.find_one_and_update(
+            {'_id': job['_id'], 'status': 'running'},
+            {'$set': {'cancel_requested': True, 'updated_at': now}},
+            return_document=ReturnDocument.AFTER
+        )
+        if running is None:
+            raise JobConflict(f"Job already {self.get(job_id, user_id)['status']}")
+        return running
+
+    def retry(self, job_id, user_id):
+        """Queue a failed or cancelled job again with a fresh set of attempts"""
+        job = self.get(job_id, user_id)
+        active = self.collection.count_documents({'user_id': user_id, 'status': {'$in': list(ACTIVE_STATUSES)}})
+        if active >= self.max_active_per_user:
+            raise JobLimitExceeded(f'At most {self.max_active_per_user} jobs may be queued or running at once')
+        now = datetime.now()
+        retried = self.collection.find_one_and_update(
+            {'_id': job['_id'], 'status': {'$in': ['failed', 'cancelled']}},
+            {
+                '$set': {'status': 'queued', 'attempts': 0, 'queued_at': now, 'updated_at': now,
+                         'progress': {'stage': 'queued', 'percent': 0}},
+                '$unset': {'error': '', 'finished_at': '', 'expires_at': '', 'worker': ''}
+            },
+            return_document=ReturnDocument.AFTER
+        )
+        if retried is None:
+            raise JobConflict(f"Only failed or cancelled jobs can be retried; this one is {job['status']}")
+        return retried
+
+    def requeue_stale(self):
+        """Return running jobs whose lease expired to the queue (or fail them when out of attempts)"""
+        cutoff = datetime.now() - timedelta(seconds=self.lease_seconds)
+        requeued = 0
+        for job in self.collection.find({'status': 'running', 'heartbeat_at': {'$lt': cutoff}}):
+            if job.get('cancel_requested'):
+                self._finish(job, 'cancelled')
+            elif self.fail(job, 'The worker running this job stopped'):
+                requeued += 1
+        return requeued
+
+    def sweep_files(self):
+        """Delete job directories whose job is gone or finished longer ago than the result TTL"""
+        cutoff = time.time() - self.result_ttl_seconds
+        try:
+            names = os.listdir(self.root)
+        except FileNotFoundError:
+            return
+        for name in names:
+            path = os.path.join(self.root, name)
+            if not ObjectId.is_valid(name) or os.path.getmtime(path) >= cutoff:
+                continue
+            job = self.collection.find_one({'_id': ObjectId(name)}, {'status': 1, 'finished_at': 1})
+            if job is None or (job['status'] in FINISHED_STATUSES and
+                               job['finished_at'].timestamp() < cutoff):
+                shutil.rmtree(path, ignore_errors=True)
+
+
+class JobWorker(threading.Thread):
+    """Daemon thread that claims jobs and runs them with handlers[job['kind']](job, progress)
+
+    A handler returns the job's JSON result; progress(stage, percent) records
+    how far it got and raises JobCancelled when it should stop.
+    """
+
+    def __init__(self, queue, handlers, poll_interval, maintenance_interval=60):
+        super().__init__(name='job-worker', daemon=True)
+        self.queue = queue
+        self.handlers = handlers
+        self.poll_interval = poll_interval
+        self.maintenance_interval = maintenance_interval
+        self.worker_id = f'{os.getpid()}-{uuid.uuid4().hex[:12]}'
+        self._next_maintenance = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                ran = self.run_once()
+            except Exception as e:
+                log_event(logger, 'job_worker_failed', logging.ERROR, error=str(e))
+                ran = False
+            if not ran:
+                self._stop_event.wait(self.poll_interval)
+
+    def run_once(self):
+        """Run one job if one is ready; returns whether a job was run"""
+        if time.monotonic() >= self._next_maintenance:
+            self._next_maintenance = time.monotonic() + self.maintenance_interval
+            self.queue.requeue_stale()
+            self.queue.sweep_files()
+        job = self.queue.claim(self.worker_id)
+        if job is None:
+            return False
+        started = time.perf_counter()
+        metrics.observe('job_queue_wait_seconds', (job['started_at'] - job['queued_at']).total_seconds(),
+                        {'kind': job['kind']})
+        handler = self.handlers.get(job['kind'])
+        stopped = threading.Event()
+        heartbeat = threading.Thread(target=self._keep_alive, args=(job, stopped), name='job-heartbeat',
+                                     daemon=True)
+        heartbeat.start()
+        try:
+            if handler is None:
+                raise JobFailed(f"Unknown job kind {job['kind']}")
+            result = handler(job, lambda stage, percent=None: self.queue.progress(job, stage, percent))
+        except JobCancelled:
+            self.queue.cancelled(job)
+            status = 'cancelled'
+        except JobFailed as e:
+            self.queue.fail(job, str(e), retry=False)
+            status = 'failed'
+        except Exception as e:
+            self.queue.fail(job, str(e))
+            status = 'error'
+            log_event(logger, 'job_failed', logging.ERROR, job_id=str(job['_id']), kind=job['kind'],
+                      attempt=job['attempts'], error=str(e))
+        else:
+            self.queue.succeed(job, result)
+            status = 'succeeded'
+        finally:
+            stopped.set()
+            heartbeat.join()
+        duration = time.perf_counter() - started
+        metrics.inc('jobs_finished', labels={'kind': job['kind'], 'status': status})
+        metrics.observe('job_duration_seconds', duration, {'kind': job['kind']})
+        log_event(logger, 'job_finished', job_id=str(job['_id']), kind=job['kind'], status=status,
+                  duration_ms=round(duration * 1000, 1))
+        return True
+
+    def _keep_alive(self, job, stopped):
+        """Renew the job's lease until stopped is set; a single stage can outlast the lease"""
+        while not stopped.wait(self.queue.lease_seconds / 3):
+            try:
+                if not self.queue.heartbeat(job):
+                    return
+            except Exception as e:
+                log_event(logger, 'job_heartbeat_failed', logging.WARNING, job_id=str(job['_id']), error=str(e))
+
+    def stop(self):
+        self._stop_event.set()
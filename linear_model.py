@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Learned linear classifier for Bloom's levels
+
+Questions are turned into hashed word uni/bi-gram features (plus the opening
+word, which carries most of the signal) and scored by a multinomial logistic
+regression. Weights live in a .npy file that is memory-mapped, so every worker
+process shares the same pages, with the classes and training metadata in a JSON
+file next to it. Inference for a batch is one sparse gather and a segmented sum.
+
+    python linear_model.py train labels.csv -o models/linear_classifier.npy
+    python linear_model.py evaluate labels.csv --model models/linear_classifier.npy
+
+A labeled CSV has a question column and a level column (e.g. "L5-Evaluate",
+"L5" or "Evaluate").
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+import zlib
+from datetime import datetime
+
+import numpy as np
+
+N_FEATURES = 2 ** 18
+_WORD = re.compile(r"[a-z0-9']+")
+_QUESTION_COLUMNS = ('question', 'questions', 'q', 'query')
+_LABEL_COLUMNS = ('level', 'label', 'bloom_level', 'blooms_level')
+
+
+def grams(question):
+    """Opening word, words and word pairs of a question"""
+    words = _WORD.findall(question.lower())
+    if not words:
+        return []
+    return ['^' + words[0]] + words + [a + ' ' + b for a, b in zip(words, words[1:])]
+
+
+def hash_features(questions, n_features=N_FEATURES):
+    """CSR arrays (indptr, indices, values) of L2-normalised signed hashed features"""
+    indptr = np.zeros(len(questions) + 1, dtype=np.int64)
+    hashes = []
+    for i, question in enumerate(questions):
+        hashes.extend(zlib.crc32(gram.encode('utf-8')) for gram in grams(question))
+        indptr[i + 1] = len(hashes)
+    hashes = np.array(hashes, dtype=np.uint32)
+    indices = (hashes & np.uint32(n_features - 1)).astype(np.int64)
+    values = np.where(hashes >> np.uint32(31), -1.0, 1.0).astype(np.float32)
+
+    lengths = np.diff(indptr)
+    nonempty = lengths > 0
+    if values.size:
+        norms = np.sqrt(np.add.reduceat(values * values, indptr[:-1][nonempty]))
+        values /= np.repeat(norms, lengths[nonempty])
+    return indptr, indices, values
+
+
+def sparse_dot(indptr, indices, values, weights):
+    """Rows of the sparse matrix times dense weights (n_features x classes)"""
+    out = np.zeros((len(indptr) - 1, weights.shape[1]), dtype=np.float32)
+    nonempty = np.diff(indptr) > 0
+    if values.size:
+        out[nonempty] = np.add.reduceat(weights[indices] * values[:, None], indptr[:-1][nonempty])
+    return out
+
+
+def softmax(logits):
+    shifted = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return shifted / shifted.sum(axis=1, keepdims=True)
+
+
+class LinearModel:
+    """Multinomial linear model over hashed features"""
+
+    def __init__(self, weights, classes, metadata=None):
+        # weights has one row per feature plus a final bias row
+        self.weights = weights
+        self.classes = list(classes)
+        self.metadata = metadata or {}
+        self.n_features = weights.shape[0] - 1
+
+    @property
+    def fingerprint(self):
+        return self.metadata.get('checksum', '')[:12]
+
+    def predict_proba(self, questions):
+        indptr, indices, values = hash_features(questions, self.n_features)
+        logits = sparse_dot(indptr, indices, values, self.weights) + self.weights[-1]
+        return softmax(logits)
+
+    def predict(self, questions):
+        probabilities = self.predict_proba(questions)
+        return [self.classes[i] for i in probabilities.argmax(axis=1)]
+
+    def score_batch(self, questions):
+        """Level -> probability dicts, the score vectors used by classify_question"""
+        if not questions:
+            return []
+        probabilities = np.round(self.predict_proba(questions), 4).tolist()
+        return [dict(zip(self.classes, row)) for row in probabilities]
+
+    def save(self, path):
+        np.save(path, np.ascontiguousarray(self.weights, dtype=np.float32))
+        metadata = dict(self.metadata, classes=self.classes, n_features=self.n_features, checksum=file_checksum(path))
+        with open(metadata_path(path), 'w', encoding='utf-8') as file:
+            json.dump(metadata, file, indent=2)
+        self.metadata = metadata
+
+    @classmethod
+    def load(cls, path):
+        with open(metadata_path(path), encoding='utf-8') as file:
+            metadata = json.load(file)
+        return cls(np.load(path, mmap_mode='r'), metadata['classes'], metadata)
+
+
+def metadata_path(path):
+    return os.path.splitext(path)[0] + '.json'
+
+
+def file_checksum(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def train(questions, labels, classes, n_features=N_FEATURES, epochs=30, learning_rate=0.5,
+          l2=1e-6, batch_size=256, seed=0):
+    """Fit the model with mini-batch AdaGrad on the softmax cross-entropy"""
+    classes = list(classes)
+    targets = np.array([classes.index(label) for label in labels])
+    indptr, indices, values = hash_features(questions, n_features)
+    weights = np.zeros((n_features + 1, len(classes)), dtype=np.float32)
+    squared = np.full_like(weights, 1e-8)
+    rng = np.random.RandomState(seed)
+
+    for _ in range(epochs):
+        order = rng.permutation(len(questions))
+        for start in range(0, len(order), batch_size):
+            rows = order[start:start + batch_size]
+            lengths = indptr[rows + 1] - indptr[rows]
+            positions = np.concatenate([np.arange(indptr[r], indptr[r + 1]) for r in rows])
+            batch_indptr = np.concatenate([[0], np.cumsum(lengths)])
+            batch_indices, batch_values = indices[positions], values[positions]
+
+            probabilities = softmax(sparse_dot(batch_indptr, batch_indices, batch_values, weights) + weights[-1])
+            probabilities[np.arange(len(rows)), targets[rows]] -= 1
+            probabilities /= len(rows)
+
+            gradient = np.zeros_like(weights)
+            np.add.at(gradient, batch_indices, batch_values[:, None] * np.repeat(probabilities, lengths, axis=0))
+            gradient[-1] = probabilities.sum(axis=0)
+            touched = np.unique(np.append(batch_indices, n_features))
+            gradient[touched] += l2 * weights[touched]
+            squared[touched] += gradient[touched] ** 2
+            weights[touched] -= learning_rate * gradient[touched] / np.sqrt(squared[touched])
+
+    metadata = {
+        'trained_at': datetime.now().isoformat(timespec='seconds'),
+        'examples': len(questions),
+        'epochs': epochs
+    }
+    return LinearModel(weights, classes, metadata)
+
+
+def normalize_label(label, classes):
+    """Map "L5-Evaluate", "l5" or "evaluate" to the class name, None when unknown"""
+    label = str(label).strip().lower()
+    for name in classes:
+        number, _, word = name.lower().partition('-')
+        if label in (name.lower(), number, word):
+            return name
+    return None
+
+
+def read_labeled_csv(path, classes):
+    """Return (questions, labels) from a CSV with question and level columns; unlabeled rows are skipped"""
+    with open(path, newline='', encoding='utf-8-sig') as file:
+        reader = csv.DictReader(file)
+        columns = {name.lower().strip(): name for name in reader.fieldnames or []}
+        question_column = next((columns[c] for c in _QUESTION_COLUMNS if c in columns), None)
+        label_column = next((columns[c] for c in _LABEL_COLUMNS if c in columns), None)
+        if not question_column or not label_column:
+            raise ValueError(f'{path} needs a question column and a level column')
+        questions, labels = [], []
+        for row in reader:
+            question = (row.get(question_column) or '').strip()
+            label = normalize_label(row.get(label_column) or '', classes)
+            if question and label:
+                questions.append(question)
+                labels.append(label)
+    return questions, labels
+
+
+def _timed_predictions(predict, questions):
+    started = time.perf_counter()
+    predictions = predict(questions)
+    return predictions, time.perf_counter() - started
+
+
+def evaluate(questions, labels, model, rule_predict):
+    """Accuracy and throughput of the linear model and the rule engine on labeled questions"""
+    report = {'questions': len(questions)}
+    for name, predict in (('rules', rule_predict), ('linear', model.predict)):
+        predictions, seconds = _timed_predictions(predict, questions)
+        correct = sum(prediction == label for prediction, label in zip(predictions, labels))
+        report[name] = {
+            'accuracy': round(correct / len(labels), 4) if labels else 0.0,
+            'seconds': round(seconds, 4),
+            'questions_per_second': round(len(questions) / seconds) if seconds else None
+        }
+    return report
+
+
+def main(argv=None):
+    from app import bloom_levels, classify_question, score_question
+
+    parser = argparse.ArgumentParser(description="Train or evaluate the linear Bloom's level classifier")
+    commands = parser.add_subparsers(dest='command', required=True)
+    train_parser = commands.add_parser('train', help='Train on a labeled CSV')
+    train_parser.add_argument('labels', help='CSV with question and level columns')
+    train_parser.add_argument('-o', '--output', required=True, help='Weights file (.npy); metadata goes next to it')
+    train_parser.add_argument('--features', type=int, default=N_FEATURES, help='Hashed feature count (power of two)')
+    train_parser.add_argument('--epochs', type=int, default=30)
+    evaluate_parser = commands.add_parser('evaluate', help='Compare the model with the rule engine on a labeled CSV')
+    evaluate_parser.add_argument('labels', help='CSV with question and level columns')
+    evaluate_parser.add_argument('--model', required=True, help='Weights file written by train')
+    args = parser.parse_args(argv)
+
+    classes = list(bloom_levels.keys())
+    try:
+        questions, labels = read_labeled_csv(args.labels, classes)
+    except (OSError, ValueError) as e:
+        print(f'error: {e}', file=sys.stderr)
+        return 2
+
+    if args.command == 'train':
+        if args.features & (args.features - 1):
+            print('error: --features must be a power of two', file=sys.stderr)
+            return 2
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        model = train(questions, labels, classes, args.features, args.epochs)
+        model.save(args.output)
+        print(json.dumps(model.metadata, indent=2))
+    else:
+        model = LinearModel.load(args.model)
+        report = evaluate(questions, labels, model, lambda batch: [classify_question(q, scores=score_question(q)) for q in batch])
+        print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
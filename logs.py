@@ -0,0 +1,161 @@
+"""
+Structured, non-blocking logging for the Bloom's Taxonomy Classifier
+
+Request threads only decide whether an event is sampled, truncate its fields
+and put the record on a bounded queue. A background listener thread formats
+each record as one JSON line and writes it. When the queue is full, records are
+dropped and counted instead of blocking the request.
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+
+import metrics
+from config import Config
+
+ROOT_LOGGER = 'blooms'
+
+_lock = threading.Lock()
+_listener = None
+_owner_pid = None
+
+
+def get_logger(name):
+    """Return a logger under the application's root logger"""
+    return logging.getLogger(f'{ROOT_LOGGER}.{name}')
+
+
+def truncate(value, max_chars=None, max_items=None, depth=3):
+    """Copy value with long strings cut and large containers shortened"""
+    max_chars = Config.LOG_MAX_FIELD_CHARS if max_chars is None else max_chars
+    max_items = Config.LOG_MAX_ITEMS if max_items is None else max_items
+    if isinstance(value, (bool, int, float)) or value is None:
+        return value
+    if isinstance(value, dict):
+        if depth <= 0:
+            return f'<dict of {len(value)} items>'
+        items = list(value.items())
+        result = {str(k): truncate(v, max_chars, max_items, depth - 1) for k, v in items[:max_items]}
+        if len(items) > max_items:
+            result['...'] = f'+{len(items) - max_items} items'
+        return result
+    if isinstance(value, (list, tuple, set)):
+        if depth <= 0:
+            return f'<{type(value).__name__} of {len(value)} items>'
+        items = list(value)
+        result = [truncate(v, max_chars, max_items, depth - 1) for v in items[:max_items]]
+        if len(items) > max_items:
+            result.append(f'+{len(items) - max_items} items')
+        return result
+    text = value.isoformat() if isinstance(value, datetime) else str(value)
+    if len(text) > max_chars:
+        return f'{text[:max_chars]}...(+{len(text) - max_chars} chars)'
+    return text
+
+
+def is_sampled(event, level=logging.INFO):
+    """Warnings and errors are always kept; other events follow LOG_SAMPLE_RATES"""
+    if level >= logging.WARNING:
+        return True
+    rate = Config.LOG_SAMPLE_RATES.get(event, 1.0)
+    return rate >= 1.0 or random.random() < rate
+
+
+def log_event(logger, event, level=logging.INFO, exc_info=False, **fields):
+    """Log a named event with structured fields, subject to sampling and truncation"""
+    if _owner_pid != os.getpid():
+        setup_logging()
+    if not logger.isEnabledFor(level) or not is_sampled(event, level):
+        return
+    logger.log(level, event, exc_info=exc_info, extra={'event': event, 'fields': truncate(fields)})
+
+
+class JsonFormatter(logging.Formatter):
+    """Format a record as a single JSON object"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'event': getattr(record, 'event', None) or record.getMessage(),
+            'pid': record.process
+        }
+        entry.update(getattr(record, 'fields', None) or {})
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that never blocks: full queue means the record is dropped"""
+
+    def prepare(self, record):
+        # Unlike QueueHandler.prepare, leave the formatting to the listener thread
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            metrics.inc('log_records_dropped')
+
+
+def setup_logging(stream=None, force=False):
+    """Attach the queue handler and start the writer thread for this process.
+
+    Called lazily by log_event, so a forked worker or CPU pool process starts
+    its own writer on its first event.
+    """
+    global _listener, _owner_pid
+    with _lock:
+        if _owner_pid == os.getpid() and not force:
+            return
+        _stop_listener()
+        log_queue = queue.Queue(maxsize=Config.LOG_QUEUE_SIZE)
+        writer = logging.StreamHandler(stream or sys.stdout)
+        writer.setFormatter(JsonFormatter())
+        _listener = QueueListener(log_queue, writer)
+        _listener.start()
+        _owner_pid = os.getpid()
+
+        logger = logging.getLogger(ROOT_LOGGER)
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+        logger.addHandler(DroppingQueueHandler(log_queue))
+        logger.setLevel(Config.LOG_LEVEL)
+        logger.propagate = False
+
+
+def _stop_listener():
+    global _listener
+    # A listener inherited through fork has no thread in this process
+    if _listener is not None and _owner_pid == os.getpid():
+        try:
+            _listener.stop()
+        except queue.Full:
+            pass
+    _listener = None
+
+
+def shutdown_logging():
+    """Write out queued records and stop the writer thread"""
+    with _lock:
+        _stop_listener()
+
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,122 @@
+"""
+Peak-memory tracking and memory budgets for the upload and report paths
+
+Tracking is opt-in (MEMORY_TRACKING) and covers a sampled fraction of requests
+(MEMORY_TRACKING_SAMPLE_RATE): tracemalloc hooks every allocation in the
+process, so it slows untracked requests on other threads too. It runs only
+while at least one tracked request is in flight. Stages
+dispatched to the CPU process pool are measured inside the worker process and
+their peak is folded into the request's figure. Concurrent tracked requests in
+one process share tracemalloc, so their peaks are upper bounds.
+"""
+
+import random
+import threading
+import tracemalloc
+from functools import wraps
+
+from flask import request
+
+import metrics
+from config import Config
+from executors import run_cpu
+
+_lock = threading.Lock()
+_active = 0
+_local = threading.local()
+
+
+class MemoryBudgetExceeded(Exception):
+    """Raised when a job's estimated memory use is over MEMORY_BUDGET_BYTES"""
+
+    def __init__(self, estimated_bytes, budget_bytes, message=None):
+        self.estimated_bytes = estimated_bytes
+        self.budget_bytes = budget_bytes
+        super().__init__(message or (
+            f'This job would need about {estimated_bytes // (1024 * 1024)} MB of memory, '
+            f'over the {budget_bytes // (1024 * 1024)} MB limit'
+        ))
+
+
+def estimate_file_job_bytes(size_bytes, file_extension):
+    """Rough peak memory needed to process an uploaded file of this size and type"""
+    factor = Config.MEMORY_EXPANSION_FACTORS.get(file_extension, Config.MEMORY_EXPANSION_FACTORS['default'])
+    return int(size_bytes * factor)
+
+
+def estimate_report_bytes(question_count, file_format):
+    """Rough peak memory needed to render a report with this many questions"""
+    per_question = Config.REPORT_BYTES_PER_QUESTION.get(file_format, Config.REPORT_BYTES_PER_QUESTION['default'])
+    return question_count * per_question
+
+
+def over_budget(estimated_bytes):
+    return 0 < Config.MEMORY_BUDGET_BYTES < estimated_bytes
+
+
+def check_budget(estimated_bytes):
+    """Raise MemoryBudgetExceeded if the estimate is over the per-request budget"""
+    if over_budget(estimated_bytes):
+        raise MemoryBudgetExceeded(estimated_bytes, Config.MEMORY_BUDGET_BYTES)
+
+
+def _start():
+    global _active
+    with _lock:
+        if _active == 0:
+            if tracemalloc.is_tracing():
+                tracemalloc.reset_peak()
+            else:
+                tracemalloc.start()
+        _active += 1
+
+
+def _stop():
+    global _active
+    with _lock:
+        peak = tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else 0
+        _active -= 1
+        if _active == 0 and tracemalloc.is_tracing():
+            tracemalloc.stop()
+    return peak
+
+
+def track_peak_memory(view):
+    """Record a sampled request's peak traced memory as request_peak_memory_bytes{route}"""
+    @wraps(view)
+    def wrapped(*args, **kwargs):
+        if not Config.MEMORY_TRACKING or random.random() >= Config.MEMORY_TRACKING_SAMPLE_RATE:
+            return view(*args, **kwargs)
+        _start()
+        _local.stage_peak = 0
+        try:
+            return view(*args, **kwargs)
+        finally:
+            peak = max(_stop(), _local.stage_peak)
+            _local.stage_peak = None
+            route = request.url_rule.rule if request.url_rule else request.path
+            metrics.observe('request_peak_memory_bytes', peak, {'route': route}, metrics.BYTES_BUCKETS)
+    return wrapped
+
+
+def call_with_peak(fn, *args, **kwargs):
+    """Run fn and return (result, peak traced bytes); peak is None if already traced here"""
+    if tracemalloc.is_tracing():
+        # Inline or thread executor: the request's own tracing already covers it
+        return fn(*args, **kwargs), None
+    tracemalloc.start()
+    try:
+        result = fn(*args, **kwargs)
+        return result, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_cpu_measured(fn, *args, **kwargs):
+    """run_cpu that also folds the stage's peak memory into the current request's figure"""
+    if not Config.MEMORY_TRACKING or getattr(_local, 'stage_peak', None) is None:
+        return run_cpu(fn, *args, **kwargs)
+    result, peak = run_cpu(call_with_peak, fn, *args, **kwargs)
+    if peak:
+        _local.stage_peak = max(_local.stage_peak, peak)
+    return result
@@ -0,0 +1,180 @@
+"""
+Lightweight in-process metrics for the Bloom's Taxonomy Classifier
+
+Counters and histograms are kept per worker process and exported in the
+Prometheus text format by the /metrics endpoint.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+
+PREFIX = 'blooms_'
+
+# Bucket upper bounds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+COUNT_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+BYTES_BUCKETS = (1024, 10240, 102400, 524288, 1048576, 4194304, 8388608, 16777216, 67108864, 268435456)
+
+_HELP = {
+    'http_requests': 'HTTP requests by route, method and status',
+    'http_request_duration_seconds': 'HTTP request latency by route and method',
+    'stage_duration_seconds': 'Time spent in each processing stage',
+    'questions_per_upload': 'Questions found per uploaded file',
+    'bytes_per_upload': 'Size of uploaded files in bytes',
+    'request_peak_memory_bytes': 'Peak traced memory per request',
+    'memory_budget_rejections': 'Requests refused by the memory budget',
+    'questions_reused': 'Questions whose classification was reused from an earlier version of the paper',
+    'question_bank_hits': 'Questions whose classification was served from the question bank',
+    'question_bank_misses': 'Questions classified because they were not in the question bank',
+    'cascade_questions': 'Questions classified by each cascade tier (rules or model)',
+    'cascade_changed': 'Ambiguous questions whose level the cascade model changed from the rule result',
+    'admission_queue_wait_seconds': 'Time admitted requests waited for a slot in their cost class',
+    'admission_rejections': 'Requests refused by admission control, by cost class and reason',
+    'jobs_finished': 'Background jobs finished by kind and outcome',
+    'job_queue_wait_seconds': 'Time background jobs waited in the queue before a worker started them',
+    'job_duration_seconds': 'Time background jobs ran, by kind',
+    'log_records_dropped': 'Log records dropped because the log queue was full',
+    'user_cache_hits': 'Flask-Login user cache hits',
+    'user_cache_misses': 'Flask-Login user cache misses',
+    'token_cache_hits': 'Bearer token claim cache hits',
+    'token_cache_misses': 'Bearer token claim cache misses'
+}
+
+_lock = threading.Lock()
+_counters = defaultdict(float)
+_histograms = {}
+
+
+def _key(name, labels):
+    return (name, tuple(sorted(labels.items())) if labels else ())
+
+
+def inc(name, value=1, labels=None):
+    """Increment a named counter"""
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] += value
+
+
+def get(name, labels=None):
+    """Return the current value of a counter"""
+    return _counters.get(_key(name, labels), 0)
+
+
+def observe(name, value, labels=None, buckets=LATENCY_BUCKETS):
+    """Record one observation in a histogram"""
+    key = _key(name, labels)
+    index = bisect_left(buckets, value)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            # [bucket bounds, per-bucket counts (+Inf last), sum, count]
+            histogram = _histograms[key] = [buckets, [0] * (len(buckets) + 1), 0.0, 0]
+        histogram[1][index] += 1
+        histogram[2] += value
+        histogram[3] += 1
+
+
+def get_histogram(name, labels=None):
+    """Return (count, sum) of a histogram"""
+    histogram = _histograms.get(_key(name, labels))
+    return (histogram[3], histogram[2]) if histogram else (0, 0.0)
+
+
+@contextmanager
+def timed(stage):
+    """Record the duration of a block as stage_duration_seconds{stage=...}"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe('stage_duration_seconds', time.perf_counter() - start, {'stage': stage})
+
+
+class StageTimer:
+    """Collect stage durations where metrics cannot be recorded directly.
+
+    Used by functions that may run in a CPU worker process: they return
+    timer.timings and the request process records them with record_stages().
+    """
+
+    def __init__(self):
+        self.timings = {}
+
+    @contextmanager
+    def __call__(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[stage] = self.timings.get(stage, 0.0) + time.perf_counter() - start
+
+
+def record_stages(timings):
+    """Record stage durations collected by a StageTimer"""
+    for stage, seconds in timings.items():
+        observe('stage_duration_seconds', seconds, {'stage': stage})
+
+
+def snapshot():
+    """Return a copy of all unlabelled counters"""
+    with _lock:
+        return {name: value for (name, labels), value in _counters.items() if not labels}
+
+
+def reset():
+    """Clear all metrics (used by tests)"""
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+def _format_labels(labels, extra=None):
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    escaped = []
+    for name, value in pairs:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        escaped.append(f'{name}="{value}"')
+    return '{' + ','.join(escaped) + '}'
+
+
+def _format_number(value):
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+def render_prometheus():
+    """Render all metrics in the Prometheus text exposition format"""
+    with _lock:
+        counters = sorted(_counters.items())
+        histograms = sorted((key, [h[0], list(h[1]), h[2], h[3]]) for key, h in _histograms.items())
+
+    lines = []
+    seen = set()
+    for (name, labels), value in counters:
+        metric = PREFIX + (name if name.endswith('_total') else name + '_total')
+        if metric not in seen:
+            seen.add(metric)
+            lines.append(f'# HELP {metric} {_HELP.get(name, name)}')
+            lines.append(f'# TYPE {metric} counter')
+        lines.append(f'{metric}{_format_labels(labels)} {_format_number(value)}')
+
+    for (name, labels), (buckets, counts, total, count) in histograms:
+        metric = PREFIX + name
+        if metric not in seen:
+            seen.add(metric)
+            lines.append(f'# HELP {metric} {_HELP.get(name, name)}')
+            lines.append(f'# TYPE {metric} histogram')
+        cumulative = 0
+        for bound, bucket_count in zip(buckets, counts):
+            cumulative += bucket_count
+            lines.append(f'{metric}_bucket{_format_labels(labels, ("le", bound))} {cumulative}')
+        lines.append(f'{metric}_bucket{_format_labels(labels, ("le", "+Inf"))} {count}')
+        lines.append(f'{metric}_sum{_format_labels(labels)} {_format_number(total)}')
+        lines.append(f'{metric}_count{_format_labels(labels)} {count}')
+
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,234 @@
+"""
+MinHash / LSH near-duplicate detection for questions
+
+Each question gets a MinHash signature over character shingles of its
+normalized text. Signatures are split into bands; questions sharing any band
+are candidates, and candidates are kept when the fraction of equal signature
+values (an estimate of their Jaccard similarity) reaches the threshold.
+
+The index keeps band keys in NumPy arrays. Most rows are in a per-band sorted
+array searched with searchsorted; rows added since the last sort sit in a
+small unsorted tail that is scanned directly and merged once it grows, so
+queries stay sub-linear while the index is updated incrementally.
+"""
+
+import re
+import threading
+import zlib
+
+import numpy as np
+
+NUM_PERM = 128
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 4
+
+_PRIME = np.uint64(4294967311)
+_rng = np.random.RandomState(1956)
+_A = _rng.randint(1, 2 ** 31, size=NUM_PERM).astype(np.uint64)
+_B = _rng.randint(0, 2 ** 31, size=NUM_PERM).astype(np.uint64)
+_BAND_MIX = (_rng.randint(1, 2 ** 62, size=ROWS).astype(np.uint64) | np.uint64(1))
+_EMPTY = np.uint32(0xFFFFFFFF)
+
+_STOPWORDS = frozenset('a an and are as at be by for from in is it of on or the to with'.split())
+_WORD = re.compile(r'[a-z0-9]+')
+
+
+def shingles(question):
+    """Character shingles of the question's words, ignoring case, punctuation and stopwords"""
+    text = ' '.join(word for word in _WORD.findall(question.lower()) if word not in _STOPWORDS)
+    if len(text) <= SHINGLE_SIZE:
+        return {text} if text else set()
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def signature(question):
+    """MinHash signature (NUM_PERM uint32 values); all-max for questions without words"""
+    values = shingles(question)
+    if not values:
+        return np.full(NUM_PERM, _EMPTY, dtype=np.uint32)
+    x = np.fromiter((zlib.crc32(value.encode('utf-8')) for value in values), dtype=np.uint64, count=len(values))
+    hashed = (_A[:, None] * x[None, :] + _B[:, None]) % _PRIME
+    return (hashed.min(axis=1) & np.uint64(0xFFFFFFFF)).astype(np.uint32)
+
+
+def signatures(questions):
+    if not questions:
+        return np.empty((0, NUM_PERM), dtype=np.uint32)
+    return np.vstack([signature(question) for question in questions])
+
+
+def band_keys(signature_matrix):
+    """One uint64 key per band and row of signatures"""
+    bands = signature_matrix.reshape(len(signature_matrix), BANDS, ROWS).astype(np.uint64)
+    return (bands * _BAND_MIX).sum(axis=2, dtype=np.uint64)
+
+
+def is_empty(signature_row):
+    return bool((signature_row == _EMPTY).all())
+
+
+class MinHashIndex:
+    """Append-only LSH index over MinHash signatures with an owner code per row"""
+
+    def __init__(self, capacity=1024, max_tail=4096):
+        self.size = 0
+        self.max_tail = max_tail
+        self._signatures = np.empty((capacity, NUM_PERM), dtype=np.uint32)
+        self._keys = np.empty((capacity, BANDS), dtype=np.uint64)
+        self._owners = np.empty(capacity, dtype=np.int32)
+        self._sorted = 0
+        self._sorted_keys = np.empty((BANDS, 0), dtype=np.uint64)
+        self._sorted_rows = np.empty((BANDS, 0), dtype=np.int64)
+        self.entries = []
+        self._lock = threading.Lock()
+
+    def _grow(self, needed):
+        capacity = len(self._owners)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name in ('_signatures', '_keys', '_owners'):
+            old = getattr(self, name)
+            new = np.empty((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def _sort(self):
+        order = np.argsort(self._keys[:self.size].T, axis=1, kind='stable')
+        self._sorted_keys = np.take_along_axis(self._keys[:self.size].T, order, axis=1)
+        self._sorted_rows = order
+        self._sorted = self.size
+
+    def add(self, signature_matrix, owner, entries):
+        """Add signatures (one row per entry) owned by owner (an int code)"""
+        count = len(entries)
+        if not count:
+            return
+        with self._lock:
+            self._grow(self.size + count)
+            end = self.size + count
+            self._signatures[self.size:end] = signature_matrix
+            self._keys[self.size:end] = band_keys(signature_matrix)
+            self._owners[self.size:end] = owner
+            self.entries.extend(entries)
+            self.size = end
+            if self.size - self._sorted > self.max_tail:
+                self._sort()
+
+    def candidates(self, keys):
+        """Rows sharing at least one band key with keys"""
+        found = []
+        for band in range(BANDS):
+            sorted_keys = self._sorted_keys[band]
+            lo = np.searchsorted(sorted_keys, keys[band], side='left')
+            hi = np.searchsorted(sorted_keys, keys[band], side='right')
+            if hi > lo:
+                found.append(self._sorted_rows[band, lo:hi])
+        if self.size > self._sorted:
+            tail = self._keys[self._sorted:self.size]
+            found.append(np.nonzero((tail == keys).any(axis=1))[0] + self._sorted)
+        return np.unique(np.concatenate(found)) if found else np.empty(0, dtype=np.int64)
+
+    def query(self, signature_row, threshold, owner=None, limit=None):
+        """Return [(entry, similarity)] with estimated Jaccard >= threshold, most similar first"""
+        if is_empty(signature_row):
+            return []
+        with self._lock:
+            rows = self.candidates(band_keys(signature_row[None, :])[0])
+            if owner is not None and len(rows):
+                rows = rows[self._owners[rows] == owner]
+            if not len(rows):
+                return []
+            similarity = (self._signatures[rows] == signature_row).mean(axis=1)
+            keep = similarity >= threshold
+            rows, similarity = rows[keep], similarity[keep]
+            order = np.argsort(-similarity, kind='stable')[:limit]
+            return [(self.entries[rows[i]], round(float(similarity[i]), 3)) for i in order]
+
+
+def cluster(signature_matrix, threshold):
+    """Group near-duplicate questions of one paper; returns [(row indices, lowest similarity)]"""
+    count = len(signature_matrix)
+    index = MinHashIndex(capacity=max(1, count), max_tail=count)
+    index.add(signature_matrix, 0, list(range(count)))
+
+    parent = list(range(count))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    lowest = {}
+    for i in range(count):
+        for j, similarity in index.query(signature_matrix[i], threshold):
+            if j <= i:
+                continue
+            root_i, root_j = find(i), find(j)
+            merged = lowest.pop(root_j, 1.0) if root_j != root_i else 1.0
+            parent[root_j] = root_i
+            lowest[root_i] = min(similarity, merged, lowest.get(root_i, 1.0))
+
+    groups = {}
+    for i in range(count):
+        groups.setdefault(find(i), []).append(i)
+    return [(members, lowest.get(root, 1.0)) for root, members in groups.items() if len(members) > 1]
+
+
+class NearDuplicateIndex:
+    """Per-process index of stored questions, owned by user, synced from saved analyses"""
+
+    def __init__(self):
+        self.index = MinHashIndex()
+        # created_at of the newest analysis read by the last sync from MongoDB
+        self.watermark = None
+        # time.monotonic() of the last sync
+        self.synced_at = None
+        self._lineages = {}
+        self._owner_codes = {}
+        self._lock = threading.Lock()
+
+    def owner_code(self, user_id, create=False):
+        code = self._owner_codes.get(user_id)
+        if code is None and create:
+            code = self._owner_codes[user_id] = len(self._owner_codes)
+        return code
+
+    def add_analysis(self, analysis, rows):
+        """Index one saved analysis given its flattened (question_number, question, ...) rows"""
+        analysis_id = str(analysis.get('_id'))
+        with self._lock:
+            if analysis_id in self._lineages:
+                return
+            self._lineages[analysis_id] = analysis.get('lineage')
+            owner = self.owner_code(analysis.get('user_id'), create=True)
+        questions = [(number, question) for number, question, *_ in rows]
+        matrix = signatures([question for _, question in questions])
+        keep = [i for i in range(len(questions)) if not is_empty(matrix[i])]
+        self.index.add(
+            matrix[keep],
+            owner,
+            [(analysis_id, questions[i][0], questions[i][1]) for i in keep]
+        )
+
+    def history_matches(self, signature_row, user_id, threshold, limit, exclude_lineage=None):
+        """The user's stored questions similar to this one, skipping earlier versions of the same document"""
+        owner = self.owner_code(user_id)
+        if owner is None:
+            return []
+        matches = []
+        for (analysis_id, number, question), similarity in self.index.query(signature_row, threshold, owner):
+            if exclude_lineage and self._lineages.get(analysis_id) == exclude_lineage:
+                continue
+            matches.append({
+                'analysis_id': analysis_id,
+                'question_number': number,
+                'question': question,
+                'similarity': similarity
+            })
+            if len(matches) == limit:
+                break
+        return matches
@@ -0,0 +1,115 @@
+"""
+Opt-in per-request CPU profiling for the Bloom's Taxonomy Classifier
+
+A profiled request runs under cProfile and its stats are written to a bounded
+directory. The file name records the route, the request size and the duration
+so slow requests can be found without opening every profile.
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import re
+import threading
+import time
+from datetime import datetime
+
+PROFILE_SUFFIX = '.prof'
+_NAME_PATTERN = re.compile(
+    r'^(?P<timestamp>\d{8}T\d{6}\d{6})_(?P<route>[A-Za-z0-9_-]+)_(?P<input_bytes>\d+)B_(?P<duration_ms>\d+)ms\.prof$'
+)
+# Held while a request is profiled: from Python 3.12 only one profiler may be
+# active per process, and enabling a second raises ValueError
+_active = threading.Lock()
+
+
+class RequestProfiler:
+    """cProfile session for one request; start() one at a time per process"""
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+        self.started = time.perf_counter()
+        self.holds_lock = False
+        self.profile.enable()
+
+    @classmethod
+    def start(cls):
+        """Start profiling, or return None while another request is being profiled"""
+        if not _active.acquire(blocking=False):
+            return None
+        try:
+            profiler = cls()
+        except ValueError:
+            # A profiler started outside this module (a debugger, say) is active
+            _active.release()
+            return None
+        profiler.holds_lock = True
+        return profiler
+
+    def stop(self):
+        try:
+            self.profile.disable()
+        finally:
+            if self.holds_lock:
+                self.holds_lock = False
+                _active.release()
+        return time.perf_counter() - self.started
+
+    def save(self, directory, route, input_bytes, duration, max_files):
+        """Write the stats file and prune the directory down to max_files"""
+        os.makedirs(directory, exist_ok=True)
+        route_slug = re.sub(r'[^A-Za-z0-9]+', '-', route).strip('-') or 'root'
+        name = '{}_{}_{}B_{}ms{}'.format(
+            datetime.now().strftime('%Y%m%dT%H%M%S%f'),
+            route_slug,
+            int(input_bytes or 0),
+            int(duration * 1000),
+            PROFILE_SUFFIX
+        )
+        self.profile.dump_stats(os.path.join(directory, name))
+        prune_profiles(directory, max_files)
+        return name
+
+
+def prune_profiles(directory, max_files):
+    """Delete the oldest profiles beyond max_files"""
+    names = sorted(name for name in os.listdir(directory) if name.endswith(PROFILE_SUFFIX))
+    for name in names[:max(0, len(names) - max_files)]:
+        try:
+            os.remove(os.path.join(directory, name))
+        except OSError:
+            pass
+
+
+def list_profiles(directory):
+    """Describe the stored profiles, newest first"""
+    if not os.path.isdir(directory):
+        return []
+    profiles = []
+    for name in sorted(os.listdir(directory), reverse=True):
+        match = _NAME_PATTERN.match(name)
+        if not match:
+            continue
+        profiles.append({
+            'name': name,
+            'route': match.group('route'),
+            'input_bytes': int(match.group('input_bytes')),
+            'duration_ms': int(match.group('duration_ms')),
+            'created_at': datetime.strptime(match.group('timestamp'), '%Y%m%dT%H%M%S%f').isoformat(),
+            'size': os.path.getsize(os.path.join(directory, name))
+        })
+    return profiles
+
+
+def is_profile_name(name):
+    """True if name is a file name this module could have written"""
+    return bool(_NAME_PATTERN.match(name))
+
+
+def summarize_profile(path, top=30, sort='cumulative'):
+    """Render the top entries of a stored profile as pstats text"""
+    output = io.StringIO()
+    stats = pstats.Stats(path, stream=output)
+    stats.strip_dirs().sort_stats(sort).print_stats(top)
+    return output.getvalue()
@@ -0,0 +1,48 @@
+"""
+Global question bank for the Bloom's Taxonomy Classifier
+
+Keeps one entry per distinct question across all users, keyed by the hash of
+its normalized text, holding the level score vector computed with a given
+lexicon version. Entries written with another lexicon version are ignored by
+lookups and replaced on the next store, so changing the keyword lists never
+serves stale classifications.
+"""
+
+from datetime import datetime
+
+from pymongo import UpdateOne
+
+
+def lookup_scores(collection, hashes, lexicon_version):
+    """Return {hash: score vector} for the hashes already in the bank, in one $in query"""
+    if not hashes or not hasattr(collection, 'find'):
+        return {}
+    entries = collection.find(
+        {'_id': {'$in': list(hashes)}, 'lexicon_version': lexicon_version},
+        {'scores': 1}
+    )
+    return {entry['_id']: entry['scores'] for entry in entries}
+
+
+def store_scores(collection, entries, lexicon_version):
+    """Upsert newly computed entries ({hash: {'scores', 'level'}}); returns the number written"""
+    if not entries or not hasattr(collection, 'bulk_write'):
+        return 0
+    now = datetime.now()
+    collection.bulk_write([
+        UpdateOne(
+            {'_id': hash_},
+            {
+                '$set': {
+                    'scores': entry['scores'],
+                    'level': entry['level'],
+                    'lexicon_version': lexicon_version,
+                    'updated_at': now
+                },
+                '$setOnInsert': {'created_at': now}
+            },
+            upsert=True
+        )
+        for hash_, entry in entries.items()
+    ], ordered=False)
+    return len(entries)
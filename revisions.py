@@ -0,0 +1,108 @@
+"""
+Question hashing and revision diffs for re-uploaded question papers
+
+Each question is identified by a hash of its normalized text. Uploads of the
+same document (its lineage) are compared by these hashes, so an unchanged
+question keeps its earlier classification and only new or edited questions
+are classified again.
+"""
+
+import hashlib
+import os
+import re
+from collections import Counter
+
+# Trailing version markers such as "_v2", "-rev3", " final" or "(1)". Word markers need a
+# separator before them, so "chapter1" and "paper2" are names, not versions of "chapte"/"pape"
+_VERSION_SUFFIX = re.compile(
+    r'([\s_.-]+(v\d+|ver\d+|version\d+|rev\d+|r\d+|final|draft)|[\s_.-]*\(\d+\))+$'
+)
+
+
+def normalize_question(question):
+    """Case- and whitespace-insensitive form of a question"""
+    return ' '.join(question.lower().split())
+
+
+def question_hash(question):
+    return hashlib.sha256(normalize_question(question).encode('utf-8')).hexdigest()
+
+
+def item_hash(item):
+    """Hash of a stored result row; rows saved before hashing existed are hashed on the fly"""
+    return item.get('question_hash') or question_hash(item.get('question', ''))
+
+
+def document_lineage(filename):
+    """Identify a document across versions from its file name: "Physics_Midterm_v3.pdf" -> "physics_midterm" """
+    stem = os.path.splitext(filename)[0].lower()
+    return _VERSION_SUFFIX.sub('', stem) or stem
+
+
+def incremental_level_counts(previous_results, previous_items, current_items):
+    """Update the previous level counts by the questions removed and added.
+
+    Returns None when the previous counts do not match its questions, in which
+    case the caller recounts from scratch.
+    """
+    previous_counts = previous_results.get('level_counts')
+    if not previous_counts or sum(previous_counts.values()) != len(previous_items):
+        return None
+    level_of = {item_hash(item): item['level'] for item in previous_items}
+    level_of.update((item['question_hash'], item['level']) for item in current_items)
+
+    old = Counter(item_hash(item) for item in previous_items)
+    new = Counter(item['question_hash'] for item in current_items)
+    level_counts = dict(previous_counts)
+    for hash_, count in (old - new).items():
+        level_counts[level_of[hash_]] -= count
+    for hash_, count in (new - old).items():
+        level_counts[level_of[hash_]] = level_counts.get(level_of[hash_], 0) + count
+    return level_counts
+
+
+def diff_questions(previous_items, current_items):
+    """Compare two versions of a paper.
+
+    A removed and an added question at the same position count as one
+    modified question, reported with its previous and new level.
+    """
+    previous_hashes = {item_hash(item) for item in previous_items}
+    current_hashes = {item['question_hash'] for item in current_items}
+    removed = {item['question_number']: item for item in previous_items if item_hash(item) not in current_hashes}
+
+    changes = []
+    unchanged = 0
+    for item in current_items:
+        if item['question_hash'] in previous_hashes:
+            unchanged += 1
+            continue
+        earlier = removed.pop(item['question_number'], None)
+        change = {
+            'question_number': item['question_number'],
+            'question': item['question'],
+            'level': item['level'],
+            'status': 'modified' if earlier else 'added'
+        }
+        if earlier:
+            change['previous_question'] = earlier['question']
+            change['previous_level'] = earlier['level']
+            change['level_changed'] = earlier['level'] != item['level']
+        changes.append(change)
+    for number, earlier in sorted(removed.items()):
+        changes.append({
+            'question_number': number,
+            'question': earlier['question'],
+            'previous_level': earlier['level'],
+            'status': 'removed'
+        })
+
+    statuses = Counter(change['status'] for change in changes)
+    return {
+        'unchanged': unchanged,
+        'added': statuses['added'],
+        'modified': statuses['modified'],
+        'removed': statuses['removed'],
+        'level_changes': [change for change in changes if change.get('level_changed')],
+        'changes': changes
+    }
@@ -0,0 +1,155 @@
+"""
+Inverted index over stored questions for keyword, phrase and level search
+
+Every stored question gets a row id. Each token maps to a posting list of row
+ids (a compact uint32 array, appended as analyses are saved) and each user to
+the list of their rows. A query intersects the shortest lists first, filters
+with per-level bitmaps and verifies phrases against the stored token text.
+Results are ordered newest first by a sort key derived from the analysis
+timestamp and question number, with the row id breaking ties; the (sort key,
+row id) pair of the last hit is the pagination cursor.
+"""
+
+import re
+import threading
+from array import array
+from datetime import datetime
+
+import numpy as np
+
+_TOKEN = re.compile(r'[a-z0-9]+')
+
+
+def tokenize(text):
+    return _TOKEN.findall(text.lower())
+
+
+def sort_key(created_at, question_number):
+    """Newest analyses first, then questions in paper order"""
+    millis = int(created_at.timestamp() * 1000) if isinstance(created_at, datetime) else 0
+    return (millis << 16) | (0xFFFF - min(int(question_number or 0), 0xFFFF))
+
+
+def _newest_first(keys, rows):
+    """Positions ordered by sort key, then row id, both descending"""
+    return np.lexsort((-rows.astype(np.int64), -keys))
+
+
+class SearchIndex:
+    """Append-only inverted index of questions, one row per stored question"""
+
+    def __init__(self, levels, capacity=1024):
+        self.levels = list(levels)
+        self._level_codes = {level: code for code, level in enumerate(self.levels)}
+        self.size = 0
+        # created_at of the newest analysis read by the last sync from MongoDB
+        self.watermark = None
+        # time.monotonic() of the last sync
+        self.synced_at = None
+        self._keys = np.empty(capacity, dtype=np.int64)
+        self._level_bitmaps = np.zeros((len(self.levels), capacity), dtype=bool)
+        self._row_levels = np.full(capacity, -1, dtype=np.int8)
+        self._postings = {}
+        self._owner_rows = {}
+        self._analysis_ids = []
+        self._question_numbers = []
+        self._questions = []
+        self._token_text = []
+        self._seen = set()
+        self._lock = threading.Lock()
+
+    def _grow(self, needed):
+        capacity = len(self._keys)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        keys = np.empty(capacity, dtype=np.int64)
+        keys[:self.size] = self._keys[:self.size]
+        bitmaps = np.zeros((len(self.levels), capacity), dtype=bool)
+        bitmaps[:, :self.size] = self._level_bitmaps[:, :self.size]
+        row_levels = np.full(capacity, -1, dtype=np.int8)
+        row_levels[:self.size] = self._row_levels[:self.size]
+        self._keys, self._level_bitmaps, self._row_levels = keys, bitmaps, row_levels
+
+    def add_analysis(self, analysis, rows):
+        """Index one saved analysis given its flattened (question_number, question, level, ...) rows"""
+        analysis_id = str(analysis.get('_id'))
+        with self._lock:
+            if analysis_id in self._seen:
+                return
+            self._seen.add(analysis_id)
+            self._grow(self.size + len(rows))
+            owner_rows = self._owner_rows.setdefault(analysis.get('user_id'), array('I'))
+            for question_number, question, level, *_ in rows:
+                row = self.size
+                tokens = tokenize(question)
+                for token in set(tokens):
+                    self._postings.setdefault(token, array('I')).append(row)
+                owner_rows.append(row)
+                self._keys[row] = sort_key(analysis.get('created_at'), question_number)
+                code = self._level_codes.get(level)
+                if code is not None:
+                    self._level_bitmaps[code, row] = True
+                    self._row_levels[row] = code
+                self._analysis_ids.append(analysis_id)
+                self._question_numbers.append(question_number)
+                self._questions.append(question)
+                self._token_text.append(' ' + ' '.join(tokens) + ' ')
+                self.size += 1
+
+    def _candidates(self, user_id, terms):
+        lists = [self._owner_rows.get(user_id)] + [self._postings.get(term) for term in set(terms)]
+        if any(posting is None for posting in lists):
+            return np.empty(0, dtype=np.uint32)
+        lists.sort(key=len)
+        rows = np.frombuffer(lists[0], dtype=np.uint32)
+        for posting in lists[1:]:
+            if not len(rows):
+                break
+            rows = np.intersect1d(rows, np.frombuffer(posting, dtype=np.uint32), assume_unique=True)
+        return rows
+
+    def search(self, user_id, terms=(), phrase=None, levels=None, limit=20, cursor=None):
+        """Return (hits, next cursor) for the user's questions matching every term, the phrase and a level"""
+        phrase_tokens = tokenize(phrase) if phrase else []
+        with self._lock:
+            rows = self._candidates(user_id, list(terms) + phrase_tokens)
+            if levels:
+                codes = [self._level_codes[level] for level in levels]
+                rows = rows[self._level_bitmaps[np.ix_(codes, rows)].any(axis=0)]
+            keys = self._keys[rows]
+            if cursor is not None:
+                # Analyses saved in the same millisecond share sort keys; the row id orders them
+                cursor_key, cursor_row = cursor
+                keep = (keys < cursor_key) | ((keys == cursor_key) & (rows < cursor_row))
+                rows, keys = rows[keep], keys[keep]
+
+            if phrase_tokens:
+                # Verify the phrase newest first until the page is full
+                needle = ' ' + ' '.join(phrase_tokens) + ' '
+                order = _newest_first(keys, rows)
+                page = []
+                for i in order:
+                    if needle in self._token_text[rows[i]]:
+                        page.append(int(rows[i]))
+                        if len(page) > limit:
+                            break
+            else:
+                if len(rows) > limit + 1:
+                    # Keep every row tied with the (limit + 1)-th key so ties are cut by row id below
+                    kth = np.partition(keys, len(keys) - limit - 1)[len(keys) - limit - 1]
+                    top = keys >= kth
+                    rows, keys = rows[top], keys[top]
+                page = [int(rows[i]) for i in _newest_first(keys, rows)[:limit + 1]]
+
+            has_more = len(page) > limit
+            page = page[:limit]
+            hits = [{
+                'analysis_id': self._analysis_ids[row],
+                'question_number': self._question_numbers[row],
+                'question': self._questions[row],
+                'level': self.levels[self._row_levels[row]] if self._row_levels[row] >= 0 else None
+            } for row in page]
+            next_cursor = (int(self._keys[page[-1]]), page[-1]) if has_more and page else None
+            return hits, next_cursor
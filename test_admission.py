@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Test script for admission control on expensive routes
+"""
+
+import io
+import threading
+import time
+
+import pytest
+
+import app as blooms_app
+import metrics
+from admission import AdmissionController, AdmissionRejected, ConcurrencyLimiter, CostClass, TokenBuckets
+
+USER_ID = '64b7f0c2a1b2c3d4e5f60718'
+
+
+def test_token_bucket_refills_at_rate():
+    buckets = TokenBuckets(rate=2, burst=3)
+    assert [buckets.take('alice', now=0) for _ in range(3)] == [0, 0, 0]
+    assert buckets.take('alice', now=0) == pytest.approx(0.5)
+    assert buckets.take('bob', now=0) == 0
+    assert buckets.take('alice', now=0.5) == 0
+    buckets.refund('alice')
+    assert buckets.take('alice', now=0.5) == 0
+    assert buckets.take('alice', now=0.5) > 0
+
+
+def test_limiter_queues_then_rejects():
+    limiter = ConcurrencyLimiter(max_concurrent=1, max_waiting=1, wait_seconds=2)
+    assert limiter.acquire() == 0
+    waited = []
+    waiter = threading.Thread(target=lambda: waited.append(limiter.acquire()))
+    waiter.start()
+    while limiter.waiting == 0:
+        time.sleep(0.01)
+
+    # The wait queue is full
+    with pytest.raises(AdmissionRejected) as rejected:
+        limiter.acquire()
+    assert rejected.value.status == 503 and rejected.value.reason == 'queue_full'
+
+    time.sleep(0.05)
+    limiter.release()
+    waiter.join()
+    assert waited[0] >= 0.05 and limiter.active == 1
+
+    limiter.wait_seconds = 0.05
+    with pytest.raises(AdmissionRejected) as rejected:
+        limiter.acquire()
+    assert rejected.value.reason == 'timeout' and rejected.value.retry_after == 1
+
+
+def test_routes_answer_429_and_503_with_retry_after():
+    original = blooms_app.admission
+    blooms_app.admission = AdmissionController({
+        'classify': CostClass(1, 0, rate_per_minute=6, burst=1, wait_seconds=0.05),
+        'upload': CostClass(1, 0, rate_per_minute=0, burst=0, wait_seconds=0.05),
+        'render': CostClass(1, 0, rate_per_minute=0, burst=0, wait_seconds=0.05)
+    }, max_active=2)
+    metrics.reset()
+    try:
+        client = blooms_app.app.test_client()
+        headers = {'Authorization': f'Bearer {blooms_app.create_jwt_token(USER_ID)}'}
+        assert client.post('/classify', json={'question': 'Define osmosis.'}, headers=headers).status_code == 200
+        limited = client.post('/classify', json={'question': 'Define osmosis.'}, headers=headers)
+        assert limited.status_code == 429 and limited.headers['Retry-After'] == '10'
+        assert metrics.get('admission_rejections', {'cost_class': 'classify', 'reason': 'rate_limited'}) == 1
+        assert metrics.get_histogram('admission_queue_wait_seconds', {'cost_class': 'classify'})[0] == 1
+
+        # Another upload holds the only upload slot and nothing may wait for it
+        release = blooms_app.admission.admit('upload', 'someone-else')
+        busy = client.post('/upload', data={'file': (io.BytesIO(b'1. Define osmosis?'), 'paper.txt')},
+                           headers=headers, content_type='multipart/form-data')
+        assert busy.status_code == 503 and busy.headers['Retry-After'] == '1'
+        release()
+        assert blooms_app.admission.active == 0
+    finally:
+        blooms_app.admission = original
+
+
+def test_streamed_batch_holds_its_slot_until_sent():
+    original = blooms_app.admission
+    blooms_app.admission = AdmissionController({
+        'classify': CostClass(1, 0, rate_per_minute=0, burst=0, wait_seconds=0.05),
+        'upload': CostClass(1, 0, rate_per_minute=0, burst=0, wait_seconds=0.05),
+        'render': CostClass(1, 0, rate_per_minute=0, burst=0, wait_seconds=0.05)
+    }, max_active=2)
+    try:
+        client = blooms_app.app.test_client()
+        headers = {'Authorization': f'Bearer {blooms_app.create_jwt_token(USER_ID)}'}
+        response = client.post('/api/classify/batch', json=['Define osmosis.'], headers=headers)
+        assert blooms_app.admission.active == 1
+        assert b'L1-Remember' in response.get_data()
+        assert blooms_app.admission.active == 0
+    finally:
+        blooms_app.admission = original
+
+
+def test_default_queues_fit_under_the_cap():
+    from config import Config
+    classes = ('CLASSIFY', 'UPLOAD', 'RENDER')
+    admitted = sum(getattr(Config, f'ADMISSION_{name}_CONCURRENCY') + getattr(Config, f'ADMISSION_{name}_QUEUE')
+                   for name in classes)
+    # Every queue can fill before the process-wide cap answers "overloaded"
+    assert admitted <= Config.ADMISSION_MAX_ACTIVE
+    assert blooms_app.admission.max_active == Config.ADMISSION_MAX_ACTIVE
+
+
+def test_jobs_share_the_class_slots():
+    original = blooms_app.admission
+    blooms_app.admission = AdmissionController({
+        'upload': CostClass(1, 0, rate_per_minute=6, burst=1, wait_seconds=0.05)
+    }, max_active=1)
+    try:
+        # Background admission neither takes a token nor counts against the cap
+        release = blooms_app.admission.admit('upload', USER_ID, background=True)
+        assert blooms_app.admission.active == 0
+        ran = []
+        stages = []
+        job = blooms_app.admitted_job('upload', lambda job, progress: ran.append(job['user_id']))
+        waiter = threading.Thread(target=job, args=({'user_id': USER_ID}, lambda *stage: stages.append(stage)))
+        waiter.start()
+        time.sleep(0.2)
+        assert ran == [] and stages[0] == ('waiting', 0)
+        release()
+        waiter.join(5)
+        assert ran == [USER_ID]
+        assert blooms_app.admission.cost_classes['upload'].limiter.active == 0
+        blooms_app.admission.admit('upload', USER_ID)()
+    finally:
+        blooms_app.admission = original
+
+
+if __name__ == "__main__":
+    test_token_bucket_refills_at_rate()
+    test_limiter_queues_then_rejects()
+    test_routes_answer_429_and_503_with_retry_after()
+    test_streamed_batch_holds_its_slot_until_sent()
+    test_default_queues_fit_under_the_cap()
+    test_jobs_share_the_class_slots()
+    print("✅ Admission control tests passed")
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Test script for the cursor-paginated analysis history API
+"""
+
+from datetime import datetime, timedelta
+
+import app as blooms_app
+
+USER_ID = '64b7f0c2a1b2c3d4e5f60718'
+
+
+def _seed(collection, count):
+    base = datetime(2025, 5, 1, 9, 0, 0)
+    for i in range(count):
+        collection.insert_one({
+            'user_id': USER_ID,
+            'analysis_type': 'file_upload',
+            'content': 'x' * 1000,
+            # Pairs share a timestamp so the _id tiebreaker is exercised
+            'created_at': base + timedelta(minutes=i // 2),
+            'results': {
+                'total_questions': i,
+                'level_counts': {'L1-Remember': i},
+                'questions': [{'question': 'Define osmosis.'}] * i
+            }
+        })
+    collection.insert_one({
+        'user_id': 'someone-else',
+        'analysis_type': 'single_question',
+        'content': 'Define osmosis.',
+        'created_at': base,
+        'results': {'level': 'L1-Remember'}
+    })
+
+
+def test_keyset_pagination_walks_history_once(mongo_db):
+    """Pages are disjoint, newest first, and summaries omit full results"""
+    _seed(mongo_db.analyses, 25)
+    client = blooms_app.app.test_client()
+    headers = {'Authorization': f'Bearer {blooms_app.create_jwt_token(USER_ID)}'}
+
+    seen = []
+    cursor = None
+    while True:
+        url = '/api/analyses?limit=10' + (f'&cursor={cursor}' if cursor else '')
+        data = client.get(url, headers=headers).get_json()
+        for summary in data['analyses']:
+            assert 'results' not in summary
+            assert set(summary) == {'id', 'analysis_type', 'created_at', 'total_questions', 'level_counts'}
+        seen.extend(data['analyses'])
+        cursor = data['next_cursor']
+        if not cursor:
+            break
+
+    assert len(seen) == 25
+    assert len({summary['id'] for summary in seen}) == 25
+    assert [summary['total_questions'] for summary in seen][:2] in ([24, 23], [23, 24])
+
+    detail = client.get(f"/api/analyses/{seen[0]['id']}", headers=headers).get_json()
+    assert len(detail['results']['questions']) == seen[0]['total_questions']
+
+
+def test_invalid_cursor_rejected():
+    """A malformed cursor gives a 400 instead of a server error"""
+    client = blooms_app.app.test_client()
+    headers = {'Authorization': f'Bearer {blooms_app.create_jwt_token(USER_ID)}'}
+    response = client.get('/api/analyses?cursor=not-a-cursor', headers=headers)
+    assert response.status_code == 400
+
+
+if __name__ == "__main__":
+    # The tests use pytest fixtures, so run them through pytest
+    import pytest
+    if pytest.main([__file__, '-q']) == 0:
+        print("✅ Analysis history API tests passed")
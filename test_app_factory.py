@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Test script for the application factory and pre-fork warmup
+"""
+
+import os
+import subprocess
+import sys
+
+
+def test_import_has_no_side_effects():
+    """Importing app must not connect to MongoDB or start threads (pre-fork safety)"""
+    code = (
+        "import threading, app\n"
+        "assert app.client is None\n"
+        "assert threading.active_count() == 1, threading.enumerate()\n"
+    )
+    subprocess.run([sys.executable, '-c', code], check=True)
+
+
+def test_deferred_factory_warms_up_without_connecting():
+    """The pre-fork master gets warm immutable state and production settings, but no MongoDB client"""
+    code = (
+        "import wsgi, app\n"
+        "from config import Config\n"
+        "assert app.client is None\n"
+        "assert app._lexicon and app._report_styles\n"
+        "assert app.app.config['DEBUG'] is False and Config.DEBUG is False\n"
+        "assert Config.METRICS_REQUIRE_TOKEN is True\n"
+    )
+    env = {key: value for key, value in os.environ.items() if key not in ('FLASK_DEBUG', 'METRICS_REQUIRE_TOKEN')}
+    subprocess.run([sys.executable, '-c', code], check=True, env=env)
+
+
+if __name__ == "__main__":
+    test_import_has_no_side_effects()
+    test_deferred_factory_warms_up_without_connecting()
+    print("✅ App factory tests passed")
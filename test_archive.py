@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Test script for cold archival of old analyses
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+import app as blooms_app
+from config import Config
+from archive import archive_old_analyses
+
+mongomock = pytest.importorskip('mongomock')
+
+USER_ID = '64b7f0c2a1b2c3d4e5f60718'
+
+
+def test_old_analyses_archived_and_retrievable():
+    """Old file analyses move to the cold collection and can still be fetched"""
+    db = mongomock.MongoClient().db
+    old = datetime.now() - timedelta(days=400)
+    analysis = blooms_app.analyze_question_paper(['Define photosynthesis.', 'Design a greenhouse.'])
+    old_id = db.analyses.insert_one({
+        'user_id': USER_ID, 'analysis_type': 'file_upload', 'content': 'paper text',
+        'results': analysis, 'created_at': old
+    }).inserted_id
+    db.analyses.insert_one({
+        'user_id': USER_ID, 'analysis_type': 'single_question', 'content': 'Define osmosis.',
+        'results': {'level': 'L1-Remember'}, 'created_at': old
+    })
+    db.analyses.insert_one({
+        'user_id': USER_ID, 'analysis_type': 'file_upload', 'content': 'recent',
+        'results': analysis, 'created_at': datetime.now()
+    })
+
+    batches = []
+    assert archive_old_analyses(db.analyses, db.analyses_archive, older_than_days=180, batch_size=1,
+                                on_archived=batches.append) == 1
+    assert [[analysis['_id'] for analysis in batch] for batch in batches] == [[old_id]]
+    assert db.analyses.count_documents({}) == 2
+    assert db.analyses_archive.count_documents({}) == 1
+
+    original = (blooms_app.analyses_collection, blooms_app.archived_analyses_collection)
+    blooms_app.analyses_collection = db.analyses
+    blooms_app.archived_analyses_collection = db.analyses_archive
+    try:
+        client = blooms_app.app.test_client()
+        headers = {'Authorization': f'Bearer {blooms_app.create_jwt_token(USER_ID)}'}
+
+        listing = client.get('/api/analyses?archived=1', headers=headers).get_json()
+        assert [item['id'] for item in listing['analyses']] == [str(old_id)]
+        assert listing['analyses'][0]['total_questions'] == 2
+
+        detail = client.get(f'/api/analyses/{old_id}', headers=headers).get_json()
+        assert detail['archived'] is True
+        assert detail['content'] == 'paper text'
+        assert detail['results']['level_counts'] == analysis['level_counts']
+    finally:
+        blooms_app.analyses_collection, blooms_app.archived_analyses_collection = original
+
+
+def test_ttl_index_follows_retention_setting():
+    """Retention 0 drops a TTL index created under an earlier setting"""
+    original = (blooms_app.analyses_collection, blooms_app.archived_analyses_collection,
+                Config.SINGLE_QUESTION_RETENTION_DAYS)
+    db = mongomock.MongoClient().db
+    blooms_app.analyses_collection = db.analyses
+    blooms_app.archived_analyses_collection = db.analyses_archive
+    try:
+        Config.SINGLE_QUESTION_RETENTION_DAYS = 30
+        blooms_app.ensure_indexes()
+        indexes = db.analyses.index_information()
+        assert indexes['single_question_ttl']['expireAfterSeconds'] == 30 * 86400
+        assert indexes['single_question_ttl']['partialFilterExpression'] == {'analysis_type': 'single_question'}
+        # The archiver's created_at scan has an index of its own
+        assert [('created_at', 1), ('analysis_type', 1)] in [index['key'] for index in indexes.values()]
+        Config.SINGLE_QUESTION_RETENTION_DAYS = 0
+        blooms_app.ensure_indexes()
+        assert 'single_question_ttl' not in db.analyses.index_information()
+        blooms_app.ensure_indexes()
+    finally:
+        (blooms_app.analyses_collection, blooms_app.archived_analyses_collection,
+         Config.SINGLE_QUESTION_RETENTION_DAYS) = original
+
+
+if __name__ == "__main__":
+    test_old_analyses_archived_and_retrievable()
+    test_ttl_index_follows_retention_setting()
+    print("✅ Archive tests passed")
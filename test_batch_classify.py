@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Test script for the batch classification endpoint
+"""
+
+import json
+
+import app as blooms_app
+from config import Config
+
+QUESTIONS = [
+    "What is the capital of France?",
+    "Explain how photosynthesis works.",
+    "Design a new product for sustainable living."
+]
+
+
+class RecordingAnalyses:
+    """Stand-in analyses collection that records inserted documents"""
+
+    def __init__(self):
+        self.documents = []
+
+    def insert_one(self, document):
+        self.documents.append(document)
+
+
+def _post(client, body, content_type):
+    token = blooms_app.create_jwt_token('64b7f0c2a1b2c3d4e5f60718')
+    return client.post(
+        '/api/classify/batch',
+        data=body,
+        content_type=content_type,
+        headers={'Authorization': f'Bearer {token}'}
+    )
+
+
+def test_json_array_streams_ndjson(monkeypatch, no_db):
+    """Each question gets the same fields /classify returns, in order"""
+    analyses = RecordingAnalyses()
+    monkeypatch.setattr(blooms_app, 'analyses_collection', analyses)
+    response = _post(blooms_app.app.test_client(), json.dumps(QUESTIONS), 'application/json')
+    assert response.mimetype == 'application/x-ndjson'
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [line['question'] for line in lines] == QUESTIONS
+    assert [line['level'] for line in lines] == [blooms_app.classify_question(q) for q in QUESTIONS]
+    assert all(line['success'] for line in lines)
+
+    assert len(analyses.documents) == 1
+    assert analyses.documents[0]['analysis_type'] == 'batch_classify'
+    assert analyses.documents[0]['results']['total_questions'] == 3
+
+
+def test_ndjson_body_accepted(no_db):
+    """NDJSON bodies may mix plain strings and {"question": ...} objects"""
+    body = '\n'.join([json.dumps(QUESTIONS[0]), json.dumps({'question': QUESTIONS[1]}), json.dumps('')])
+    response = _post(blooms_app.app.test_client(), body, 'application/x-ndjson')
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert len(lines) == 3
+    assert lines[1]['question'] == QUESTIONS[1]
+    assert 'error' in lines[2]
+
+
+def test_results_stream_chunk_by_chunk(monkeypatch, no_db):
+    """A chunk's results are sent before the next chunk is classified; the batch is saved at the end"""
+    analyses = RecordingAnalyses()
+    monkeypatch.setattr(blooms_app, 'analyses_collection', analyses)
+    monkeypatch.setattr(Config, 'BATCH_STREAM_CHUNK', 2)
+    classified = []
+    classify_questions = blooms_app.classify_questions
+    monkeypatch.setattr(blooms_app, 'classify_questions',
+                        lambda questions, *args: classified.append(questions) or classify_questions(questions, *args))
+
+    body = '\n'.join(json.dumps(question) for question in QUESTIONS + ['', 'Define osmosis.'])
+    token = blooms_app.create_jwt_token('64b7f0c2a1b2c3d4e5f60718')
+    response = blooms_app.app.test_client().post('/api/classify/batch', data=body, content_type='application/x-ndjson',
+                                                 headers={'Authorization': f'Bearer {token}'}, buffered=False)
+    chunks = response.iter_encoded()
+    first = next(chunks).decode('utf-8')
+    assert [json.loads(line)['question'] for line in first.splitlines()] == QUESTIONS[:2]
+    assert classified == [QUESTIONS[:2]] and not analyses.documents
+
+    rest = b''.join(chunks).decode('utf-8').splitlines()
+    response.close()
+    assert [json.loads(line)['question_number'] for line in rest] == [3, 4, 5]
+    assert 'error' in json.loads(rest[1])
+    assert classified == [QUESTIONS[:2], QUESTIONS[2:], ['Define osmosis.']]
+    assert analyses.documents[0]['results']['total_questions'] == 4
+
+
+def test_malformed_body_rejected():
+    response = _post(blooms_app.app.test_client(), '{"questions": 5}', 'application/json')
+    assert response.status_code == 400
+
+
+if __name__ == "__main__":
+    # The tests use pytest fixtures, so run them through pytest
+    import pytest
+    if pytest.main([__file__, '-q']) == 0:
+        print("✅ Batch classification tests passed")
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Test script for the stateless bearer-token API path
+"""
+
+from contextlib import contextmanager
+
+import app as blooms_app
+import metrics
+
+
+@contextmanager
+def _client_without_db():
+    blooms_app.app.config['TESTING'] = True
+    original = blooms_app.analyses_collection
+    blooms_app.analyses_collection = []
+    try:
+        yield blooms_app.app.test_client()
+    finally:
+        blooms_app.analyses_collection = original
+
+
+def test_classify_with_bearer_token():
+    """A valid token classifies without a session cookie and is decoded once"""
+    token = blooms_app.create_jwt_token('64b7f0c2a1b2c3d4e5f60718')
+    blooms_app.token_cache.clear()
+    metrics.reset()
+
+    with _client_without_db() as client:
+        for _ in range(2):
+            response = client.post(
+                '/classify',
+                json={'question': 'Define photosynthesis.'},
+                headers={'Authorization': f'Bearer {token}'}
+            )
+            assert response.status_code == 200
+            assert response.get_json()['level'] == 'L1-Remember'
+            assert 'Set-Cookie' not in response.headers
+
+    assert metrics.get('token_cache_misses') == 1
+    assert metrics.get('token_cache_hits') == 1
+
+
+def test_invalid_bearer_token_rejected():
+    """A bad token gets a 401 instead of a login redirect"""
+    with _client_without_db() as client:
+        response = client.post(
+            '/classify',
+            json={'question': 'Define photosynthesis.'},
+            headers={'Authorization': 'Bearer not-a-token'}
+        )
+    assert response.status_code == 401
+
+
+
+def test_token_without_expiry_rejected():
+    """A correctly signed token with no exp claim gets a 401, not a server error"""
+    token = blooms_app.jwt.encode({'user_id': '64b7f0c2a1b2c3d4e5f60718'}, blooms_app.JWT_SECRET_KEY,
+                                  algorithm=blooms_app.JWT_ALGORITHM)
+    with _client_without_db() as client:
+        response = client.post(
+            '/classify',
+            json={'question': 'Define photosynthesis.'},
+            headers={'Authorization': f'Bearer {token}'}
+        )
+    assert response.status_code == 401
+    assert blooms_app.token_cache.get(token) is None
+
+
+if __name__ == "__main__":
+    test_classify_with_bearer_token()
+    test_invalid_bearer_token_rejected()
+    test_token_without_expiry_rejected()
+    print("✅ Bearer token tests passed")
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Test script for the rules-then-model classifier cascade
+"""
+
+import os
+import tempfile
+
+import app as blooms_app
+import linear_model
+import metrics
+from config import Config
+
+CLASSES = list(blooms_app.bloom_levels.keys())
+QUESTIONS = ['Define photosynthesis.', 'Ponder the ethics of cloning.', 'Compare and evaluate two designs.']
+
+
+def select_engine(engine, model_path):
+    Config.CLASSIFIER_ENGINE, Config.CLASSIFIER_MODEL_PATH = engine, model_path
+    blooms_app._linear_model = None
+    blooms_app._linear_model_loaded = False
+    blooms_app._lexicon_version = None
+
+
+def train_model(path):
+    # "Ponder" means nothing to the keyword rules; the model learns it as Evaluate
+    topics = ['cloning', 'tax policy', 'nuclear power', 'school uniforms', 'social media', 'space travel']
+    questions = [f'Ponder {topic}.' for topic in topics] + [f'Define {topic}.' for topic in topics]
+    labels = ['L5-Evaluate'] * len(topics) + ['L1-Remember'] * len(topics)
+    linear_model.train(questions, labels, CLASSES, n_features=2 ** 12, epochs=20).save(path)
+
+
+def test_only_ambiguous_questions_reach_the_model():
+    original = (Config.CLASSIFIER_ENGINE, Config.CLASSIFIER_MODEL_PATH)
+    with tempfile.TemporaryDirectory() as directory:
+        model_path = os.path.join(directory, 'model.npy')
+        train_model(model_path)
+        select_engine('cascade', model_path)
+        metrics.reset()
+        calls = []
+        model = blooms_app.get_linear_model()
+        score_batch = model.score_batch
+        model.score_batch = lambda questions: calls.append(list(questions)) or score_batch(questions)
+        try:
+            assert blooms_app.is_ambiguous(blooms_app.score_question(QUESTIONS[1]))
+            assert not blooms_app.is_ambiguous(blooms_app.score_question(QUESTIONS[0]))
+            assert blooms_app.get_lexicon_version().startswith('cascade-')
+
+            levels = blooms_app.classify_questions(QUESTIONS)
+            assert levels[:2] == ['L1-Remember', 'L5-Evaluate']
+            assert calls == [QUESTIONS[1:]]
+            assert metrics.get('cascade_questions', {'tier': 'rules'}) == 1
+            assert metrics.get('cascade_questions', {'tier': 'model'}) == 2
+            assert metrics.get('cascade_changed') >= 1
+            assert metrics.get_histogram('stage_duration_seconds', {'stage': 'cascade_model'})[0] == 1
+
+            # Work done in a CPU worker reports its tiers in the analysis for the request to record
+            analysis = blooms_app.analyze_question_paper(QUESTIONS)
+            assert analysis['classifier']['rules'] == 1 and analysis['classifier']['model'] == 2
+            blooms_app.record_classifier_stats(analysis['classifier'])
+            assert 'timings' not in analysis['classifier']
+            assert metrics.get('cascade_questions', {'tier': 'model'}) == 4
+        finally:
+            select_engine(*original)
+            metrics.reset()
+
+
+def test_rules_engine_reports_no_tiers():
+    analysis = blooms_app.analyze_question_paper(QUESTIONS)
+    assert 'classifier' not in analysis
+    assert blooms_app.classify_questions(QUESTIONS)[0] == 'L1-Remember'
+
+
+if __name__ == "__main__":
+    test_only_ambiguous_questions_reach_the_model()
+    test_rules_engine_reports_no_tiers()
+    print("✅ Cascade tests passed")
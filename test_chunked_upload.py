@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Test script for resumable chunked uploads
+"""
+
+import hashlib
+import os
+import tempfile
+
+import pytest
+
+import app as blooms_app
+from config import Config
+from executors import ExecutorBusy
+
+USER_ID = '64b7f0c2a1b2c3d4e5f60718'
+PAPER = '\n'.join(
+    [f'{i}. Explain how the process number {i} works in a living cell?' for i in range(1, 40)] +
+    ['40. Define photosynthesis.']
+).encode('utf-8')
+
+
+def _client():
+    client = blooms_app.app.test_client()
+    headers = {'Authorization': f'Bearer {blooms_app.create_jwt_token(USER_ID)}'}
+    return client, headers
+
+
+def _put(client, headers, upload_id, offset, chunk, checksum=None):
+    return client.put(
+        f'/api/uploads/{upload_id}?offset={offset}',
+        data=chunk,
+        headers=dict(headers, **{'X-Chunk-SHA256': checksum or hashlib.sha256(chunk).hexdigest()})
+    )
+
+
+def _with_temp_store(test):
+    def wrapped():
+        original = (blooms_app.chunked_uploads.root, blooms_app.analyses_collection, Config.CPU_EXECUTOR_KIND)
+        with tempfile.TemporaryDirectory() as directory:
+            blooms_app.chunked_uploads.root = directory
+            blooms_app.analyses_collection = []
+            Config.CPU_EXECUTOR_KIND = 'inline'
+            try:
+                test(directory)
+            finally:
+                blooms_app.chunked_uploads.root, blooms_app.analyses_collection, Config.CPU_EXECUTOR_KIND = original
+    wrapped.__name__ = test.__name__
+    return wrapped
+
+
+@_with_temp_store
+def test_resumable_paper_upload(directory):
+    client, headers = _client()
+    response = client.post('/api/uploads', json={'filename': 'Biology_v2.txt', 'size': len(PAPER)}, headers=headers)
+    assert response.status_code == 201
+    upload_id = response.get_json()['upload_id']
+    chunks = [PAPER[i:i + 500] for i in range(0, len(PAPER), 500)]
+
+    assert _put(client, headers, upload_id, 0, chunks[0]).get_json()['offset'] == 500
+    # A corrupted chunk is refused and the client is told where to resume
+    bad = _put(client, headers, upload_id, 500, chunks[1], checksum='0' * 64)
+    assert bad.status_code == 422 and bad.get_json()['offset'] == 500
+    # So is a chunk at the wrong offset
+    assert _put(client, headers, upload_id, 1000, chunks[2]).status_code == 409
+    # Finalizing early fails
+    assert client.post(f'/api/uploads/{upload_id}/finalize', headers=headers).status_code == 409
+
+    # Chunks reaching another worker process: its hasher catches up from the part file
+    blooms_app.chunked_uploads._hashers.clear()
+    offset = client.get(f'/api/uploads/{upload_id}', headers=headers).get_json()['offset']
+    for chunk in chunks[1:]:
+        offset = _put(client, headers, upload_id, offset, chunk).get_json()['offset']
+    assert offset == len(PAPER)
+
+    # Someone else's upload is invisible
+    other = {'Authorization': f"Bearer {blooms_app.create_jwt_token('64b7f0c2a1b2c3d4e5f60799')}"}
+    assert client.get(f'/api/uploads/{upload_id}', headers=other).status_code == 404
+
+    response = client.post(f'/api/uploads/{upload_id}/finalize', json={'sha256': hashlib.sha256(PAPER).hexdigest()},
+                           headers=headers)
+    data = response.get_json()
+    assert data['success'] and data['sha256'] == hashlib.sha256(PAPER).hexdigest()
+    assert data['analysis']['total_questions'] == len(blooms_app.extract_questions_from_text(PAPER.decode()))
+    assert os.listdir(directory) == []
+    assert client.get(f'/api/uploads/{upload_id}', headers=headers).status_code == 404
+
+
+@_with_temp_store
+def test_report_upload_and_validation(directory):
+    client, headers = _client()
+    body = b'Question\nDefine photosynthesis.\nCompare mitosis and meiosis.\n'
+    assert client.post('/api/uploads', json={'filename': 'paper.exe', 'size': 10}, headers=headers).status_code == 400
+    assert client.post('/api/uploads', json={'filename': 'q.csv', 'size': 10, 'kind': 'video'},
+                       headers=headers).status_code == 400
+    assert client.post('/api/uploads', json={'filename': 'q.csv', 'size': Config.CHUNKED_UPLOAD_MAX_BYTES + 1,
+                                             'kind': 'report'}, headers=headers).status_code == 413
+
+    upload_id = client.post('/api/uploads', json={'filename': 'q.csv', 'size': len(body), 'kind': 'report'},
+                            headers=headers).get_json()['upload_id']
+    assert _put(client, headers, upload_id, 0, body + b'extra').status_code == 400
+    assert _put(client, headers, upload_id, 0, body).status_code == 200
+    mismatch = client.post(f'/api/uploads/{upload_id}/finalize', json={'sha256': '0' * 64}, headers=headers)
+    assert mismatch.status_code == 422
+    data = client.post(f'/api/uploads/{upload_id}/finalize', headers=headers).get_json()
+    assert [item['level'] for item in data['analysis']['questions']] == ['L1-Remember', 'L4-Analyze']
+
+    aborted = client.post('/api/uploads', json={'filename': 'q.csv', 'size': 5, 'kind': 'report'},
+                          headers=headers).get_json()['upload_id']
+    assert client.delete(f'/api/uploads/{aborted}', headers=headers).status_code == 200
+    assert os.listdir(directory) == []
+
+
+@_with_temp_store
+def test_large_paper_fits_the_default_budget(directory):
+    client, headers = _client()
+    # A 30 MB PDF is over the request limit but within the default memory budget
+    response = client.post('/api/uploads', json={'filename': 'exam.pdf', 'size': 30 * 1024 * 1024}, headers=headers)
+    assert response.status_code == 201
+    assert client.delete(f"/api/uploads/{response.get_json()['upload_id']}", headers=headers).status_code == 200
+
+    too_big = client.post('/api/uploads', json={'filename': 'exam.pdf', 'size': Config.CHUNKED_UPLOAD_MAX_BYTES},
+                          headers=headers)
+    assert too_big.status_code == 413
+
+
+@_with_temp_store
+def test_failed_finalize_can_be_retried(directory):
+    client, headers = _client()
+    upload_id = client.post('/api/uploads', json={'filename': 'paper.txt', 'size': len(PAPER)},
+                            headers=headers).get_json()['upload_id']
+    _put(client, headers, upload_id, 0, PAPER)
+
+    # A second finalize while the first is still running is refused, not run twice
+    with pytest.raises(RuntimeError):
+        with blooms_app.chunked_uploads.finalizing(upload_id, USER_ID):
+            assert client.post(f'/api/uploads/{upload_id}/finalize', headers=headers).status_code == 409
+            raise RuntimeError('analysis failed')
+
+    def busy(*args):
+        raise ExecutorBusy('Too many tasks are already queued, please retry shortly')
+
+    original = blooms_app.extract_paper_questions
+    blooms_app.extract_paper_questions = busy
+    try:
+        assert client.post(f'/api/uploads/{upload_id}/finalize', headers=headers).status_code == 503
+    finally:
+        blooms_app.extract_paper_questions = original
+
+    # The upload is still complete, so the retry needs no resend
+    assert client.get(f'/api/uploads/{upload_id}', headers=headers).get_json()['offset'] == len(PAPER)
+    assert client.post(f'/api/uploads/{upload_id}/finalize', headers=headers).get_json()['success']
+    assert os.listdir(directory) == []
+
+
+if __name__ == "__main__":
+    test_resumable_paper_upload()
+    test_report_upload_and_validation()
+    test_large_paper_fits_the_default_budget()
+    test_failed_finalize_can_be_retried()
+    print("✅ Chunked upload tests passed")
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Test script for the offline bulk classification CLI
+"""
+
+import json
+import os
+
+import cli
+
+
+def _make_papers(directory):
+    os.makedirs(os.path.join(directory, 'nested'))
+    with open(os.path.join(directory, 'paper1.txt'), 'w', encoding='utf-8') as file:
+        file.write('1. Define photosynthesis.\n2. Explain how rain forms.\n')
+    with open(os.path.join(directory, 'nested', 'list.csv'), 'w', encoding='utf-8') as file:
+        file.write('Question\nDesign a new product for sustainable living.\n')
+    with open(os.path.join(directory, 'notes.md'), 'w', encoding='utf-8') as file:
+        file.write('not a paper')
+
+
+def test_collect_files_filters_extensions(tmp_path):
+    _make_papers(str(tmp_path))
+    files = cli.collect_files([str(tmp_path)])
+    assert [os.path.basename(path) for path in files] == ['list.csv', 'paper1.txt']
+    assert cli.collect_files([str(tmp_path / '**' / '*.csv')]) == [str(tmp_path / 'nested' / 'list.csv')]
+
+
+def test_run_writes_results_and_resumes(tmp_path):
+    papers = tmp_path / 'papers'
+    _make_papers(str(papers))
+    output = str(tmp_path / 'results.jsonl')
+
+    summary = cli.run([str(papers)], output, workers=0)
+    assert summary['files_processed'] == 2
+    assert summary['total_questions'] == sum(summary['level_counts'].values())
+    with open(output, encoding='utf-8') as file:
+        rows = [json.loads(line) for line in file]
+    assert len(rows) == summary['total_questions']
+    assert {row['file'] for row in rows} == set(cli.collect_files([str(papers)]))
+
+    # A second run only picks up the new file
+    with open(papers / 'paper2.txt', 'w', encoding='utf-8') as file:
+        file.write('1. Evaluate the impact of social media on society.\n')
+    summary = cli.run([str(papers)], output, workers=0)
+    assert summary['files_skipped'] == 2
+    assert summary['files_processed'] == 1
+    with open(output + '.manifest', encoding='utf-8') as file:
+        assert len(file.readlines()) == 3
+
+
+def test_files_without_questions_fail_and_are_retried(tmp_path):
+    papers = tmp_path / 'papers'
+    papers.mkdir()
+    with open(papers / 'blank.txt', 'w', encoding='utf-8') as file:
+        file.write('Nothing to classify here')
+    with open(papers / 'empty.csv', 'w', encoding='utf-8') as file:
+        file.write('Question\n')
+    output = str(tmp_path / 'results.jsonl')
+
+    summary = cli.run([str(papers)], output, workers=0)
+    assert summary['files_processed'] == 0 and summary['files_failed'] == 2
+    assert {failure['error'] for failure in summary['failures']} == {'No questions found in the file'}
+    assert not os.path.exists(output + '.manifest') or os.path.getsize(output + '.manifest') == 0
+    assert cli.run([str(papers)], output, workers=0)['files_failed'] == 2
+
+
+def test_csv_output(tmp_path):
+    papers = tmp_path / 'papers'
+    _make_papers(str(papers))
+    output = str(tmp_path / 'results.csv')
+    assert cli.main([str(papers), '-o', output, '--workers', '0']) == 0
+    with open(output, encoding='utf-8') as file:
+        assert file.readline().strip() == ','.join(cli.OUTPUT_FIELDS)
+
+
+if __name__ == "__main__":
+    import pathlib
+    import tempfile
+    test_collect_files_filters_extensions(pathlib.Path(tempfile.mkdtemp()))
+    test_run_writes_results_and_resumes(pathlib.Path(tempfile.mkdtemp()))
+    test_files_without_questions_fail_and_are_retried(pathlib.Path(tempfile.mkdtemp()))
+    test_csv_output(pathlib.Path(tempfile.mkdtemp()))
+    print("✅ CLI tests passed")
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Test script for the bounded CPU/I/O executors
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import executors
+from executors import BoundedExecutor, ExecutorBusy
+
+
+def test_bounded_executor_rejects_when_full():
+    """Submissions beyond the pending cap fail fast instead of queueing forever"""
+    release = threading.Event()
+    bounded = BoundedExecutor(ThreadPoolExecutor(max_workers=1), max_pending=2, submit_timeout=0.05)
+    try:
+        first = bounded.submit(release.wait)
+        second = bounded.submit(release.wait)
+        with pytest.raises(ExecutorBusy):
+            bounded.submit(release.wait)
+        release.set()
+        first.result()
+        second.result()
+        # Slots are released once tasks finish
+        assert bounded.submit(sum, [1, 2, 3]).result() == 6
+    finally:
+        release.set()
+        bounded.shutdown()
+
+
+def test_run_cpu_uses_process_pool():
+    """CPU stages run in a separate process and return their result"""
+    import app as blooms_app
+    try:
+        assert executors.run_cpu(blooms_app.classify_question, 'Define photosynthesis.') == 'L1-Remember'
+    finally:
+        executors.shutdown()
+
+
+def test_broken_process_pool_is_replaced():
+    """A dead worker process turns into ExecutorBusy once, then a fresh pool serves requests"""
+    original = executors.Config.CPU_EXECUTOR_KIND
+    executors.Config.CPU_EXECUTOR_KIND = 'process'
+    try:
+        with pytest.raises(ExecutorBusy):
+            executors.run_cpu(os._exit, 1)
+        assert executors.run_cpu(sum, [1, 2, 3]) == 6
+    finally:
+        executors.Config.CPU_EXECUTOR_KIND = original
+        executors.shutdown()
+
+
+def test_map_cpu_keeps_order_and_reads_arguments_lazily():
+    """Results come back in submission order with a bounded number of inputs in flight"""
+    read = []
+
+    def arguments():
+        for i in range(6):
+            read.append(i)
+            yield (i, i)
+
+    try:
+        results = executors.map_cpu(pow, arguments(), max_in_flight=2)
+        assert next(results) == 1
+        assert len(read) == 3
+        assert list(results) == [1, 4, 27, 256, 3125]
+    finally:
+        executors.shutdown()
+
+
+if __name__ == "__main__":
+    test_bounded_executor_rejects_when_full()
+    test_run_cpu_uses_process_pool()
+    test_broken_process_pool_is_replaced()
+    test_map_cpu_keeps_order_and_reads_arguments_lazily()
+    print("✅ Executor tests passed")
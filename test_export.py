@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Test script for Parquet / Arrow export of classification results
+"""
+
+import io
+from datetime import datetime
+
+import pytest
+
+pa = pytest.importorskip('pyarrow')
+
+import app as blooms_app
+import export
+
+LEVELS = list(blooms_app.bloom_levels.keys())
+USER_ID = '64b7f0c2a1b2c3d4e5f60718'
+
+ANALYSES = [
+    {'_id': 'a1', 'analysis_type': 'single_question', 'created_at': datetime(2024, 1, 1),
+     'content': 'Define photosynthesis.', 'results': {'level': 'L1-Remember'}},
+    {'_id': 'a2', 'analysis_type': 'file_upload', 'created_at': datetime(2024, 1, 2), 'results': {'questions': [
+        {'question_number': 1, 'question': 'Explain how rain forms.', 'level': 'L2-Understand', 'is_multi_level': False},
+        {'question_number': 2, 'question': 'Design and evaluate a bridge.', 'level': 'L6-Create', 'is_multi_level': True}
+    ]}}
+]
+
+
+def _read(path, file_format):
+    if file_format == 'parquet':
+        import pyarrow.parquet as pq
+        return pq.read_table(path)
+    with pa.memory_map(path) as source:
+        return pa.ipc.open_file(source).read_all()
+
+
+@pytest.mark.parametrize('file_format', ['parquet', 'arrow'])
+def test_history_is_flattened_with_dictionary_levels(tmp_path, file_format):
+    path = str(tmp_path / f'history.{file_format}')
+    # batch_rows=2 forces several batches sharing one level dictionary
+    assert export.write_history(iter(ANALYSES), path, file_format, LEVELS, batch_rows=2) == 3
+
+    table = _read(path, file_format)
+    assert pa.types.is_dictionary(table.schema.field('level').type)
+    assert table.column('level').to_pylist() == ['L1-Remember', 'L2-Understand', 'L6-Create']
+    assert table.column('question').to_pylist()[0] == 'Define photosynthesis.'
+    assert table.column('analysis_id').to_pylist() == ['a1', 'a2', 'a2']
+    assert table.column('is_multi_level').to_pylist() == [False, False, True]
+
+
+def test_download_report_as_parquet(cached_user):
+    import pyarrow.parquet as pq
+    client = blooms_app.app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = USER_ID
+        session['report_data'] = [
+            {'question_number': 1, 'question': 'Define osmosis.', 'level': 'L1-Remember',
+             'description': blooms_app.bloom_levels['L1-Remember']['description']}
+        ]
+        session['report_filename'] = 'paper.csv'
+
+    response = client.get('/download_report/parquet')
+    assert response.status_code == 200
+    assert 'paper_blooms_report.parquet' in response.headers['Content-Disposition']
+    table = pq.read_table(io.BytesIO(response.data))
+    assert table.column('level').to_pylist() == ['L1-Remember']
+    assert pa.types.is_dictionary(table.schema.field('description').type)
+
+
+def test_history_export_endpoint(no_db):
+    token = blooms_app.create_jwt_token(USER_ID)
+    client = blooms_app.app.test_client()
+    response = client.get('/api/analyses/export?format=arrow', headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == 200
+    assert response.mimetype == 'application/vnd.apache.arrow.file'
+    assert pa.ipc.open_file(pa.BufferReader(response.data)).read_all().num_rows == 0
+
+    response = client.get('/api/analyses/export?format=xlsx', headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == 400
+
+
+if __name__ == "__main__":
+    # The tests use pytest fixtures, so run them through pytest
+    if pytest.main([__file__, '-q']) == 0:
+        print("✅ Export tests passed")
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Import-time budget for app.py, measured with `python -X importtime`
+
+Heavy libraries are imported by the code paths that need them (and by the
+pre-fork warmup), so a cold `import app` must not pull them in.
+"""
+
+import os
+import subprocess
+import sys
+
+# Cumulative import time allowed for `import app`, in milliseconds
+IMPORT_TIME_BUDGET_MS = float(os.getenv('IMPORT_TIME_BUDGET_MS', 1000))
+
+HEAVY_MODULES = {'pandas', 'numpy', 'reportlab', 'PyPDF2', 'docx', 'openpyxl', 'pyarrow'}
+
+
+def measure_import(module='app'):
+    """Return ({imported top-level package names}, cumulative microseconds for module)"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True, text=True, check=True,
+        cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    imported = set()
+    cumulative_us = None
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = [part.strip() for part in line[len('import time:'):].split('|')]
+        if not cumulative.isdigit():
+            continue  # header line
+        imported.add(name.split('.')[0])
+        if name == module:
+            cumulative_us = int(cumulative)
+    return imported, cumulative_us
+
+
+def test_heavy_libraries_not_imported():
+    imported, _ = measure_import()
+    assert not (imported & HEAVY_MODULES), f"Imported at startup: {sorted(imported & HEAVY_MODULES)}"
+
+
+def test_import_time_within_budget():
+    _, cumulative_us = measure_import()
+    assert cumulative_us is not None
+    assert cumulative_us / 1000 <= IMPORT_TIME_BUDGET_MS, \
+        f"import app took {cumulative_us / 1000:.0f} ms (budget {IMPORT_TIME_BUDGET_MS:.0f} ms)"
+
+
+if __name__ == "__main__":
+    imported, cumulative_us = measure_import()
+    print(f"import app: {cumulative_us / 1000:.0f} ms (budget {IMPORT_TIME_BUDGET_MS:.0f} ms)")
+    print(f"Heavy modules imported: {sorted(imported & HEAVY_MODULES) or 'none'}")
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Test script for the background job queue
+"""
+
+import io
+import os
+import tempfile
+import time
+import zipfile
+from datetime import datetime, timedelta
+
+import pytest
+
+import app as blooms_app
+from config import Config
+from jobs import JobCancelled, JobConflict, JobLimitExceeded, JobQueue, JobWorker
+
+mongomock = pytest.importorskip('mongomock')
+
+USER_ID = '64b7f0c2a1b2c3d4e5f60718'
+OTHER_USER_ID = '64b7f0c2a1b2c3d4e5f60799'
+PAPER = b'1. What is photosynthesis?\n2. Explain how rain forms.\n3. Design a new water filter.\n'
+
+
+def make_queue(root, **limits):
+    settings = dict(max_running_per_user=1, max_active_per_user=3, max_attempts=2, lease_seconds=60,
+                    result_ttl_seconds=3600)
+    settings.update(limits)
+    queue = JobQueue(mongomock.MongoClient().db.jobs, root, **settings)
+    queue.ensure_indexes()
+    return queue
+
+
+def _with_job_queue(test):
+    def wrapped():
+        original = (blooms_app.job_queue, blooms_app.analyses_collection, Config.CPU_EXECUTOR_KIND)
+        with tempfile.TemporaryDirectory() as directory:
+            blooms_app.job_queue = make_queue(directory)
+            blooms_app.analyses_collection = []
+            Config.CPU_EXECUTOR_KIND = 'inline'
+            try:
+                test(JobWorker(blooms_app.job_queue, blooms_app.JOB_HANDLERS, poll_interval=0))
+            finally:
+                blooms_app.job_queue, blooms_app.analyses_collection, Config.CPU_EXECUTOR_KIND = original
+    wrapped.__name__ = test.__name__
+    return wrapped
+
+
+def test_per_user_slots_cancel_and_retry():
+    with tempfile.TemporaryDirectory() as directory:
+        queue = make_queue(directory)
+        first = queue.submit(USER_ID, 'paper', {})
+        second = queue.submit(USER_ID, 'paper', {})
+        other = queue.submit(OTHER_USER_ID, 'paper', {})
+        queue.submit(USER_ID, 'paper', {})
+        with pytest.raises(JobLimitExceeded):
+            queue.submit(USER_ID, 'paper', {})
+
+        # One running job per user: the second user's job overtakes the first user's backlog
+        running = queue.claim('worker-a')
+        assert running['_id'] == first['_id']
+        assert queue.claim('worker-b')['_id'] == other['_id']
+        assert queue.claim('worker-c') is None
+
+        # Queued jobs are cancelled at once, running ones at their next progress report
+        assert queue.cancel(second['_id'], USER_ID)['status'] == 'cancelled'
+        assert queue.cancel(first['_id'], USER_ID)['cancel_requested']
+        with pytest.raises(JobCancelled):
+            queue.progress(running, 'classifying', 50)
+        queue.cancelled(running)
+        with pytest.raises(JobConflict):
+            queue.cancel(first['_id'], USER_ID)
+
+        # The slot is free again, and a cancelled job can be retried
+        assert queue.retry(second['_id'], USER_ID)['status'] == 'queued'
+        assert queue.claim('worker-a')['_id'] == second['_id']
+        with pytest.raises(JobConflict):
+            queue.retry(second['_id'], USER_ID)
+
+
+def test_failures_are_retried_until_out_of_attempts():
+    with tempfile.TemporaryDirectory() as directory:
+        queue = make_queue(directory)
+        job = queue.submit(USER_ID, 'paper', {})
+        calls = []
+
+        def flaky(job, progress):
+            calls.append(job['attempts'])
+            raise RuntimeError('disk full')
+
+        worker = JobWorker(queue, {'paper': flaky}, poll_interval=0)
+        assert worker.run_once() and worker.run_once()
+        assert not worker.run_once()
+        assert calls == [1, 2]
+        failed = queue.get(job['_id'], USER_ID)
+        assert failed['status'] == 'failed' and failed['error'] == 'disk full'
+        assert queue.retry(job['_id'], USER_ID)['attempts'] == 0
+
+        # A job whose worker stopped renewing its lease goes back to the queue
+        stale = queue.claim('worker-a')
+        queue.collection.update_one({'_id': stale['_id']},
+                                    {'$set': {'heartbeat_at': datetime.now() - timedelta(minutes=5)}})
+        assert queue.requeue_stale() == 1
+        assert queue.claim('worker-b')['attempts'] == 2
+
+
+@_with_job_queue
+def test_async_upload(worker):
+    client = blooms_app.app.test_client()
+    headers = {'Authorization': f'Bearer {blooms_app.create_jwt_token(USER_ID)}'}
+    response = client.post('/upload?async=1', data={'file': (io.BytesIO(PAPER), 'paper.txt')}, headers=headers,
+                           content_type='multipart/form-data')
+    assert response.status_code == 202
+    job = response.get_json()
+    assert job['status'] == 'queued' and response.headers['Location'].endswith(job['status_url'])
+    assert client.get(f"/api/jobs/{job['job_id']}/result", headers=headers).status_code == 409
+
+    assert worker.run_once()
+    status = client.get(job['status_url'], headers=headers).get_json()
+    assert status['status'] == 'succeeded' and status['progress'] == {'stage': 'done', 'percent': 100}
+    result = client.get(status['result_url'], headers=headers).get_json()
+    questions = blooms_app.extract_questions_from_text(PAPER.decode())
+    assert result['success'] and result['analysis']['total_questions'] == len(questions)
+    assert os.listdir(blooms_app.job_queue.job_dir(job['job_id'])) == ['result.json']
+
+    other = {'Authorization': f"Bearer {blooms_app.create_jwt_token(OTHER_USER_ID)}"}
+    assert client.get(job['status_url'], headers=other).status_code == 404
+    assert [item['job_id'] for item in client.get('/api/jobs', headers=headers).get_json()['jobs']] == [job['job_id']]
+
+    # Files without questions fail without being retried
+    response = client.post('/upload?async=1', data={'file': (io.BytesIO(b'nothing here'), 'notes.txt')},
+                           headers=headers, content_type='multipart/form-data')
+    assert worker.run_once()
+    failed = client.get(response.get_json()['status_url'], headers=headers).get_json()
+    assert failed['status'] == 'failed' and failed['attempts'] == 1
+
+
+def test_lease_renewed_while_handler_runs():
+    with tempfile.TemporaryDirectory() as directory:
+        queue = make_queue(directory, lease_seconds=0.09)
+        job = queue.submit(USER_ID, 'paper', {})
+        beats = []
+
+        def slow(job, progress):
+            # No progress reports: only the heartbeat thread keeps the lease
+            for _ in range(3):
+                time.sleep(0.1)
+                beats.append(queue.collection.find_one({'_id': job['_id']})['heartbeat_at'])
+                assert queue.requeue_stale() == 0
+            return {}
+
+        assert JobWorker(queue, {'paper': slow}, poll_interval=0).run_once()
+        assert beats[0] < beats[-1]
+        assert queue.get(job['_id'], USER_ID)['status'] == 'succeeded'
+
+
+@_with_job_queue
+def test_retry_after_save_stores_nothing_twice(worker):
+    blooms_app.analyses_collection = mongomock.MongoClient().db.analyses
+    client = blooms_app.app.test_client()
+    headers = {'Authorization': f'Bearer {blooms_app.create_jwt_token(USER_ID)}'}
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, 'w') as bundle:
+        bundle.writestr('a.txt', PAPER)
+        bundle.writestr('b.txt', PAPER)
+    original = blooms_app.save_job_result
+
+    def fails_once(job, payload):
+        blooms_app.save_job_result = original
+        raise OSError('disk full')
+
+    uploads = [('/upload?async=1', PAPER, 'paper.txt'), ('/upload_zip?async=1', archive.getvalue(), 'papers.zip')]
+    for url, data, filename in uploads:
+        response = client.post(url, data={'file': (io.BytesIO(data), filename)}, headers=headers,
+                               content_type='multipart/form-data')
+        assert response.status_code == 202
+        # The first attempt fails after saving; the retry finds its analyses already stored
+        blooms_app.save_job_result = fails_once
+        try:
+            assert worker.run_once() and worker.run_once()
+        finally:
+            blooms_app.save_job_result = original
+        status = client.get(response.get_json()['status_url'], headers=headers).get_json()
+        assert status['status'] == 'succeeded' and status['attempts'] == 2
+    assert blooms_app.analyses_collection.count_documents({}) == 3
+    # The retried paper was not compared against the copy its first attempt stored
+    assert blooms_app.analyses_collection.count_documents({'results.revision': {'$exists': True}}) == 0
+
+
+@_with_job_queue
+def test_async_report_render(worker):
+    blooms_app.user_cache.set(USER_ID, {'_id': USER_ID, 'email': 'test@example.com', 'name': 'Test'})
+    client = blooms_app.app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = USER_ID
+        session['report_data'] = [
+            {'question_number': 1, 'question': 'Define osmosis.', 'level': 'L1-Remember',
+             'description': blooms_app.bloom_levels['L1-Remember']['description']}
+        ]
+        session['report_filename'] = 'paper.csv'
+    response = client.get('/download_report/csv?async=1')
+    assert response.status_code == 202
+    assert worker.run_once()
+    result = client.get(f"/api/jobs/{response.get_json()['job_id']}/result")
+    assert 'paper_blooms_report.csv' in result.headers['Content-Disposition']
+    assert b'Define osmosis.' in result.data
+
+
+if __name__ == "__main__":
+    test_per_user_slots_cancel_and_retry()
+    test_failures_are_retried_until_out_of_attempts()
+    test_lease_renewed_while_handler_runs()
+    test_async_upload()
+    test_retry_after_save_stores_nothing_twice()
+    test_async_report_render()
+    print("✅ Job queue tests passed")
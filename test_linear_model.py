@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Test script for the learned linear classifier engine
+"""
+
+import csv
+import json
+import os
+import tempfile
+
+import numpy as np
+
+import app as blooms_app
+import linear_model
+from config import Config
+
+CLASSES = list(blooms_app.bloom_levels.keys())
+OPENERS = {
+    'L1-Remember': 'Define', 'L2-Understand': 'Explain', 'L3-Apply': 'Calculate',
+    'L4-Analyze': 'Compare', 'L5-Evaluate': 'Justify', 'L6-Create': 'Design'
+}
+TOPICS = ['photosynthesis', 'the water cycle', 'ohm law', 'supply and demand', 'plate tectonics', 'recursion',
+          'the french revolution', 'cell division', 'climate change', 'binary search']
+
+
+def labeled_questions():
+    questions, labels = [], []
+    for level, opener in OPENERS.items():
+        for topic in TOPICS:
+            questions.append(f'{opener} {topic}.')
+            labels.append(level)
+    return questions, labels
+
+
+def write_labels(path):
+    questions, labels = labeled_questions()
+    with open(path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(['Question', 'Level'])
+        for question, label in zip(questions, labels):
+            writer.writerow([question, label.split('-')[1]])
+
+
+def test_hashed_features_and_batched_inference():
+    indptr, indices, values = linear_model.hash_features(['Define osmosis.', '?!', 'Explain osmosis'], 1024)
+    assert list(np.diff(indptr)) == [4, 0, 4]
+    assert indices.max() < 1024
+    assert np.isclose(np.sum(values[:4] ** 2), 1.0)
+
+    weights = np.random.RandomState(0).randn(1025, 6).astype(np.float32)
+    out = linear_model.sparse_dot(indptr, indices, values, weights)
+    dense = np.zeros((3, 1024), dtype=np.float32)
+    for row in range(3):
+        np.add.at(dense[row], indices[indptr[row]:indptr[row + 1]], values[indptr[row]:indptr[row + 1]])
+    assert np.allclose(out, dense @ weights[:1024], atol=1e-5)
+
+
+def test_train_save_load_and_evaluate():
+    questions, labels = labeled_questions()
+    model = linear_model.train(questions, labels, CLASSES, n_features=2 ** 12, epochs=20)
+    assert model.predict(['Justify the use of nuclear power.', 'Design a bridge.']) == ['L5-Evaluate', 'L6-Create']
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'model.npy')
+        model.save(path)
+        loaded = linear_model.LinearModel.load(path)
+        assert isinstance(loaded.weights, np.memmap)
+        assert loaded.fingerprint == model.fingerprint != ''
+        assert loaded.predict(questions) == model.predict(questions)
+
+        report = linear_model.evaluate(questions, labels, loaded, lambda batch: ['L1-Remember'] * len(batch))
+        assert report['linear']['accuracy'] == 1.0
+        assert report['rules']['accuracy'] == round(1 / 6, 4)
+
+
+def test_cli_and_engine_selection():
+    original = (Config.CLASSIFIER_ENGINE, Config.CLASSIFIER_MODEL_PATH)
+    with tempfile.TemporaryDirectory() as directory:
+        labels_path = os.path.join(directory, 'labels.csv')
+        model_path = os.path.join(directory, 'models', 'linear.npy')
+        write_labels(labels_path)
+        assert linear_model.main(['train', labels_path, '-o', model_path, '--features', '4096']) == 0
+        assert json.load(open(linear_model.metadata_path(model_path)))['examples'] == 60
+        assert linear_model.main(['evaluate', labels_path, '--model', model_path]) == 0
+
+        rules_version = blooms_app.get_lexicon_version()
+        Config.CLASSIFIER_ENGINE, Config.CLASSIFIER_MODEL_PATH = 'linear', model_path
+        blooms_app._linear_model_loaded = False
+        blooms_app._lexicon_version = None
+        try:
+            assert blooms_app.get_lexicon_version().startswith('linear-')
+            assert blooms_app.classify_questions(['Justify your choice of sorting algorithm.']) == ['L5-Evaluate']
+            scores = blooms_app.score_questions(['Calculate the area of a circle.'])[0]
+            assert set(scores) == set(CLASSES) and abs(sum(scores.values()) - 1) < 1e-3
+        finally:
+            Config.CLASSIFIER_ENGINE, Config.CLASSIFIER_MODEL_PATH = original
+            blooms_app._linear_model = None
+            blooms_app._linear_model_loaded = False
+            blooms_app._lexicon_version = None
+        assert blooms_app.get_lexicon_version() == rules_version
+
+
+if __name__ == "__main__":
+    test_hashed_features_and_batched_inference()
+    test_train_save_load_and_evaluate()
+    test_cli_and_engine_selection()
+    print("✅ Linear classifier tests passed")
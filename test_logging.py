@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Test script for sampled, queued structured logging
+"""
+
+import io
+import json
+import logging
+import queue
+
+import logs
+import metrics
+from config import Config
+
+
+def test_large_fields_are_truncated():
+    fields = logs.truncate({'content': 'x' * 5000, 'questions': list(range(100))}, max_chars=100, max_items=10)
+    assert fields['content'].startswith('x' * 100)
+    assert fields['content'].endswith('(+4900 chars)')
+    assert fields['questions'][:10] == list(range(10))
+    assert fields['questions'][-1] == '+90 items'
+
+
+def test_events_are_written_as_json_lines():
+    stream = io.StringIO()
+    original = dict(Config.LOG_SAMPLE_RATES)
+    Config.LOG_SAMPLE_RATES.update({'noisy': 0.0})
+    try:
+        logs.setup_logging(stream=stream, force=True)
+        logger = logs.get_logger('test')
+        logs.log_event(logger, 'analysis_saved', user_id='u1', content='y' * 10000)
+        for _ in range(50):
+            logs.log_event(logger, 'noisy', value=1)
+        logs.log_event(logger, 'noisy', logging.ERROR, error='always kept')
+        logs.shutdown_logging()
+    finally:
+        Config.LOG_SAMPLE_RATES.clear()
+        Config.LOG_SAMPLE_RATES.update(original)
+        logs.setup_logging(force=True)
+
+    entries = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [entry['event'] for entry in entries] == ['analysis_saved', 'noisy']
+    assert entries[0]['user_id'] == 'u1'
+    assert len(entries[0]['content']) < Config.LOG_MAX_FIELD_CHARS + 50
+    assert entries[1]['level'] == 'ERROR' and entries[1]['error'] == 'always kept'
+
+
+def test_full_queue_drops_instead_of_blocking():
+    metrics.reset()
+    handler = logs.DroppingQueueHandler(queue.Queue(maxsize=2))
+    logger = logging.getLogger('blooms-test-dropping')
+    logger.propagate = False
+    logger.addHandler(handler)
+    try:
+        for i in range(5):
+            logger.warning('event %d', i)
+    finally:
+        logger.removeHandler(handler)
+    assert handler.queue.qsize() == 2
+    assert metrics.get('log_records_dropped') == 3
+
+
+if __name__ == "__main__":
+    test_large_fields_are_truncated()
+    test_events_are_written_as_json_lines()
+    test_full_queue_drops_instead_of_blocking()
+    print("✅ Logging tests passed")
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Test script for peak-memory tracking and the per-request memory budget
+"""
+
+import io
+
+import app as blooms_app
+import metrics
+from config import Config
+
+QUESTIONS = [
+    {'question': 'Define photosynthesis.', 'level': 'Remember', 'description': 'Recall facts'},
+    {'question': 'Explain, in "detail", how rain forms.', 'level': 'Understand', 'description': 'Explain ideas'}
+]
+
+
+USER_ID = '64b7f0c2a1b2c3d4e5f60718'
+
+
+def _client_with_report():
+    blooms_app.user_cache.set(USER_ID, {'_id': USER_ID, 'email': 'test@example.com', 'name': 'Test'})
+    client = blooms_app.app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = USER_ID
+        session['report_data'] = QUESTIONS
+        session['report_filename'] = 'paper.csv'
+    return client
+
+
+def test_extract_text_joins_parts(tmp_path):
+    path = tmp_path / 'paper.txt'
+    path.write_text('  What is osmosis?\nDefine entropy.  \n', encoding='utf-8')
+    assert blooms_app.extract_text_from_file(str(path), 'txt') == 'What is osmosis?\nDefine entropy.'
+
+
+def test_chunked_csv_read_matches_full_read(tmp_path):
+    path = tmp_path / 'questions.csv'
+    rows = ['Question'] + [f'Explain topic number {i} in detail.' for i in range(25)] + ['nan', 'short']
+    path.write_text('\n'.join(rows) + '\n', encoding='utf-8')
+    full = blooms_app.read_questions_from_file(str(path), 'csv')
+    assert len(full) == 25
+    assert blooms_app.read_questions_from_file(str(path), 'csv', chunksize=4) == full
+
+
+def test_csv_read_parses_only_the_question_column():
+    import pandas as pd
+    frames = []
+    read_csv = pd.read_csv
+
+    def recording_read_csv(*args, **kwargs):
+        frames.append(read_csv(*args, **kwargs))
+        return frames[-1]
+
+    # An in-memory member of an archive is rewound after its header is read
+    data = 'Notes,Question\nlong notes,Explain how rain forms.\n,Define photosynthesis now.\n'
+    pd.read_csv = recording_read_csv
+    try:
+        questions = blooms_app.read_questions_from_file(io.BytesIO(data.encode('utf-8')), 'csv')
+    finally:
+        pd.read_csv = read_csv
+    assert questions == ['Explain how rain forms.', 'Define photosynthesis now.']
+    assert [list(frame.columns) for frame in frames] == [['Notes', 'Question'], ['Question']]
+
+
+def test_upload_over_budget_is_refused():
+    original = (Config.MEMORY_BUDGET_BYTES, Config.MEMORY_TRACKING, Config.MEMORY_TRACKING_SAMPLE_RATE)
+    Config.MEMORY_BUDGET_BYTES = 1024
+    Config.MEMORY_TRACKING, Config.MEMORY_TRACKING_SAMPLE_RATE = True, 1.0
+    metrics.reset()
+    try:
+        client = blooms_app.app.test_client()
+        token = blooms_app.create_jwt_token(USER_ID)
+        data = {'file': (io.BytesIO(b'Define photosynthesis.\n' * 200), 'paper.pdf')}
+        response = client.post('/upload', data=data, content_type='multipart/form-data',
+                               headers={'Authorization': f'Bearer {token}'})
+        assert response.status_code == 413
+        assert 'MB' in response.get_json()['error']
+        assert metrics.get('memory_budget_rejections', {'route': '/upload'}) == 1
+        assert metrics.get_histogram('request_peak_memory_bytes', {'route': '/upload'})[0] == 1
+    finally:
+        Config.MEMORY_BUDGET_BYTES, Config.MEMORY_TRACKING, Config.MEMORY_TRACKING_SAMPLE_RATE = original
+
+
+def test_request_limit_fits_the_default_budget():
+    # Any file /upload or /upload_report accepts is processed whole, not refused
+    for extension in blooms_app.ALLOWED_EXTENSIONS | blooms_app.REPORT_EXTENSIONS:
+        assert not blooms_app.over_budget(blooms_app.estimate_file_job_bytes(Config.MAX_CONTENT_LENGTH, extension))
+
+
+def test_oversized_report_streams_csv_or_is_refused():
+    original = (Config.MEMORY_BUDGET_BYTES, Config.MEMORY_TRACKING, Config.MEMORY_TRACKING_SAMPLE_RATE)
+    Config.MEMORY_BUDGET_BYTES = 1
+    Config.MEMORY_TRACKING, Config.MEMORY_TRACKING_SAMPLE_RATE = True, 1.0
+    metrics.reset()
+    try:
+        client = _client_with_report()
+        assert client.get('/download_report/pdf').status_code == 413
+
+        response = client.get('/download_report/csv')
+        assert response.status_code == 200
+        assert 'paper_blooms_report.csv' in response.headers['Content-Disposition']
+        lines = response.get_data(as_text=True).splitlines()
+        assert lines[0] == 'Question,Blooms_Level,Description'
+        assert lines[2] == '"Explain, in ""detail"", how rain forms.",Understand,Explain ideas'
+        assert metrics.get_histogram('request_peak_memory_bytes', {'route': '/download_report/<format>'})[0] == 2
+    finally:
+        Config.MEMORY_BUDGET_BYTES, Config.MEMORY_TRACKING, Config.MEMORY_TRACKING_SAMPLE_RATE = original
+
+
+if __name__ == "__main__":
+    import pathlib
+    import tempfile
+    test_extract_text_joins_parts(pathlib.Path(tempfile.mkdtemp()))
+    test_chunked_csv_read_matches_full_read(pathlib.Path(tempfile.mkdtemp()))
+    test_csv_read_parses_only_the_question_column()
+    test_upload_over_budget_is_refused()
+    test_request_limit_fits_the_default_budget()
+    test_oversized_report_streams_csv_or_is_refused()
+    print("✅ Memory tracking tests passed")
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Test script for MinHash/LSH near-duplicate question detection
+"""
+
+import time
+from datetime import datetime
+
+import numpy as np
+
+import app as blooms_app
+import near_duplicates as nd
+from config import Config
+
+THRESHOLD = 0.5
+
+
+def test_signatures_estimate_similarity():
+    near = nd.signature("Define photosynthesis.") == nd.signature("Define the term photosynthesis")
+    far = nd.signature("Define photosynthesis.") == nd.signature("Design a new sustainable city.")
+    assert near.mean() >= THRESHOLD > far.mean()
+    assert nd.is_empty(nd.signature("?!"))
+
+
+def test_index_finds_near_duplicates_among_many():
+    index = nd.MinHashIndex(capacity=16, max_tail=100)
+    rng = np.random.RandomState(0)
+    vocabulary = [''.join(rng.choice(list('abcdefghijklmnopqrstuvwxyz'), 7)) for _ in range(2000)]
+    questions = [' '.join(rng.choice(vocabulary, 6)) for _ in range(1000)]
+    index.add(nd.signatures(questions[:500]), 0, list(range(500)))
+    index.add(nd.signatures(questions[500:]), 1, list(range(500, 1000)))  # partly left in the unsorted tail
+
+    query = nd.signature("Explain " + questions[42])
+    matches = index.query(query, THRESHOLD)
+    assert matches[0][0] == 42
+    assert len(index.candidates(nd.band_keys(query[None, :])[0])) < 100
+    assert index.query(query, THRESHOLD, owner=1) == []
+
+
+def test_cluster_within_paper():
+    questions = [
+        "Define photosynthesis.",
+        "Explain how rain forms.",
+        "Define the term photosynthesis",
+        "Explain how the rain is formed."
+    ]
+    clusters = sorted(members for members, _ in nd.cluster(nd.signatures(questions), THRESHOLD))
+    assert clusters == [[0, 2], [1, 3]]
+
+
+class AggregatingAnalyses:
+    """Stand-in analyses collection returning documents saved by another worker"""
+
+    def __init__(self, documents):
+        self.documents = documents
+
+    def aggregate(self, pipeline):
+        match = pipeline[0]['$match']
+        since = match.get('created_at', {}).get('$gte', datetime.min)
+        return [doc for doc in self.documents if doc['user_id'] == match['user_id'] and doc['created_at'] >= since]
+
+
+def test_history_matches_are_per_user_and_skip_same_document():
+    user_id = '64b7f0c2a1b2c3d4e5f60718'
+    documents = [
+        {'_id': 'old', 'user_id': user_id, 'analysis_type': 'file_upload', 'created_at': datetime(2024, 1, 1),
+         'lineage': 'biology_exam', 'results': {'questions': [
+             {'question_number': 3, 'question': 'Define the term photosynthesis', 'level': 'L1-Remember'}]}},
+        {'_id': 'other', 'user_id': 'someone-else', 'analysis_type': 'single_question',
+         'created_at': datetime(2024, 1, 2), 'content': 'Define photosynthesis', 'results': {'level': 'L1-Remember'}}
+    ]
+    original = blooms_app.analyses_collection
+    blooms_app.analyses_collection = AggregatingAnalyses(documents)
+    blooms_app._question_indexes.clear()
+    try:
+        # The user's index is built in the background; until then only clusters are reported
+        assert blooms_app.find_near_duplicates(["Define photosynthesis."], user_id) == {'clusters': []}
+        while blooms_app.get_question_index('near_duplicates', user_id) is None:
+            time.sleep(0.01)
+        assert blooms_app.get_question_index('near_duplicates', 'someone-else') is None
+
+        result = blooms_app.find_near_duplicates(["Define photosynthesis.", "Explain how rain forms."], user_id)
+        assert result['clusters'] == []
+        assert len(result['history_matches']) == 1
+        match = result['history_matches'][0]
+        assert match['question_number'] == 1
+        assert [m['analysis_id'] for m in match['matches']] == ['old']
+        assert match['matches'][0]['similarity'] >= Config.NEAR_DUPLICATE_THRESHOLD
+
+        # Earlier versions of the same document are not reported as history duplicates
+        result = blooms_app.find_near_duplicates(["Define photosynthesis."], user_id, 'biology_exam')
+        assert result['history_matches'] == []
+
+        # Analyses saved by this worker are indexed right away
+        blooms_app.index_saved_analysis({
+            '_id': 'new', 'user_id': user_id, 'analysis_type': 'single_question', 'created_at': datetime.now(),
+            'content': 'Explain how the rain is formed.', 'results': {'level': 'L2-Understand'}
+        })
+        result = blooms_app.find_near_duplicates(["Explain how rain forms."], user_id)
+        assert result['history_matches'][0]['matches'][0]['analysis_id'] == 'new'
+
+        # Archiving drops the user's index; it is rebuilt without the archived analyses
+        documents.pop(0)
+        blooms_app.forget_question_indexes([{'_id': 'old', 'user_id': user_id}])
+        assert blooms_app.get_question_index('near_duplicates', user_id) is None
+        while blooms_app.get_question_index('near_duplicates', user_id) is None:
+            time.sleep(0.01)
+        assert blooms_app.find_near_duplicates(["Define photosynthesis."], user_id)['history_matches'] == []
+    finally:
+        blooms_app.analyses_collection = original
+        blooms_app._question_indexes.clear()
+
+
+if __name__ == "__main__":
+    test_signatures_estimate_similarity()
+    test_index_finds_near_duplicates_among_many()
+    test_cluster_within_paper()
+    test_history_matches_are_per_user_and_skip_same_document()
+    print("✅ Near-duplicate tests passed")
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Test script for opt-in request profiling and the admin profile endpoints
+"""
+
+import os
+import threading
+
+import app as blooms_app
+import metrics
+from config import Config
+from profiling import RequestProfiler
+
+
+def test_profiled_request_is_stored_and_downloadable(monkeypatch, tmp_path, no_db):
+    monkeypatch.setattr(Config, 'ADMIN_TOKEN', 'admin-secret')
+    monkeypatch.setattr(Config, 'PROFILE_DIR', str(tmp_path))
+    monkeypatch.setattr(Config, 'PROFILE_MAX_FILES', 2)
+    client = blooms_app.app.test_client()
+    token = blooms_app.create_jwt_token('64b7f0c2a1b2c3d4e5f60718')
+    headers = {'Authorization': f'Bearer {token}', 'X-Profile': '1', 'X-Admin-Token': 'admin-secret'}
+    for _ in range(3):
+        response = client.post('/classify', json={'question': 'Define photosynthesis.'}, headers=headers)
+        assert response.status_code == 200
+
+    # Without the admin token the header is ignored
+    client.post('/classify', json={'question': 'Define osmosis.'},
+                headers={'Authorization': f'Bearer {token}', 'X-Profile': '1'})
+
+    admin = {'X-Admin-Token': 'admin-secret'}
+    profiles = client.get('/admin/profiles', headers=admin).get_json()['profiles']
+    assert len(profiles) == 2  # bounded by PROFILE_MAX_FILES
+    assert profiles[0]['route'] == 'classify'
+    assert profiles[0]['input_bytes'] > 0
+
+    summary = client.get(f"/admin/profiles/{profiles[0]['name']}?top=200", headers=admin)
+    assert 'classify_question' in summary.get_data(as_text=True)
+
+    download = client.get(f"/admin/profiles/{profiles[0]['name']}", headers=admin)
+    assert download.status_code == 200 and download.data
+
+    assert client.get('/admin/profiles').status_code == 403
+    assert client.get('/admin/profiles/../config.py', headers=admin).status_code == 404
+
+
+def test_concurrent_profiled_requests_profile_one_at_a_time(monkeypatch, tmp_path, no_db):
+    """Requests arriving while another is profiled run unprofiled instead of failing"""
+    monkeypatch.setattr(Config, 'ADMIN_TOKEN', 'admin-secret')
+    monkeypatch.setattr(Config, 'PROFILE_DIR', str(tmp_path))
+    monkeypatch.setattr(Config, 'PROFILE_MAX_FILES', 100)
+    metrics.reset()
+    token = blooms_app.create_jwt_token('64b7f0c2a1b2c3d4e5f60718')
+    headers = {'Authorization': f'Bearer {token}', 'X-Profile': '1', 'X-Admin-Token': 'admin-secret'}
+
+    def classify():
+        client = blooms_app.app.test_client()
+        return client.post('/classify', json={'question': 'Define photosynthesis.'}, headers=headers).status_code
+
+    held = RequestProfiler.start()
+    try:
+        assert RequestProfiler.start() is None
+        assert classify() == 200
+        assert os.listdir(tmp_path) == [] and metrics.get('profiles_skipped') == 1
+    finally:
+        held.stop()
+
+    statuses = []
+    barrier = threading.Barrier(8)
+
+    def worker():
+        barrier.wait()
+        statuses.append(classify())
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert statuses == [200] * 8
+    assert len(os.listdir(tmp_path)) + metrics.get('profiles_skipped') == 9
+    assert RequestProfiler.start().stop() >= 0
+
+
+if __name__ == "__main__":
+    # The tests use pytest fixtures, so run them through pytest
+    import pytest
+    if pytest.main([__file__, '-q']) == 0:
+        print("✅ Profiling tests passed")
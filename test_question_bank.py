@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Test script for the global question bank
+"""
+
+import app as blooms_app
+import metrics
+import question_bank
+from revisions import question_hash
+
+QUESTIONS = [
+    "Define photosynthesis.",
+    "Explain how rain forms.",
+    "Design and evaluate a new bridge."
+]
+
+
+class FakeBank:
+    """Stand-in question bank collection recording $in lookups"""
+
+    def __init__(self):
+        self.documents = {}
+        self.lookups = []
+
+    def find(self, query, projection=None):
+        hashes = query['_id']['$in']
+        self.lookups.append(hashes)
+        return [doc for hash_, doc in self.documents.items()
+                if hash_ in hashes and doc['lexicon_version'] == query['lexicon_version']]
+
+    def bulk_write(self, operations, ordered=True):
+        for operation in operations:
+            document = operation._doc['$set']
+            self.documents[operation._filter['_id']] = dict(document, _id=operation._filter['_id'])
+
+
+def test_bank_entries_reproduce_classification():
+    new_entries = {}
+    fresh = blooms_app.analyze_question_paper(QUESTIONS, bank_scores={}, new_entries=new_entries)
+    assert fresh['question_bank'] == {'served': 0, 'total': 3, 'share': 0.0}
+    assert set(new_entries) == {question_hash(question) for question in QUESTIONS}
+
+    bank_scores = {hash_: entry['scores'] for hash_, entry in new_entries.items()}
+    calls = []
+    original = blooms_app.score_question
+    blooms_app.score_question = lambda question: calls.append(question) or original(question)
+    try:
+        served = blooms_app.analyze_question_paper(QUESTIONS, bank_scores=bank_scores, new_entries={})
+    finally:
+        blooms_app.score_question = original
+    assert calls == []
+    assert served['question_bank']['share'] == 1.0
+    assert [item['all_levels'] for item in served['questions']] == [item['all_levels'] for item in fresh['questions']]
+    assert served['level_counts'] == fresh['level_counts']
+
+
+def test_lookup_is_one_query_and_respects_lexicon_version():
+    bank = FakeBank()
+    question_bank.store_scores(bank, {'h1': {'scores': {'L1-Remember': 1}, 'level': 'L1-Remember'}}, 'v1')
+    assert question_bank.lookup_scores(bank, ['h1', 'h2'], 'v1') == {'h1': {'L1-Remember': 1}}
+    assert question_bank.lookup_scores(bank, ['h1'], 'v2') == {}
+    assert len(bank.lookups) == 2
+
+
+def test_batch_endpoint_uses_bank():
+    bank = FakeBank()
+    original = (blooms_app.question_bank_collection, blooms_app.analyses_collection, blooms_app.submit_io)
+    blooms_app.question_bank_collection = bank
+    blooms_app.analyses_collection = []
+    # Store new bank entries synchronously so the second batch sees them
+    blooms_app.submit_io = lambda fn, *args: fn(*args)
+    metrics.reset()
+    try:
+        client = blooms_app.app.test_client()
+        headers = {'Authorization': f"Bearer {blooms_app.create_jwt_token('64b7f0c2a1b2c3d4e5f60718')}"}
+        for _ in range(2):
+            response = client.post('/api/classify/batch', json=QUESTIONS, headers=headers)
+            # Classification runs while the stream is read
+            assert response.status_code == 200 and len(response.get_data(as_text=True).splitlines()) == 3
+        assert len(bank.lookups) == 2
+        assert metrics.get('question_bank_misses') == 3
+        assert metrics.get('question_bank_hits') == 3
+    finally:
+        blooms_app.question_bank_collection, blooms_app.analyses_collection, blooms_app.submit_io = original
+
+
+if __name__ == "__main__":
+    test_bank_entries_reproduce_classification()
+    test_lookup_is_one_query_and_respects_lexicon_version()
+    test_batch_endpoint_uses_bank()
+    print("✅ Question bank tests passed")
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Test script for incremental re-analysis of revised question papers
+"""
+
+import app as blooms_app
+from revisions import document_lineage, question_hash
+
+V1 = [
+    "Define photosynthesis.",
+    "Explain how rain forms.",
+    "Compare mitosis and meiosis.",
+    "List the planets of the solar system."
+]
+V2 = [
+    "Define  PHOTOSYNTHESIS.",  # same question after normalization
+    "Design an experiment to measure how rain forms.",  # edited
+    "Compare mitosis and meiosis.",
+    "Evaluate the impact of deforestation."  # replaces question 4
+]
+
+
+def test_document_lineage():
+    assert document_lineage('Physics_Midterm_v3.pdf') == 'physics_midterm'
+    assert document_lineage('physics_midterm-rev2.docx') == 'physics_midterm'
+    assert document_lineage('Chapter_1.pdf') == 'chapter_1'
+    assert document_lineage('paper_v2.pdf') == 'paper'
+    assert document_lineage('paper (2).pdf') == 'paper'
+    assert document_lineage('paper_v2 final.pdf') == 'paper'
+    # Digits glued to a word are part of the name
+    assert document_lineage('chapter1.pdf') == 'chapter1'
+    assert document_lineage('chapter3.pdf') == 'chapter3'
+    assert document_lineage('paper2.pdf') == 'paper2'
+    assert document_lineage('dev2.pdf') == 'dev2'
+    assert question_hash('Define  Osmosis.') == question_hash('define osmosis.')
+
+
+def test_only_changed_questions_are_classified():
+    v1 = blooms_app.analyze_question_paper(V1)
+    assert 'revision' not in v1
+
+    calls = []
+    original = blooms_app.score_question
+    blooms_app.score_question = lambda question: calls.append(question) or original(question)
+    try:
+        v2 = blooms_app.analyze_question_paper(V2, v1)
+    finally:
+        blooms_app.score_question = original
+
+    assert calls == [V2[1], V2[3]]
+    assert v2['revision']['reused'] == 2 and v2['revision']['classified'] == 2
+
+    # Incrementally updated statistics match a full re-analysis
+    full = blooms_app.analyze_question_paper(V2)
+    assert v2['level_counts'] == full['level_counts']
+    assert v2['level_percentages'] == full['level_percentages']
+    assert [item['level'] for item in v2['questions']] == [item['level'] for item in full['questions']]
+
+
+def test_diff_reports_modified_and_level_changes():
+    v1 = blooms_app.analyze_question_paper(V1)
+    revision = blooms_app.analyze_question_paper(V2, v1)['revision']
+    assert revision['unchanged'] == 2
+    assert revision['modified'] == 2 and revision['added'] == 0 and revision['removed'] == 0
+    changes = {change['question_number']: change for change in revision['changes']}
+    assert changes[2]['previous_question'] == V1[1]
+    assert changes[2]['previous_level'] == 'L2-Understand'
+    assert changes[2]['level_changed'] == (changes[2]['level'] != 'L2-Understand')
+    assert all(change['level_changed'] for change in revision['level_changes'])
+
+    # Dropping a question shows up as removed
+    revision = blooms_app.analyze_question_paper(V1[:3], v1)['revision']
+    assert revision['removed'] == 1 and revision['changes'][0]['status'] == 'removed'
+
+
+
+def test_results_of_another_classifier_are_not_reused():
+    v1 = blooms_app.analyze_question_paper(V1)
+    assert v1['classifier_version'] == blooms_app.get_lexicon_version()
+    # Saved before the lexicon or model changed (or before versions were recorded)
+    for version in ('linear-0123456789ab', None):
+        stale = dict(v1, classifier_version=version)
+        assert blooms_app.paper_classification_inputs(V2, {'results': stale})[0] is None
+        calls = []
+        original = blooms_app.score_question
+        blooms_app.score_question = lambda question: calls.append(question) or original(question)
+        try:
+            v2 = blooms_app.analyze_question_paper(V2, stale)
+        finally:
+            blooms_app.score_question = original
+        assert calls == V2 and 'revision' not in v2
+    assert blooms_app.paper_classification_inputs(V2, {'results': v1})[0] is v1
+
+if __name__ == "__main__":
+    test_document_lineage()
+    test_only_changed_questions_are_classified()
+    test_diff_reports_modified_and_level_changes()
+    test_results_of_another_classifier_are_not_reused()
+    print("✅ Revision tests passed")
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Test script for the inverted-index question search
+"""
+
+import time
+from datetime import datetime, timedelta
+
+import app as blooms_app
+from search_index import SearchIndex
+
+USER_ID = '64b7f0c2a1b2c3d4e5f60718'
+LEVELS = list(blooms_app.bloom_levels.keys())
+
+
+def make_index(count=300):
+    index = SearchIndex(LEVELS, capacity=4)
+    start = datetime(2024, 1, 1)
+    for n in range(count):
+        rows = [
+            (1, f"Justify the choice of method {n}.", 'L5-Evaluate'),
+            (2, f"Define term {n}.", 'L1-Remember'),
+            (3, "Compare and justify both designs.", 'L4-Analyze')
+        ]
+        index.add_analysis({'_id': f'a{n}', 'user_id': USER_ID, 'created_at': start + timedelta(minutes=n)}, rows)
+    index.add_analysis({'_id': 'other', 'user_id': 'someone-else', 'created_at': start},
+                       [(1, "Justify the choice of method.", 'L5-Evaluate')])
+    return index
+
+
+def test_terms_levels_and_phrase():
+    index = make_index()
+    hits, _ = index.search(USER_ID, terms=['justify'], levels=['L5-Evaluate'], limit=5)
+    assert [hit['analysis_id'] for hit in hits] == ['a299', 'a298', 'a297', 'a296', 'a295']
+    assert all(hit['level'] == 'L5-Evaluate' and hit['question_number'] == 1 for hit in hits)
+
+    hits, _ = index.search(USER_ID, phrase='and justify', limit=500)
+    assert len(hits) == 300 and all(hit['question_number'] == 3 for hit in hits)
+    assert index.search(USER_ID, phrase='justify and')[0] == []
+    assert index.search(USER_ID, terms=['missing'])[0] == []
+    assert index.search('nobody', terms=['justify'])[0] == []
+
+    # Re-adding an analysis (e.g. on a sync overlap) does not duplicate its questions
+    index.add_analysis({'_id': 'a0', 'user_id': USER_ID, 'created_at': datetime(2024, 1, 1)},
+                       [(1, "Justify the choice of method 0.", 'L5-Evaluate')])
+    assert index.size == 901
+
+
+def test_pagination_covers_every_match_once():
+    index = make_index()
+    seen = []
+    cursor = None
+    while True:
+        hits, cursor = index.search(USER_ID, terms=['term'], limit=64, cursor=cursor)
+        seen.extend((hit['analysis_id'], hit['question_number']) for hit in hits)
+        if cursor is None:
+            break
+    assert len(seen) == len(set(seen)) == 300
+    assert seen[0] == ('a299', 2) and seen[-1] == ('a0', 2)
+
+
+def test_pagination_splits_ties():
+    # Analyses saved in the same millisecond give their questions equal sort keys
+    index = SearchIndex(LEVELS)
+    created_at = datetime(2024, 1, 1)
+    for n in range(10):
+        index.add_analysis({'_id': f'a{n}', 'user_id': USER_ID, 'created_at': created_at},
+                           [(1, f"Define term {n}.", 'L1-Remember')])
+    seen = []
+    cursor = None
+    while True:
+        hits, cursor = index.search(USER_ID, terms=['term'], limit=3, cursor=cursor)
+        seen.extend(hit['analysis_id'] for hit in hits)
+        if cursor is None:
+            break
+    assert seen == [f'a{n}' for n in reversed(range(10))]
+    hits, cursor = index.search(USER_ID, phrase='define term', limit=3)
+    assert [hit['analysis_id'] for hit in hits] == ['a9', 'a8', 'a7']
+    hits, _ = index.search(USER_ID, phrase='define term', limit=3, cursor=cursor)
+    assert [hit['analysis_id'] for hit in hits] == ['a6', 'a5', 'a4']
+
+
+def test_search_endpoint():
+    original = blooms_app.analyses_collection
+    blooms_app.analyses_collection = []
+    blooms_app._question_indexes.clear()
+    try:
+        blooms_app.user_cache.set(USER_ID, {'_id': USER_ID, 'email': 'test@example.com', 'name': 'Test'})
+        client = blooms_app.app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = USER_ID
+        # The user's index is built in the background
+        while client.get('/api/questions/search?q=justify').status_code == 503:
+            time.sleep(0.01)
+        assert client.get('/api/questions/search?q=justify').get_json() == {'questions': [], 'next_cursor': None}
+
+        blooms_app.index_saved_analysis({
+            '_id': 'saved', 'user_id': USER_ID, 'analysis_type': 'file_upload', 'created_at': datetime.now(),
+            'results': {'questions': [
+                {'question_number': 1, 'question': 'Justify your answer.', 'level': 'L5-Evaluate'},
+                {'question_number': 2, 'question': 'Justify the steps you followed.', 'level': 'L3-Apply'}
+            ]}
+        })
+        data = client.get('/api/questions/search?q=Justify&level=L5-Evaluate').get_json()
+        assert [hit['question'] for hit in data['questions']] == ['Justify your answer.']
+        data = client.get('/api/questions/search?q=justify&limit=1').get_json()
+        assert data['questions'][0]['question_number'] == 1 and data['next_cursor']
+        data = client.get(f"/api/questions/search?q=justify&limit=1&cursor={data['next_cursor']}").get_json()
+        assert data['questions'][0]['question_number'] == 2 and data['next_cursor'] is None
+
+        assert client.get('/api/questions/search?level=L9-Dream').status_code == 400
+        assert client.get('/api/questions/search?cursor=abc').status_code == 400
+    finally:
+        blooms_app.analyses_collection = original
+        blooms_app._question_indexes.clear()
+
+
+if __name__ == "__main__":
+    test_terms_levels_and_phrase()
+    test_pagination_covers_every_match_once()
+    test_pagination_splits_ties()
+    test_search_endpoint()
+    print("✅ Question search tests passed")
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Test script for the per-worker user cache used by Flask-Login
+"""
+
+import time
+
+from bson import ObjectId
+
+import app as blooms_app
+import metrics
+from cache import TTLCache
+
+
+class CountingUsers:
+    """Stand-in users collection that counts find_one calls"""
+
+    def __init__(self, user_data):
+        self.user_data = user_data
+        self.calls = 0
+
+    def find_one(self, query, projection=None):
+        self.calls += 1
+        if query.get('_id') == self.user_data['_id']:
+            return dict(self.user_data)
+        return None
+
+
+def test_ttl_cache_expiry():
+    """Entries expire after their TTL and are evicted beyond maxsize"""
+    cache = TTLCache(maxsize=2, ttl=0.05)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.set('c', 3)
+    assert cache.get('a') is None
+    assert cache.get('c') == 3
+    time.sleep(0.06)
+    assert cache.get('c') is None
+
+
+def test_load_user_uses_cache(monkeypatch):
+    """Only the first load_user call for a user reaches the database"""
+    user_id = ObjectId()
+    users = CountingUsers({'_id': user_id, 'email': 'teacher@example.com', 'name': 'Teacher'})
+    monkeypatch.setattr(blooms_app, 'users_collection', users)
+    # A cache of its own, so entries other tests left behind neither matter nor leak out
+    monkeypatch.setattr(blooms_app, 'user_cache', TTLCache(maxsize=10, ttl=60))
+    metrics.reset()
+    first = blooms_app.load_user(str(user_id))
+    second = blooms_app.load_user(str(user_id))
+    assert first.email == second.email == 'teacher@example.com'
+    assert users.calls == 1
+    assert metrics.get('user_cache_hits') == 1
+    assert metrics.get('user_cache_misses') == 1
+
+    blooms_app.invalidate_cached_user(user_id)
+    blooms_app.load_user(str(user_id))
+    assert users.calls == 2
+
+
+if __name__ == "__main__":
+    # The tests use pytest fixtures, so run them through pytest
+    import pytest
+    if pytest.main([__file__, '-q']) == 0:
+        print("✅ User cache tests passed")
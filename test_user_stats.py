@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Test script for the materialized per-user level statistics
+"""
+
+from datetime import datetime
+
+from bson import ObjectId
+
+import app as blooms_app
+
+
+def test_stats_updated_on_save(mongo_db):
+    """Each saved analysis is folded into one aggregate document"""
+    analysis = blooms_app.analyze_question_paper([
+        'Define photosynthesis.',
+        'Evaluate the effectiveness of renewable energy sources.'
+    ])
+    blooms_app.save_analysis_to_db('user-1', 'file_upload', 'text', analysis)
+    blooms_app.save_analysis_to_db('user-1', 'single_question', 'Define osmosis.', {'level': 'L1-Remember'})
+
+    stats = blooms_app.get_user_stats('user-1')
+    assert stats['total_analyses'] == 2
+    assert stats['total_questions'] == 3
+    assert stats['level_counts']['L1-Remember'] == analysis['level_counts']['L1-Remember'] + 1
+    assert stats['analysis_types'] == {'file_upload': 1, 'single_question': 1}
+    assert stats['monthly'][0]['month'] == datetime.now().strftime('%Y-%m')
+    assert mongo_db.user_stats.count_documents({}) == 1
+
+
+def test_upload_is_stored_before_the_response(monkeypatch, mongo_db):
+    """The analysis exists when the upload answers; a failed insert is reported"""
+    analysis = blooms_app.analyze_question_paper(['Define photosynthesis.'])
+    saved = blooms_app.save_analysis('user-1', 'file_upload', 'text', analysis)
+    assert mongo_db.analyses.find_one({'_id': ObjectId(saved['analysis_id'])})['user_id'] == 'user-1'
+
+    class FailingAnalyses:
+        def insert_one(self, document):
+            raise RuntimeError('not primary')
+
+    monkeypatch.setattr(blooms_app, 'analyses_collection', FailingAnalyses())
+    assert 'save_error' in blooms_app.save_analysis('user-1', 'file_upload', 'text', analysis)
+
+
+def test_history_before_stats_is_backfilled_once(mongo_db):
+    """Analyses saved before the stats document existed are counted on the first read"""
+    mongo_db.analyses.insert_one({
+        'user_id': 'user-1', 'analysis_type': 'file_upload', 'created_at': datetime(2024, 3, 5),
+        'results': {'total_questions': 2, 'level_counts': {'L1-Remember': 2}, 'multi_level_count': 1}
+    })
+    mongo_db.analyses_archive.insert_one({
+        'user_id': 'user-1', 'analysis_type': 'report_upload', 'created_at': datetime(2023, 11, 1),
+        'results': {'total_questions': 1, 'level_counts': {'L4-Analyze': 1}}
+    })
+    mongo_db.analyses.insert_one({'user_id': 'user-2', 'analysis_type': 'single_question',
+                                  'created_at': datetime(2024, 3, 5), 'results': {'level': 'L1-Remember'}})
+    # A save after the upgrade creates the document; it must not hide the older history
+    blooms_app.save_analysis_to_db('user-1', 'single_question', 'Define osmosis.', {'level': 'L1-Remember'})
+
+    for _ in range(2):
+        stats = blooms_app.get_user_stats('user-1')
+        assert stats['total_analyses'] == 3
+        assert stats['total_questions'] == 4
+        assert stats['level_counts']['L1-Remember'] == 3
+        assert stats['level_counts']['L4-Analyze'] == 1
+        assert stats['multi_level_count'] == 1
+        assert [bucket['month'] for bucket in stats['monthly']][:2] == ['2023-11', '2024-03']
+    # A concurrent first read that lost the race adds nothing
+    blooms_app.backfill_user_stats('user-1')
+    assert blooms_app.get_user_stats('user-1')['total_analyses'] == 3
+
+
+def test_stats_empty_for_new_user(mongo_db):
+    """A user without analyses gets zeroed statistics"""
+    stats = blooms_app.get_user_stats('nobody')
+    assert stats['total_analyses'] == 0
+    assert set(stats['level_counts']) == set(blooms_app.bloom_levels)
+
+
+if __name__ == "__main__":
+    # The tests use pytest fixtures, so run them through pytest
+    import pytest
+    if pytest.main([__file__, '-q']) == 0:
+        print("✅ User statistics tests passed")
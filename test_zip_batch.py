@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Test script for ZIP batch uploads
+"""
+
+import io
+import zipfile
+
+import pytest
+from bson import ObjectId
+
+import app as blooms_app
+from config import Config
+from executors import ExecutorBusy
+
+USER_ID = '64b7f0c2a1b2c3d4e5f60718'
+PAPER = b'1. What is photosynthesis?\n2. Explain how rain forms.\n3. Design a new water filter.\n'
+QUESTION_LIST = b'Question\nCompare mitosis and meiosis.\nDefine osmosis.\n'
+
+
+def make_zip(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    buffer.seek(0)
+    return buffer
+
+
+def post_zip(buffer, name='term.zip'):
+    client = blooms_app.app.test_client()
+    headers = {'Authorization': f'Bearer {blooms_app.create_jwt_token(USER_ID)}'}
+    return client.post('/upload_zip', data={'file': (buffer, name)}, headers=headers,
+                       content_type='multipart/form-data')
+
+
+def _with_inline_executor(test):
+    def wrapped():
+        original = (blooms_app.analyses_collection, Config.CPU_EXECUTOR_KIND)
+        blooms_app.analyses_collection = []
+        Config.CPU_EXECUTOR_KIND = 'inline'
+        try:
+            test()
+        finally:
+            blooms_app.analyses_collection, Config.CPU_EXECUTOR_KIND = original
+    wrapped.__name__ = test.__name__
+    return wrapped
+
+
+@_with_inline_executor
+def test_combined_report():
+    buffer = make_zip({
+        'physics/midterm.txt': PAPER,
+        'lists/biology.csv': QUESTION_LIST,
+        'empty.txt': b'no questions here',
+        'notes.exe': b'MZ',
+        '.DS_Store': b'',
+        '__MACOSX/physics/._midterm.txt': b''
+    })
+    data = post_zip(buffer).get_json()
+    assert data['success']
+    papers = {paper['filename']: paper for paper in data['papers']}
+    assert set(papers) == {'physics/midterm.txt', 'lists/biology.csv', 'empty.txt'}
+    assert papers['empty.txt']['error'] == 'No questions found'
+    assert [q['level'] for q in papers['lists/biology.csv']['questions']] == ['L4-Analyze', 'L1-Remember']
+    assert data['skipped'] == [{'filename': 'notes.exe', 'reason': 'unsupported file type'}]
+
+    aggregate = data['aggregate']
+    assert aggregate['total_papers'] == 2
+    assert aggregate['total_questions'] == papers['physics/midterm.txt']['total_questions'] + 2
+    for level, count in aggregate['level_counts'].items():
+        assert count == sum(p.get('level_counts', {}).get(level, 0) for p in data['papers'])
+
+
+@_with_inline_executor
+def test_limits():
+    original = (Config.ZIP_MAX_MEMBERS, Config.ZIP_MAX_MEMBER_BYTES, Config.ZIP_MAX_TOTAL_BYTES)
+    try:
+        Config.ZIP_MAX_MEMBERS = 2
+        assert post_zip(make_zip({f'p{i}.txt': PAPER for i in range(3)})).status_code == 413
+
+        Config.ZIP_MAX_MEMBERS, Config.ZIP_MAX_MEMBER_BYTES = 10, 100
+        data = post_zip(make_zip({'big.txt': PAPER * 10, 'small.csv': QUESTION_LIST})).get_json()
+        assert [p['filename'] for p in data['papers']] == ['small.csv']
+        assert data['skipped'][0]['filename'] == 'big.txt'
+
+        Config.ZIP_MAX_MEMBER_BYTES, Config.ZIP_MAX_TOTAL_BYTES = 1000, 150
+        assert post_zip(make_zip({'a.txt': PAPER, 'b.txt': PAPER})).status_code == 413
+
+        assert post_zip(io.BytesIO(b'not a zip')).status_code == 400
+        assert post_zip(io.BytesIO(b'x'), name='paper.pdf').get_json()['error'].startswith('Invalid file type')
+    finally:
+        Config.ZIP_MAX_MEMBERS, Config.ZIP_MAX_MEMBER_BYTES, Config.ZIP_MAX_TOTAL_BYTES = original
+
+
+@_with_inline_executor
+def test_members_saved_once_and_like_single_uploads():
+    mongomock = pytest.importorskip('mongomock')
+    analyses = mongomock.MongoClient().db.analyses
+    blooms_app.analyses_collection = analyses
+    calls = []
+    original = blooms_app.classify_archive_member
+
+    def fails_on_second_member(*args):
+        calls.append(args)
+        if len(calls) == 2:
+            raise ExecutorBusy('Too many tasks are already queued, please retry shortly')
+        return original(*args)
+
+    blooms_app.classify_archive_member = fails_on_second_member
+    try:
+        assert post_zip(make_zip({'a.txt': PAPER, 'b.csv': QUESTION_LIST})).status_code == 503
+    finally:
+        blooms_app.classify_archive_member = original
+    # Nothing was stored, so the client's retry stores each member exactly once
+    assert analyses.count_documents({}) == 0
+    assert post_zip(make_zip({'a.txt': PAPER, 'b.csv': QUESTION_LIST})).get_json()['success']
+    assert analyses.count_documents({}) == 2
+
+    # A newer version of a stored paper is analyzed incrementally, as /upload would
+    data = post_zip(make_zip({'a_v2.txt': PAPER + b'4. Justify your answer.\n'})).get_json()
+    stored = analyses.find_one({'_id': ObjectId(data['papers'][0]['analysis_id'])})
+    assert stored['lineage'] == 'a' and stored['results']['revision']['classified'] == 1
+
+
+if __name__ == "__main__":
+    test_combined_report()
+    test_limits()
+    test_members_saved_once_and_like_single_uploads()
+    print("✅ ZIP batch upload tests passed")
@@ -0,0 +1,30 @@
+"""
+WSGI entry point for pre-fork servers
+
+Run with:
+    gunicorn -c gunicorn.conf.py wsgi:application
+
+The master imports this module once (preload_app): configuration, the compiled
+lexicon, the PDF report styles and the heavy libraries are loaded there and
+shared copy-on-write with the workers. Each worker creates its own MongoDB
+client and background threads after fork.
+"""
+
+import gc
+import os
+
+from dotenv import load_dotenv
+
+# Production defaults, set before config.py reads the environment; the
+# environment and .env still win
+load_dotenv()
+os.environ.setdefault('FLASK_DEBUG', 'false')
+os.environ.setdefault('METRICS_REQUIRE_TOKEN', 'true')
+
+from app import create_app
+
+application = create_app(defer_worker_init=True)
+
+# Move everything loaded so far out of the garbage collector's reach, so
+# collections in the workers do not touch (and copy) the shared pages
+gc.freeze()
@@ -0,0 +1,82 @@
+"""
+Reading question papers out of an uploaded ZIP archive
+
+Members are read one at a time straight from the archive into memory, never
+extracted to disk. The archive is refused when it is too large or has too many
+members; single members that are too large (by their declared and their
+actual uncompressed size), unsupported or hidden are skipped and reported.
+"""
+
+import os
+import zipfile
+
+
+class ArchiveRejected(Exception):
+    """The archive as a whole cannot be processed; status is the HTTP status to answer with"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def member_extension(name):
+    base = os.path.basename(name)
+    return base.rsplit('.', 1)[1].lower() if '.' in base else ''
+
+
+def open_archive(source, max_members, max_total_bytes):
+    """Open a ZIP file (path or seekable file object) and check its member count and declared size"""
+    try:
+        archive = zipfile.ZipFile(source)
+    except (zipfile.BadZipFile, OSError):
+        raise ArchiveRejected('The uploaded file is not a valid ZIP archive')
+    files = [info for info in archive.infolist() if not info.is_dir()]
+    if len(files) > max_members:
+        archive.close()
+        raise ArchiveRejected(f'Archives may contain at most {max_members} files', 413)
+    if sum(info.file_size for info in files) > max_total_bytes:
+        archive.close()
+        raise ArchiveRejected(f'Archive contents exceed {max_total_bytes} bytes uncompressed', 413)
+    return archive
+
+
+def iter_members(archive, extensions, max_member_bytes, max_total_bytes, skipped):
+    """Yield (name, extension, bytes) for each supported member.
+
+    Skipped members are appended to skipped as {'filename', 'reason'}. Sizes
+    are checked again while reading, in case the archive under-declares them:
+    reading stops with ArchiveRejected once the members read add up to more
+    than max_total_bytes.
+    """
+    total = 0
+    for info in archive.infolist():
+        name = info.filename
+        base = os.path.basename(name)
+        if info.is_dir() or not base or base.startswith('.') or name.startswith('__MACOSX/'):
+            continue
+        extension = member_extension(name)
+        if extension not in extensions:
+            skipped.append({'filename': name, 'reason': 'unsupported file type'})
+            continue
+        if info.file_size > max_member_bytes:
+            skipped.append({'filename': name, 'reason': f'larger than {max_member_bytes} bytes'})
+            continue
+        # The declared size may lie (zip bombs); never read more than the limit
+        with archive.open(info) as member:
+            data = member.read(max_member_bytes + 1)
+        if len(data) > max_member_bytes:
+            skipped.append({'filename': name, 'reason': f'larger than {max_member_bytes} bytes'})
+            continue
+        total += len(data)
+        if total > max_total_bytes:
+            raise ArchiveRejected(f'Archive contents exceed {max_total_bytes} bytes uncompressed', 413)
+        yield name, extension, data
+
+
+def aggregate_level_counts(papers, levels):
+    """Sum the level counts of the analyzed papers"""
+    level_counts = {level: 0 for level in levels}
+    for paper in papers:
+        for level, count in (paper.get('level_counts') or {}).items():
+            level_counts[level] = level_counts.get(level, 0) + count
+    return level_counts